@@ -68,6 +68,7 @@ PACKAGE_INSTALL_REQUIRES = [
     "markupsafe<2.1",
     # Need to land support for Copier 6.0.0, until then peg to 5 or below
     "copier==5.*",
+    "pyyaml",
 ]
 
 # Add any third party packages you use in requirements for optional features of your package here
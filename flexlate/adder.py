@@ -2,7 +2,7 @@ import os
 import shutil
 from copy import deepcopy
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 from git import Repo
 from rich.prompt import Prompt
@@ -21,7 +21,10 @@ from flexlate.ext_git import (
     stage_and_commit_all,
     update_local_branches_from_remote_without_checkout,
 )
-from flexlate.path_ops import location_relative_to_new_parent
+from flexlate.path_ops import (
+    location_relative_to_new_parent,
+    make_func_that_creates_cwd_and_out_root_before_running,
+)
 from flexlate.render.multi import MultiRenderer
 from flexlate.styles import INFO_STYLE, SUCCESS_STYLE, console, print_styled, styled
 from flexlate.syncer import Syncer
@@ -69,19 +72,7 @@ class Adder:
                 f"To add this one, give it a custom name or remove the existing one"
             )
 
-        if not template.path.is_absolute() and not (
-            config_path.parent.resolve() == Path(os.getcwd())
-        ):
-            # Relative path, if the config output location is different than the
-            # current directory, need to adjust the path to be relative to
-            # the config output location
-
-            # Don't overwrite existing template
-            template = deepcopy(template)
-            # Make template path relative to its config file rather than current directory
-            template.path = Path(
-                os.path.relpath(template.path.resolve(), config_path.parent.resolve())
-            )
+        template = get_template_with_path_relative_to_config(template, config_path)
 
         with console.status(print_styled("Adding template source...", INFO_STYLE)):
             print_styled(
@@ -183,6 +174,7 @@ class Adder:
             INFO_STYLE,
         )
 
+        add_to_temp_project: Optional[Callable[[Path], None]] = None
         if add_mode == AddMode.USER:
             # No need to commit config changes for user
             config_manager.add_applied_template(
@@ -193,54 +185,35 @@ class Adder:
                 project_root=project_root,
                 out_root=expanded_out_root,
             )
-        else:
-            # Commit changes for local and project
-            commit_message = create_transaction_commit_message(
-                _add_template_commit_message(
-                    template, out_root, Path(repo.working_dir)
-                ),
-                transaction,
-            )
-
-            # Ensure that all flexlate branches are up to date from remote before working on them
-            update_local_branches_from_remote_without_checkout(
-                repo,
-                [
-                    base_merged_branch_name,
-                    merged_branch_name,
-                    base_template_branch_name,
-                    template_branch_name,
-                ],
-                remote=remote,
+            index = (
+                config_manager.get_num_applied_templates_in_child_config(
+                    config_path, project_root=project_root
+                )
+                - 1
             )
-
-            modify_files_via_branches_and_temp_repo(
-                lambda temp_path: config_manager.add_applied_template(
-                    template,
-                    location_relative_to_new_parent(
-                        config_path, project_root, temp_path, Path(os.getcwd())
+        else:
+            # Add the config for local and project in the same temp repo that renders
+            # the output, so that both are committed together in the update
+            index = config_manager.get_num_applied_templates_in_config_file(config_path)
+            add_to_temp_project = (
+                make_func_that_creates_cwd_and_out_root_before_running(
+                    out_root,
+                    lambda temp_path: config_manager.add_applied_template(
+                        template,
+                        location_relative_to_new_parent(
+                            config_path, project_root, temp_path, Path(os.getcwd())
+                        ),
+                        add_mode,
+                        data=data,
+                        project_root=temp_path,
+                        out_root=expanded_out_root,
                     ),
-                    add_mode,
-                    data=data,
-                    project_root=temp_path,
-                    out_root=expanded_out_root,
-                ),
-                repo,
-                commit_message,
-                out_root,
-                merged_branch_name=merged_branch_name,
-                base_merged_branch_name=base_merged_branch_name,
-                template_branch_name=template_branch_name,
-                base_template_branch_name=base_template_branch_name,
-                remote=remote,
+                )
             )
         template_update = TemplateUpdate(
             template=template,
             config_location=config_path,
-            index=config_manager.get_num_applied_templates_in_child_config(
-                config_path, project_root=project_root
-            )
-            - 1,
+            index=index,
             data=data,
         )
         updater.update(
@@ -256,6 +229,7 @@ class Adder:
             remote=remote,
             renderer=renderer,
             config_manager=config_manager,
+            temp_project_operation=add_to_temp_project,
         )
         print_styled(
             f"Successfully applied template {template.name} to {render_path}",
@@ -498,11 +472,27 @@ class Adder:
             return folder_name
 
 
-def _add_template_commit_message(
-    template: Template, out_root: Path, project_root: Path
-) -> str:
-    relative_path = Path(os.path.relpath(out_root.absolute(), project_root))
-    return f"Applied template {template.name} to {relative_path}"
+def get_template_with_path_relative_to_config(
+    template: Template, config_path: Path
+) -> Template:
+    """
+    Relative template paths are relative to the current directory, but they are
+    stored in the config relative to the config file
+
+    :return: The template with its path relative to the config file. A copy is made
+        if the path needs to be changed
+    """
+    if template.path.is_absolute() or (
+        config_path.parent.resolve() == Path(os.getcwd())
+    ):
+        return template
+
+    # Don't overwrite existing template
+    template = deepcopy(template)
+    template.path = Path(
+        os.path.relpath(template.path.resolve(), config_path.parent.resolve())
+    )
+    return template
 
 
 def _move_applied_template_config_message(
@@ -0,0 +1,348 @@
+import os
+from collections import defaultdict
+from copy import deepcopy
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from git import Repo
+
+from flexlate.add_mode import AddMode, get_expanded_out_root
+from flexlate.adder import get_template_with_path_relative_to_config
+from flexlate.config import TemplateSource
+from flexlate.config_manager import (
+    ConfigManager,
+    determine_config_path_from_roots_and_add_mode,
+)
+from flexlate.constants import DEFAULT_MERGED_BRANCH_NAME, DEFAULT_TEMPLATE_BRANCH_NAME
+from flexlate.exc import TemplateSourceWithNameAlreadyExistsException
+from flexlate.ext_git import assert_repo_is_in_clean_state
+from flexlate.finder.multi import MultiFinder
+from flexlate.manifest import BatchManifest
+from flexlate.path_ops import (
+    location_relative_to_new_parent,
+    make_func_that_creates_cwd_and_out_root_before_running,
+)
+from flexlate.remover import get_applied_template_config_path_and_out_root
+from flexlate.render.multi import MultiRenderer
+from flexlate.styles import INFO_STYLE, SUCCESS_STYLE, print_styled
+from flexlate.template.base import Template
+from flexlate.template_data import TemplateData
+from flexlate.transactions.transaction import FlexlateTransaction
+from flexlate.update.main import Updater
+from flexlate.update.template import TemplateUpdate
+
+ConfigOperation = Callable[[Path], None]
+
+
+class Batcher:
+    def apply_manifest(
+        self,
+        repo: Repo,
+        manifest: BatchManifest,
+        transaction: FlexlateTransaction,
+        default_add_mode: AddMode = AddMode.LOCAL,
+        merged_branch_name: str = DEFAULT_MERGED_BRANCH_NAME,
+        base_merged_branch_name: str = DEFAULT_MERGED_BRANCH_NAME,
+        template_branch_name: str = DEFAULT_TEMPLATE_BRANCH_NAME,
+        base_template_branch_name: str = DEFAULT_TEMPLATE_BRANCH_NAME,
+        no_input: bool = False,
+        remote: str = "origin",
+        config_manager: ConfigManager = ConfigManager(),
+        finder: MultiFinder = MultiFinder(),
+        updater: Updater = Updater(),
+        renderer: MultiRenderer = MultiRenderer(),
+    ):
+        """
+        Adds and removes all the template sources and outputs in the manifest
+        in a single update, so that they are committed and can be undone together
+
+        Sources are added first, then outputs are removed, then outputs are added,
+        and finally sources are removed. So outputs can be added from sources added
+        in the same manifest, and sources can be removed along with their outputs.
+        """
+        assert_repo_is_in_clean_state(repo)
+        if repo.working_dir is None:
+            raise ValueError("repo working dir should not be none")
+
+        project_root = Path(repo.working_dir)
+        # Config changes for local and project are made in the temp repo of the update,
+        # so that they are committed together with the output
+        temp_operations: List[ConfigOperation] = []
+
+        def run_or_add_to_temp_operations(
+            operation: ConfigOperation, add_mode: AddMode
+        ):
+            if add_mode == AddMode.USER:
+                # No need to commit config changes for user
+                operation(project_root)
+            else:
+                temp_operations.append(operation)
+
+        new_templates: Dict[str, Template] = {}
+        for source_to_add in manifest.add_sources:
+            add_mode = source_to_add.add_mode or default_add_mode
+            template = finder.find(
+                source_to_add.path, version=source_to_add.target_version
+            )
+            if source_to_add.name:
+                template.name = source_to_add.name
+            if template.name in new_templates or config_manager.template_source_exists(
+                template.name, project_root=project_root
+            ):
+                raise TemplateSourceWithNameAlreadyExistsException(
+                    f"There is an existing template source with the name {template.name}. "
+                    f"To add this one, give it a custom name or remove the existing one"
+                )
+            config_path = determine_config_path_from_roots_and_add_mode(
+                source_to_add.template_root, project_root, add_mode
+            )
+            source_template = get_template_with_path_relative_to_config(
+                template, config_path
+            )
+            print_styled(
+                f"Adding template source {template.name} from {template.git_url or template.path}",
+                INFO_STYLE,
+            )
+            run_or_add_to_temp_operations(
+                partial(
+                    _add_template_source,
+                    template=source_template,
+                    config_path=config_path,
+                    target_version=source_to_add.target_version,
+                    project_root=project_root,
+                    config_manager=config_manager,
+                ),
+                add_mode,
+            )
+            new_templates[template.name] = _template_as_loaded_from_source(
+                template,
+                TemplateSource.from_template(
+                    source_template, target_version=source_to_add.target_version
+                ),
+            )
+
+        # Number of applied templates removed from each config, to determine the index
+        # of the applied templates that are added after
+        num_removed: Dict[Path, int] = defaultdict(int)
+        for output_to_remove in manifest.remove_outputs:
+            config_path, expanded_out_root = (
+                get_applied_template_config_path_and_out_root(
+                    output_to_remove.name,
+                    output_to_remove.out_root,
+                    project_root,
+                    default_add_mode,
+                    config_manager=config_manager,
+                    renderer=renderer,
+                )
+            )
+            print_styled(
+                f"Removing applied template {output_to_remove.name} at {expanded_out_root.resolve()}",
+                INFO_STYLE,
+            )
+            run_or_add_to_temp_operations(
+                partial(
+                    _remove_applied_template,
+                    template_name=output_to_remove.name,
+                    config_path=config_path,
+                    out_root=expanded_out_root,
+                    project_root=project_root,
+                    config_manager=config_manager,
+                ),
+                default_add_mode,
+            )
+            if default_add_mode != AddMode.USER:
+                num_removed[config_path.resolve()] += 1
+
+        updates: List[TemplateUpdate] = []
+        next_indices: Dict[Path, int] = {}
+        for output_to_add in manifest.add_outputs:
+            add_mode = output_to_add.add_mode or default_add_mode
+            if output_to_add.name in new_templates:
+                template = new_templates[output_to_add.name]
+            else:
+                template = config_manager.get_template_by_name(
+                    output_to_add.name, project_root=project_root
+                )
+            config_path = determine_config_path_from_roots_and_add_mode(
+                output_to_add.out_root / template.render_relative_root_in_output,
+                project_root,
+                add_mode,
+            )
+            expanded_out_root = get_expanded_out_root(
+                output_to_add.out_root,
+                project_root,
+                template.render_relative_root_in_output,
+                add_mode,
+            )
+            print_styled(
+                f"Applying template {template.name} to {output_to_add.out_root.resolve()}",
+                INFO_STYLE,
+            )
+            operation = make_func_that_creates_cwd_and_out_root_before_running(
+                output_to_add.out_root,
+                partial(
+                    _add_applied_template,
+                    template=template,
+                    config_path=config_path,
+                    add_mode=add_mode,
+                    data=output_to_add.data,
+                    out_root=expanded_out_root,
+                    project_root=project_root,
+                    config_manager=config_manager,
+                ),
+            )
+            run_or_add_to_temp_operations(operation, add_mode)
+            if add_mode == AddMode.USER:
+                index = (
+                    config_manager.get_num_applied_templates_in_child_config(
+                        config_path, project_root=project_root
+                    )
+                    - 1
+                )
+            else:
+                # Applied templates are added at the end of the config after removing
+                config_key = config_path.resolve()
+                if config_key not in next_indices:
+                    next_indices[config_key] = (
+                        config_manager.get_num_applied_templates_in_config_file(
+                            config_path
+                        )
+                        - num_removed[config_key]
+                    )
+                index = next_indices[config_key]
+                next_indices[config_key] += 1
+            updates.append(
+                TemplateUpdate(
+                    template=template,
+                    config_location=config_path,
+                    index=index,
+                    data=output_to_add.data,
+                )
+            )
+
+        for source_to_remove in manifest.remove_sources:
+            config_path = determine_config_path_from_roots_and_add_mode(
+                source_to_remove.template_root, project_root, default_add_mode
+            )
+            print_styled(
+                f"Removing template source {source_to_remove.name}", INFO_STYLE
+            )
+            run_or_add_to_temp_operations(
+                partial(
+                    _remove_template_source,
+                    template_name=source_to_remove.name,
+                    config_path=config_path,
+                    project_root=project_root,
+                    config_manager=config_manager,
+                ),
+                default_add_mode,
+            )
+
+        def run_temp_operations(temp_project_root: Path):
+            for temp_operation in temp_operations:
+                temp_operation(temp_project_root)
+
+        updater.update(
+            repo,
+            updates,
+            transaction,
+            merged_branch_name=merged_branch_name,
+            base_merged_branch_name=base_merged_branch_name,
+            template_branch_name=template_branch_name,
+            base_template_branch_name=base_template_branch_name,
+            no_input=no_input,
+            # Removed outputs can only be cleaned up by rendering everything again
+            full_rerender=len(manifest.remove_outputs) > 0,
+            remote=remote,
+            renderer=renderer,
+            config_manager=config_manager,
+            temp_project_operation=run_temp_operations,
+        )
+        print_styled("Successfully applied manifest", SUCCESS_STYLE)
+
+
+def _template_as_loaded_from_source(
+    template: Template, source: TemplateSource
+) -> Template:
+    # Match the template that would be created from the source once it is in the config
+    template = deepcopy(template)
+    template.path = template.path.absolute()
+    template.target_version = source.target_version
+    template.template_source_path = source.path
+    return template
+
+
+def _add_template_source(
+    root: Path,
+    template: Template,
+    config_path: Path,
+    target_version: Optional[str],
+    project_root: Path,
+    config_manager: ConfigManager,
+):
+    config_manager.add_template_source(
+        template,
+        location_relative_to_new_parent(
+            config_path, project_root, root, Path(os.getcwd())
+        ),
+        target_version=target_version,
+        project_root=root,
+    )
+
+
+def _remove_template_source(
+    root: Path,
+    template_name: str,
+    config_path: Path,
+    project_root: Path,
+    config_manager: ConfigManager,
+):
+    config_manager.remove_template_source(
+        template_name,
+        location_relative_to_new_parent(
+            config_path, project_root, root, Path(os.getcwd())
+        ),
+        project_root=root,
+    )
+
+
+def _add_applied_template(
+    root: Path,
+    template: Template,
+    config_path: Path,
+    add_mode: AddMode,
+    data: Optional[TemplateData],
+    out_root: Path,
+    project_root: Path,
+    config_manager: ConfigManager,
+):
+    config_manager.add_applied_template(
+        template,
+        location_relative_to_new_parent(
+            config_path, project_root, root, Path(os.getcwd())
+        ),
+        add_mode,
+        data=data,
+        project_root=root,
+        out_root=out_root,
+    )
+
+
+def _remove_applied_template(
+    root: Path,
+    template_name: str,
+    config_path: Path,
+    out_root: Path,
+    project_root: Path,
+    config_manager: ConfigManager,
+):
+    config_manager.remove_applied_template(
+        template_name,
+        location_relative_to_new_parent(
+            config_path, project_root, root, Path(os.getcwd())
+        ),
+        project_root=root,
+        out_root=out_root,
+        orig_project_root=project_root,
+    )
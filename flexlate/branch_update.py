@@ -1,21 +1,24 @@
 import os
 from pathlib import Path
-from typing import Callable, List, Optional, Union
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Union
+from uuid import UUID
 
 from git import Head, Repo, repo
 
 from flexlate.cli_utils import confirm_user
 from flexlate.constants import DEFAULT_MERGED_BRANCH_NAME, DEFAULT_TEMPLATE_BRANCH_NAME
+from flexlate.exc import CannotParseCommitMessageFlexlateTransaction
 from flexlate.ext_git import (
     abort_merge,
     checked_out_template_branch,
+    create_template_branch_without_checkout,
     fast_forward_branch_without_checkout,
     get_branch_sha,
+    merge_branch_into_branch_without_checkout,
     merge_branch_into_current,
     repo_has_merge_conflicts,
     reset_branch_to_commit_without_checkout,
-    stage_and_commit_all,
-    temp_repo_that_pushes_to_branch,
+    temp_work_tree_for_branch,
 )
 from flexlate.path_ops import make_func_that_creates_cwd_and_out_root_before_running
 from flexlate.styles import (
@@ -25,9 +28,13 @@ from flexlate.styles import (
     print_styled,
     styled,
 )
+from flexlate.transactions.index import (
+    IndexedTransactionCommits,
+    index_transaction_commits,
+)
 from flexlate.transactions.transaction import (
     FlexlateTransaction,
-    reset_last_transaction,
+    find_commit_before_last_transactions,
 )
 
 
@@ -55,37 +62,53 @@ def modify_files_via_branches_and_temp_repo(
     )
 
     # Update the template only branch with the new template
-    with temp_repo_that_pushes_to_branch(  # type: ignore
+    with temp_work_tree_for_branch(  # type: ignore
         repo,
         branch_name=template_branch_name,
         base_branch_name=base_template_branch_name,
         remote=remote,
-    ) as temp_repo:
-        make_dirs_add_operation(Path(temp_repo.working_dir))  # type: ignore
-        stage_and_commit_all(temp_repo, commit_message)
+    ) as work_tree:
+        make_dirs_add_operation(work_tree.working_dir)
+        work_tree.stage_all()
+        work_tree.commit_staged(commit_message)
 
     # Bring the change into the merged branch
     # Update with changes from the main repo
     fast_forward_branch_without_checkout(repo, merged_branch_name, current_branch.name)
-    with checked_out_template_branch(
-        repo, branch_name=merged_branch_name, base_branch_name=base_merged_branch_name
+    # Update with the new template in memory, only checking out the merged branch
+    # if there are conflicts for the user to resolve
+    if not merge_branch_into_branch_without_checkout(
+        repo, merged_branch_name, template_branch_name
     ):
-        # Update with the new template
-        merge_branch_into_current(repo, template_branch_name)
-        if repo_has_merge_conflicts(repo):
-            aborted = prompt_to_fix_conflicts_and_reset_on_abort_return_aborted(
-                repo,
-                current_branch,
-                merged_branch_sha,
-                template_branch_sha,
-                merged_branch_name,
-                template_branch_name,
-            )
-            if aborted:
-                return
+        with checked_out_template_branch(
+            repo,
+            branch_name=merged_branch_name,
+            base_branch_name=base_merged_branch_name,
+        ):
+            merge_branch_into_current(repo, template_branch_name)
+            if repo_has_merge_conflicts(repo):
+                aborted = prompt_to_fix_conflicts_and_reset_on_abort_return_aborted(
+                    repo,
+                    current_branch,
+                    merged_branch_sha,
+                    template_branch_sha,
+                    merged_branch_name,
+                    template_branch_name,
+                )
+                if aborted:
+                    return
 
     # Merge back into current branch
     merge_branch_into_current(repo, merged_branch_name)
+    try:
+        transaction = FlexlateTransaction.parse_commit_message(commit_message)
+    except CannotParseCommitMessageFlexlateTransaction:
+        # Not a transaction, such as initializing the project
+        pass
+    else:
+        index_transaction_commits(
+            repo, transaction, merged_branch_name, template_branch_name
+        )
 
     # Current working directory or out root may have been deleted if it was a remove operation
     # and there was nothing else in the folder (git does not save folders without files)
@@ -99,35 +122,43 @@ def modify_files_via_branches_and_temp_repo(
     os.chdir(cwd)
 
 
-def undo_transaction_in_flexlate_branches(
+def undo_transactions_in_flexlate_branches(
     repo: Repo,
-    transaction: FlexlateTransaction,
+    transactions: Sequence[FlexlateTransaction],
     merged_branch_name: str = DEFAULT_MERGED_BRANCH_NAME,
     base_merged_branch_name: str = DEFAULT_MERGED_BRANCH_NAME,
     template_branch_name: str = DEFAULT_TEMPLATE_BRANCH_NAME,
     base_template_branch_name: str = DEFAULT_TEMPLATE_BRANCH_NAME,
+    transaction_index: Optional[Mapping[UUID, IndexedTransactionCommits]] = None,
 ):
-    # Reset the template only branch to the appropriate commit
-    with temp_repo_that_pushes_to_branch(  # type: ignore
-        repo,
-        branch_name=template_branch_name,
-        base_branch_name=base_template_branch_name,
-        force_push=True,
-    ) as temp_repo:
-        reset_last_transaction(
-            temp_repo, transaction, merged_branch_name, template_branch_name
+    """
+    Resets the flexlate branches to before the transactions, with a single
+    reset of each branch. The branches are moved directly, without checking
+    them out
+
+    :param transactions: The last transactions, most recent first
+    """
+    before_transactions_shas: Dict[str, str] = {}
+    for branch_name, base_branch_name in [
+        (template_branch_name, base_template_branch_name),
+        (merged_branch_name, base_merged_branch_name),
+    ]:
+        # Feature flexlate branches may not have been created yet
+        create_template_branch_without_checkout(repo, branch_name, base_branch_name)
+        before_transactions_commit = find_commit_before_last_transactions(
+            repo,
+            transactions,
+            merged_branch_name,
+            template_branch_name,
+            branch_name=branch_name,
+            transaction_index=transaction_index,
         )
+        before_transactions_shas[branch_name] = before_transactions_commit.hexsha
 
-    # Reset the merged template branch to the appropriate commit
-    with temp_repo_that_pushes_to_branch(  # type: ignore
-        repo,
-        branch_name=merged_branch_name,
-        base_branch_name=base_merged_branch_name,
-        force_push=True,
-    ) as temp_repo:
-        reset_last_transaction(
-            temp_repo, transaction, merged_branch_name, template_branch_name
-        )
+    # Only move the branches once both have been found, so that neither is
+    # reset if the transactions cannot be undone
+    for branch_name, sha in before_transactions_shas.items():
+        reset_branch_to_commit_without_checkout(repo, branch_name, sha)
 
 
 def abort_merge_and_reset_flexlate_branches(
@@ -1,5 +1,7 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, Final, List, Optional, Sequence, Tuple
 
 from pydantic import BaseModel
 from rich.console import Console, ConsoleOptions, RenderResult
@@ -7,7 +9,12 @@ from rich.table import Table
 
 from flexlate.config_manager import ConfigManager
 from flexlate.finder.multi import MultiFinder
+from flexlate.logger import log
 from flexlate.styles import ACTION_REQUIRED_STYLE, SUCCESS_STYLE, styled
+from flexlate.template.base import Template
+
+# Checking is mostly waiting on the network and git, so use threads
+CHECK_THREADS: Final[int] = 8
 
 
 class CheckResult(BaseModel):
@@ -64,14 +71,43 @@ class Checker:
         project_root: Path = Path("."),
         config_manager: ConfigManager = ConfigManager(),
         finder: MultiFinder = MultiFinder(),
+        max_workers: int = CHECK_THREADS,
     ) -> CheckResults:
         sources = config_manager.get_template_sources(names, project_root=project_root)
+        # Sources with the same location and target version will always get the same
+        # result, so only look up each once
+        lookups: List[Tuple[str, Optional[str]]] = list(
+            dict.fromkeys(
+                (str(source.update_location), source.target_version)
+                for source in sources
+            )
+        )
+
+        def find(lookup: Tuple[str, Optional[str]]) -> Template:
+            path, version = lookup
+            kwargs: Dict[str, Any] = {}
+            if version:
+                kwargs.update(version=version)
+            start = time.perf_counter()
+            template = finder.find(path, **kwargs)
+            log.debug(
+                f"Checked {path} at version {version or 'latest'} in "
+                f"{time.perf_counter() - start:.2f}s"
+            )
+            return template
+
+        if len(lookups) > 1 and max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                templates = list(executor.map(find, lookups))
+        else:
+            templates = [find(lookup) for lookup in lookups]
+        templates_by_lookup = dict(zip(lookups, templates))
+
         results: List[CheckResult] = []
         for source in sources:
-            kwargs: Dict[str, Any] = {}
-            if source.target_version:
-                kwargs.update(version=source.target_version)
-            new_template = finder.find(str(source.update_location), **kwargs)
+            new_template = templates_by_lookup[
+                (str(source.update_location), source.target_version)
+            ]
             results.append(
                 CheckResult(
                     source_name=source.name,
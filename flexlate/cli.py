@@ -55,6 +55,10 @@ REMOTE_DOC = "The name of the remote repository"
 PUSH_REMOTE_DOC = (
     "The name of the remote repository to push to, defaults to project config remote"
 )
+JOBS_DOC = (
+    "The number of processes to use to render templates which will not prompt. "
+    "Templates which prompt are always rendered one at a time"
+)
 TEMPLATE_SOURCE_NAME_DOC = (
     "The name of the template. It must match a name in template sources"
 )
@@ -100,6 +104,7 @@ REMOTE_OPTION = typer.Option("origin", "--remote", "-r", help=REMOTE_DOC)
 PUSH_REMOTE_OPTION = typer.Option(
     None, "--remote", "-r", help=REMOTE_DOC, show_default=False
 )
+JOBS_OPTION = typer.Option(1, "--jobs", "-j", min=1, help=JOBS_DOC)
 TEMPLATE_SOURCE_NAME_ARGUMENT = typer.Argument(
     ...,
     help=TEMPLATE_SOURCE_NAME_DOC,
@@ -230,6 +235,31 @@ def remove_template_output(
 cli.add_typer(remove_cli, name="remove")
 
 
+@cli.command(name="batch")
+@simple_output_for_exceptions(
+    exc.GitRepoDirtyException, exc.TemplateNotRegisteredException
+)
+def apply_manifest(
+    manifest_path: Path = typer.Argument(
+        ...,
+        help="A YAML or JSON file with add_sources, add_outputs, remove_outputs, "
+        "and remove_sources lists. Paths in it are relative to the current directory",
+    ),
+    no_input: bool = NO_INPUT_OPTION,
+    quiet: bool = QUIET_OPTION,
+    path: Path = PROJECT_PATH_OPTION,
+):
+    """
+    Adds and removes many template sources and outputs at once from a manifest
+
+    All the changes are made in a single flexlate operation, so they are
+    much faster than running each add and remove command separately, and
+    they can be reversed with a single undo.
+    """
+    app = Flexlate(quiet=quiet)
+    app.apply_manifest(manifest_path, no_input=no_input, project_path=path)
+
+
 @cli.command(name="init")
 @simple_output_for_exceptions(exc.GitRepoDirtyException)
 def init_project(
@@ -357,6 +387,7 @@ def update_templates(
     ),
     quiet: bool = QUIET_OPTION,
     path: Path = PROJECT_PATH_OPTION,
+    jobs: int = JOBS_OPTION,
 ):
     """
     Updates applied templates in the project to the newest versions
@@ -375,6 +406,7 @@ def update_templates(
             abort_on_conflict=abort_on_conflict,
             no_cleanup=no_cleanup,
             project_path=path,
+            jobs=jobs,
         )
         log.debug("Exiting with code 0")
         return
@@ -410,6 +442,22 @@ def undo(
     app.undo(num_operations=num_operations, project_path=path)
 
 
+@cli.command(name="rebuild-index")
+def rebuild_index(
+    path: Path = PROJECT_PATH_OPTION,
+    quiet: bool = QUIET_OPTION,
+):
+    """
+    Recreates the index that flexlate uses to find the commits of each
+    operation, from the history of the flexlate branches.
+
+    The index is kept up to date by flexlate, so this is only needed if
+    flexlate branches were modified outside of flexlate.
+    """
+    app = Flexlate(quiet=quiet)
+    app.rebuild_transaction_index(project_path=path)
+
+
 @cli.command(name="sync")
 @simple_output_for_exceptions(exc.GitRepoDirtyException, exc.UnnecessarySyncException)
 def sync(
@@ -422,6 +470,7 @@ def sync(
         show_default=False,
     ),
     quiet: bool = QUIET_OPTION,
+    jobs: int = JOBS_OPTION,
 ):
     """
     Syncs manual changes to the flexlate branches, and updates templates
@@ -438,7 +487,7 @@ def sync(
     ) for more information.
     """
     app = Flexlate(quiet=quiet)
-    app.sync(prompt=prompt, project_path=path)
+    app.sync(prompt=prompt, project_path=path, jobs=jobs)
 
 
 @cli.command(name="merge")
@@ -1,15 +1,19 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import (
     TYPE_CHECKING,
     Any,
     Callable,
     Dict,
+    Final,
+    FrozenSet,
     List,
     Optional,
     Sequence,
     Set,
     Tuple,
+    Type,
     Union,
     cast,
 )
@@ -21,6 +25,7 @@ from pyappconf import AppConfig, BaseConfig, ConfigFormats
 from pydantic import BaseModel, Extra, Field, PrivateAttr, validator
 
 from flexlate.add_mode import AddMode, get_expanded_out_root
+from flexlate.config_cache import ParsedConfigCache
 from flexlate.constants import DEFAULT_MERGED_BRANCH_NAME, DEFAULT_TEMPLATE_BRANCH_NAME
 from flexlate.exc import (
     CannotFindTemplateSourceException,
@@ -63,9 +68,9 @@ class TemplateSource(BaseModel):
     ) -> "TemplateSource":
         return cls(
             name=template.name,
-            path=template.git_url
-            if template.git_url is not None
-            else str(template.path),
+            path=(
+                template.git_url if template.git_url is not None else str(template.path)
+            ),
             version=template.version,
             type=template._type,
             target_version=target_version,
@@ -135,11 +140,50 @@ class AppliedTemplateWithSource(BaseModel):
     applied_template_config_path: Path
     source_config_path: Path
 
-    def to_template_and_data(self) -> Tuple[Template, TemplateData]:
-        return (
-            self.source.to_template(version=self.applied_template.version),
-            self.applied_template.data,
+    def to_template_and_data(
+        self, registry: Optional["TemplateRegistry"] = None
+    ) -> Tuple[Template, TemplateData]:
+        """
+        :param registry: Pass to share templates with other applied templates
+            from the same source and version, rather than finding it again
+        """
+        version = self.applied_template.version
+        if registry is None:
+            template = self.source.to_template(version=version)
+        else:
+            template = registry.get_template(self.source, version=version)
+        return template, self.applied_template.data
+
+
+class TemplateRegistry:
+    """
+    Gets templates from template sources, only finding the template once
+    for each source and version. Templates are shared between all users of
+    the registry, so they should not be modified
+    """
+
+    def __init__(self, finder: MultiFinder = MultiFinder()):
+        self.finder = finder
+        self._templates: Dict[
+            Tuple[str, Optional[str], str, str, Optional[str]], Template
+        ] = {}
+
+    def get_template(
+        self, source: TemplateSource, version: Optional[str] = None
+    ) -> Template:
+        version = version or source.version
+        key = (
+            source.name,
+            version,
+            str(source.update_location),
+            str(source.path),
+            source.target_version,
         )
+        if key not in self._templates:
+            self._templates[key] = source.to_template(
+                version=version, finder=self.finder
+            )
+        return self._templates[key]
 
 
 class TemplateSourceWithTemplates(BaseModel):
@@ -158,6 +202,26 @@ class FlexlateConfig(BaseConfig):
         app_name="flexlate", default_format=ConfigFormats.JSON, config_name="flexlate"
     )
 
+    # Indexes for parent pseudo-configs, so that lookups do not need to scan every
+    # child config. They are kept in sync by the mutating methods below
+    _child_configs_by_path: Dict[Path, "FlexlateConfig"] = PrivateAttr(
+        default_factory=dict
+    )
+    # Child config path -> the copies in this config of its applied templates,
+    # in the same order as in the child config
+    _root_applied_templates: Dict[Path, List[AppliedTemplateConfig]] = PrivateAttr(
+        default_factory=dict
+    )
+    # Built on first use and reset when template sources are added, removed, or moved
+    _source_index: Optional[Dict[str, Tuple["FlexlateConfig", TemplateSource]]] = (
+        PrivateAttr(None)
+    )
+    # (config path, reference path) -> (name, absolute root) -> index in child config.
+    # Built on first use and reset whenever applied templates change
+    _applied_template_indexes: Dict[Tuple[Path, Path], Dict[Tuple[str, Path], int]] = (
+        PrivateAttr(default_factory=dict)
+    )
+
     @classmethod
     def from_dir_including_nested(
         cls, root: Path, adjust_applied_paths: bool = True
@@ -184,6 +248,16 @@ class FlexlateConfig(BaseConfig):
             template_sources=template_sources, applied_templates=applied_templates
         )
         obj._child_configs = list(configs)
+        obj._child_configs_by_path = {
+            conf.settings.config_location.absolute(): conf for conf in configs
+        }
+        # Validation may copy the applied templates again, so take them from the
+        # created config. The order is the same as in the child configs
+        root_applied_templates = iter(obj.applied_templates)
+        for conf in configs:
+            obj._root_applied_templates[conf.settings.config_location.absolute()] = [
+                next(root_applied_templates) for _ in conf.applied_templates
+            ]
         return obj
 
     @validator("template_sources")
@@ -209,7 +283,15 @@ class FlexlateConfig(BaseConfig):
 
     @classmethod
     def load(cls, path: Optional[Union[str, Path]] = None) -> "FlexlateConfig":
-        config = cast(FlexlateConfig, super().load(path))
+        load_path = Path(path) if path is not None else cls._settings.config_location
+        config = cast(
+            FlexlateConfig,
+            parsed_config_cache.load(
+                load_path,
+                lambda: super(FlexlateConfig, cls).load(path),
+                key_extra=_parsed_config_key_extra(cls),
+            ),
+        )
         for template_source in config.template_sources:
             # Add location from which config was loaded so that later template source paths
             # can be made absolute before usage
@@ -225,6 +307,7 @@ class FlexlateConfig(BaseConfig):
     def save(self, serializer_kwargs: Optional[Dict[str, Any]] = None, **kwargs):
         if not self.child_configs:
             # Normal singular config, fall back to py-app-conf behavior
+            parsed_config_cache.invalidate(self.settings.config_location)
             return super().save(serializer_kwargs, **kwargs)
         # Parent pseudo-config holding actual child configs, save those instead
         for config in self.child_configs:
@@ -232,6 +315,7 @@ class FlexlateConfig(BaseConfig):
                 # User must have removed all the sources and applied templates,
                 # therefore we don't want the config file anymore
                 if config.settings.config_location.exists():
+                    parsed_config_cache.invalidate(config.settings.config_location)
                     os.remove(config.settings.config_location)
                 continue
 
@@ -262,12 +346,13 @@ class FlexlateConfig(BaseConfig):
         # Do update in child config
         child_config = self._get_child_config_by_path(config_location)
         applied_template = child_config.applied_templates[index]
+        root_applied_template = self._get_root_applied_template(child_config, index)
         updater(applied_template)
         # Do update in root config
-        for at in self.applied_templates:
-            if at == applied_template:
-                updater(at)
-                break
+        if root_applied_template is not None:
+            updater(root_applied_template)
+        # Updater may have changed the name or root
+        self._applied_template_indexes.clear()
 
     def update_template_source(
         self,
@@ -275,19 +360,15 @@ class FlexlateConfig(BaseConfig):
         name: str,
     ) -> None:
         # Do update in child config
-        template_source: Optional[TemplateSource] = None
-        for child_config in self.child_configs:
-            for template_source in child_config.template_sources:
-                if template_source.name == name:
-                    updater(template_source)
-                    break
-        if template_source is None:
+        try:
+            _, template_source = self._get_source_index()[name]
+        except KeyError:
             raise CannotFindTemplateSourceException(f"template source {name} not found")
+        updater(template_source)
         # Do update in root config
-        for ts in self.template_sources:
-            if ts == template_source:
-                updater(ts)
-                break
+        root_template_source = self.template_sources_dict.get(name)
+        if root_template_source is not None:
+            updater(root_template_source)
 
     def update_template_sources(
         self,
@@ -319,6 +400,7 @@ class FlexlateConfig(BaseConfig):
         child_config.template_sources.append(template_source)
         # Do update in root config
         self.template_sources.append(template_source)
+        self._source_index = None
 
     def remove_template_source(self, template_name: str, config_location: Path) -> None:
         # Do update in child config
@@ -342,15 +424,20 @@ class FlexlateConfig(BaseConfig):
             if ts.name == template_source.name:
                 self.template_sources.remove(ts)
                 break
+        self._source_index = None
 
     def add_applied_template(
         self, applied_template: AppliedTemplateConfig, config_location: Path
     ) -> None:
         # Do update in child config
         child_config = self._get_or_create_child_config_by_path(config_location)
+        root_applied_templates = self._get_indexed_root_applied_templates(child_config)
         child_config.applied_templates.append(applied_template)
         # Do update in root config
         self.applied_templates.append(applied_template)
+        if root_applied_templates is not None:
+            root_applied_templates.append(applied_template)
+        self._applied_template_indexes.clear()
 
     def remove_applied_template(
         self,
@@ -362,18 +449,23 @@ class FlexlateConfig(BaseConfig):
     ) -> None:
         # Do update in child config
         child_config = self._get_child_config_by_path(config_location)
-        idx, applied_template = self._find_applied_template(
+        idx, _ = self._find_applied_template(
             template_name,
             config_location,
             project_root=project_root,
             out_root=out_root,
             orig_project_root=orig_project_root,
         )
+        root_applied_templates = self._get_indexed_root_applied_templates(child_config)
+        root_applied_template = self._get_root_applied_template(child_config, idx)
         child_config.applied_templates.pop(idx)
+        self._applied_template_indexes.clear()
         # Do update in root config
-        for at in self.applied_templates:
-            if at == applied_template:
-                self.applied_templates.remove(at)
+        if root_applied_templates is not None:
+            root_applied_templates.pop(idx)
+        for i, at in enumerate(self.applied_templates):
+            if at is root_applied_template:
+                self.applied_templates.pop(i)
                 break
 
     def move_applied_template(
@@ -394,6 +486,7 @@ class FlexlateConfig(BaseConfig):
             out_root=out_root,
             orig_project_root=orig_project_root,
         )
+        root_applied_templates = self._get_indexed_root_applied_templates(child_config)
         applied_template = child_config.applied_templates.pop(template_index)
         expanded_out_root = get_expanded_out_root(
             out_root,
@@ -403,8 +496,17 @@ class FlexlateConfig(BaseConfig):
         )
         applied_template.root = expanded_out_root
         new_child_config = self._get_or_create_child_config_by_path(new_config_path)
+        new_root_applied_templates = self._get_indexed_root_applied_templates(
+            new_child_config
+        )
         new_child_config.applied_templates.append(applied_template)
-        # No need update to root config needed, because only location changed
+        self._applied_template_indexes.clear()
+        # No need update to root config needed, because only location changed.
+        # Just keep track of which child config it is now in
+        if root_applied_templates is not None:
+            root_applied_template = root_applied_templates.pop(template_index)
+            if new_root_applied_templates is not None:
+                new_root_applied_templates.append(root_applied_template)
 
     def move_template_source(
         self,
@@ -429,11 +531,11 @@ class FlexlateConfig(BaseConfig):
         template_source.path = new_template_source_path
         new_child_config = self._get_or_create_child_config_by_path(new_config_path)
         new_child_config.template_sources.append(template_source)
+        self._source_index = None
         # Update path for root config
-        for ts in self.template_sources:
-            if ts.name == template_source.name:
-                ts.path = template_source.path
-                break
+        root_template_source = self.template_sources_dict.get(template_source.name)
+        if root_template_source is not None:
+            root_template_source.path = template_source.path
 
     def _find_applied_template(
         self,
@@ -467,19 +569,10 @@ class FlexlateConfig(BaseConfig):
         applied_template_reference_path = (
             orig_project_root if adjust_applied_paths else orig_config_folder
         )
-        for i, applied_template in enumerate(child_config.applied_templates):
-
-            absolute_template_out_root = (
-                make_absolute_path_from_possibly_relative_to_another_path(
-                    applied_template.root, applied_template_reference_path
-                )
-            )
-            if (
-                applied_template.name == template_name
-                and absolute_template_out_root == absolute_out_root
-            ):
-                template_index = i
-                break
+        applied_template_index = self._get_applied_template_index(
+            child_config, applied_template_reference_path
+        )
+        template_index = applied_template_index.get((template_name, absolute_out_root))
         if template_index is None:
             raise CannotRemoveAppliedTemplateException(
                 f"Cannot find any applied template with name {template_name} and root {out_root}"
@@ -515,6 +608,70 @@ class FlexlateConfig(BaseConfig):
         template_source = child_config.template_sources[template_index]
         return template_index, template_source
 
+    def get_template_source_config_path(self, name: str) -> Path:
+        try:
+            child_config, _ = self._get_source_index()[name]
+        except KeyError:
+            raise CannotFindTemplateSourceException(f"template source {name} not found")
+        return child_config.settings.config_location
+
+    def _get_indexed_root_applied_templates(
+        self, child_config: "FlexlateConfig"
+    ) -> Optional[List[AppliedTemplateConfig]]:
+        """
+        :return: The copies in this config of the child config's applied templates,
+            or None if the child config was loaded after this config was created,
+            so its applied templates are not indexed
+        """
+        root_applied_templates = self._root_applied_templates.get(
+            child_config.settings.config_location.absolute()
+        )
+        if root_applied_templates is None or len(root_applied_templates) != len(
+            child_config.applied_templates
+        ):
+            return None
+        return root_applied_templates
+
+    def _get_root_applied_template(
+        self, child_config: "FlexlateConfig", index: int
+    ) -> Optional[AppliedTemplateConfig]:
+        root_applied_templates = self._get_indexed_root_applied_templates(child_config)
+        if root_applied_templates is not None:
+            return root_applied_templates[index]
+        applied_template = child_config.applied_templates[index]
+        for at in self.applied_templates:
+            if at == applied_template:
+                return at
+        return None
+
+    def _get_source_index(self) -> Dict[str, Tuple["FlexlateConfig", TemplateSource]]:
+        if self._source_index is None:
+            self._source_index = {}
+            for child_config in self.child_configs:
+                for template_source in child_config.template_sources:
+                    # Keep the first match, as a linear search would
+                    self._source_index.setdefault(
+                        template_source.name, (child_config, template_source)
+                    )
+        return self._source_index
+
+    def _get_applied_template_index(
+        self, child_config: "FlexlateConfig", reference_path: Path
+    ) -> Dict[Tuple[str, Path], int]:
+        key = (child_config.settings.config_location.absolute(), reference_path)
+        if key not in self._applied_template_indexes:
+            index: Dict[Tuple[str, Path], int] = {}
+            for i, applied_template in enumerate(child_config.applied_templates):
+                absolute_template_out_root = (
+                    make_absolute_path_from_possibly_relative_to_another_path(
+                        applied_template.root, reference_path
+                    )
+                )
+                # Keep the first match, as a linear search would
+                index.setdefault((applied_template.name, absolute_template_out_root), i)
+            self._applied_template_indexes[key] = index
+        return self._applied_template_indexes[key]
+
     def _get_or_create_child_config_by_path(self, path: Path) -> "FlexlateConfig":
         try:
             return self._get_child_config_by_path(path)
@@ -527,11 +684,26 @@ class FlexlateConfig(BaseConfig):
             self._child_configs.append(new_child)
         else:
             self._child_configs = [new_child]
+        self._child_configs_by_path[new_child.settings.config_location.absolute()] = (
+            new_child
+        )
+        if not new_child.applied_templates:
+            # Existing applied templates are not in this config, so only index new ones
+            self._root_applied_templates.setdefault(
+                new_child.settings.config_location.absolute(), []
+            )
         return new_child
 
     def _get_child_config_by_path(self, path: Path) -> "FlexlateConfig":
+        absolute_path = path.absolute()
+        try:
+            return self._child_configs_by_path[absolute_path]
+        except KeyError:
+            pass
+        # Child configs may have relative locations, so the index can go stale
+        # if the working directory changes. Fall back to checking each one
         for child_config in self.child_configs:
-            if child_config.settings.config_location.absolute() == path.absolute():
+            if child_config.settings.config_location.absolute() == absolute_path:
                 return child_config
         raise FlexlateConfigFileNotExistsException(
             f"could not find config with path {path}"
@@ -541,37 +713,110 @@ class FlexlateConfig(BaseConfig):
         extra = Extra.allow
 
 
+# Folders which never contain flexlate configs for the project, so they
+# are not searched. Virtual environments are detected by their pyvenv.cfg
+IGNORED_CONFIG_SEARCH_FOLDERS: Final[FrozenSet[str]] = frozenset(
+    (
+        ".git",
+        ".hg",
+        ".svn",
+        "node_modules",
+        "__pycache__",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".tox",
+        ".nox",
+    )
+)
+NESTED_CONFIG_SEARCH_THREADS: Final[int] = 8
+
+parsed_config_cache = ParsedConfigCache()
+
+
+def _parsed_config_key_extra(cls: Type[FlexlateConfig]) -> str:
+    # Settings from environment variables are applied during parsing, so they
+    # must be part of the key. Look them up directly rather than getting the
+    # env values from pydantic, as that is as slow as parsing
+    env_values = [
+        (name, os.environ.get(name), os.environ.get(name.upper()))
+        for field in cls.__fields__.values()
+        for name in sorted(field.field_info.extra.get("env_names", ()))
+    ]
+    return repr(env_values)
+
+
 def _load_nested_configs(
     root: Path, file_name: str, orig_root: Path, adjust_applied_paths: bool = True
 ) -> List["FlexlateConfig"]:
     configs: List["FlexlateConfig"] = []
-    path = root / file_name
-    if path.exists():
-        relative_path = root.relative_to(orig_root)
+    for path in _find_nested_config_paths(root, file_name):
+        relative_path = path.parent.relative_to(orig_root)
         config = FlexlateConfig.load(path)
         # Because we are combining configs, need to update the root for the applied templates
         if adjust_applied_paths:
             for applied_template in config.applied_templates:
                 applied_template.root = relative_path / applied_template.root
         configs.append(config)
-    for folder_or_file in root.iterdir():
-        if folder_or_file.is_dir():
-            # Check to see if this is a nested flexlate project. If so, don't load the config,
-            # instead that config should be associated with the nested project.
-            if (folder_or_file / "flexlate-project.json").exists():
-                continue
-
-            configs.extend(
-                _load_nested_configs(
-                    folder_or_file,
-                    file_name,
-                    orig_root,
-                    adjust_applied_paths=adjust_applied_paths,
-                )
-            )
     return configs
 
 
+def _find_nested_config_paths(root: Path, file_name: str) -> List[Path]:
+    """
+    Finds config files in root and all its sub-folders, in the order of a depth-first
+    search with folders sorted by name. Separate top-level folders are searched in
+    parallel, as each search is mostly waiting on the file system
+    """
+    found_paths, sub_folders = _scan_folder_for_config(root, file_name, is_root=True)
+    if len(sub_folders) > 1:
+        with ThreadPoolExecutor(max_workers=NESTED_CONFIG_SEARCH_THREADS) as executor:
+            for paths in executor.map(
+                lambda folder: _find_config_paths_in_sub_folder(folder, file_name),
+                sub_folders,
+            ):
+                found_paths.extend(paths)
+    else:
+        for folder in sub_folders:
+            found_paths.extend(_find_config_paths_in_sub_folder(folder, file_name))
+    return [Path(path) for path in found_paths]
+
+
+def _find_config_paths_in_sub_folder(folder: str, file_name: str) -> List[str]:
+    found_paths, sub_folders = _scan_folder_for_config(folder, file_name)
+    for sub_folder in sub_folders:
+        found_paths.extend(_find_config_paths_in_sub_folder(sub_folder, file_name))
+    return found_paths
+
+
+def _scan_folder_for_config(
+    folder: Union[str, Path], file_name: str, is_root: bool = False
+) -> Tuple[List[str], List[str]]:
+    """
+    :return: config paths in the folder, and sub-folders to search next
+    """
+    try:
+        with os.scandir(folder) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return [], []
+    names = {entry.name for entry in entries}
+    if not is_root and (
+        # Check to see if this is a nested flexlate project. If so, don't load the config,
+        # instead that config should be associated with the nested project.
+        "flexlate-project.json" in names
+        or "pyvenv.cfg" in names
+    ):
+        return [], []
+    found_paths: List[str] = []
+    if file_name in names:
+        found_paths.append(os.path.join(folder, file_name))
+    sub_folders = [
+        entry.path
+        for entry in entries
+        if entry.name not in IGNORED_CONFIG_SEARCH_FOLDERS and entry.is_dir()
+    ]
+    return found_paths, sub_folders
+
+
 class ProjectConfig(BaseModel):
     path: Path
     default_add_mode: AddMode = AddMode.LOCAL
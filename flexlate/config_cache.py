@@ -0,0 +1,107 @@
+import hashlib
+import os
+import pickle
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, TypeVar
+
+# Files modified this recently may be modified again within the resolution
+# of the file system timestamp, so their stat alone cannot be trusted
+_RACY_MTIME_NS = 2_000_000_000
+
+T = TypeVar("T")
+
+
+@dataclass
+class _CachedConfig:
+    mtime_ns: int
+    size: int
+    content_key: str
+    pickled: bytes
+
+
+class ParsedConfigCache:
+    """
+    Caches parsed and validated configs in memory, so that loading the same
+    unchanged config file again does not need to parse and validate it again
+
+    Configs are keyed by path, stat and content. They are stored pickled and a
+    new copy is unpickled for every load, as callers are free to modify the
+    configs they load.
+    """
+
+    def __init__(self):
+        self._configs: Dict[str, _CachedConfig] = {}
+        self._lock = Lock()
+
+    def load(self, path: Path, parse: Callable[[], T], key_extra: str = "") -> T:
+        """
+        Gets the parsed config for the path, parsing it only if the file
+        has changed since it was last parsed
+
+        :param path: The config file location, exactly as it will be passed to parse
+        :param parse: Parses and validates the config file
+        :param key_extra: Anything else that affects the parsed config, such as
+            environment variables applied during parsing
+        :return: The parsed config
+        """
+        memory_key = f"{path}\0{path.absolute()}"
+        stat = os.stat(path)
+        with self._lock:
+            cached = self._configs.get(memory_key)
+        if (
+            cached is not None
+            and cached.mtime_ns == stat.st_mtime_ns
+            and cached.size == stat.st_size
+            and not _is_racy(stat.st_mtime_ns)
+        ):
+            return pickle.loads(cached.pickled)
+
+        content_key = _content_key(Path(path).read_bytes(), key_extra)
+        if cached is not None and cached.content_key == content_key:
+            pickled = cached.pickled
+            config = pickle.loads(pickled)
+        else:
+            config = parse()
+            try:
+                pickled = pickle.dumps(config)
+            except Exception:
+                # Config is not picklable, just don't cache it
+                return config
+        with self._lock:
+            self._configs[memory_key] = _CachedConfig(
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                content_key=content_key,
+                pickled=pickled,
+            )
+        return config
+
+    def invalidate(self, path: Path):
+        """
+        Forgets the parsed config for the path, should be called whenever the
+        config file is written or removed
+        """
+        absolute_path = str(path.absolute())
+        with self._lock:
+            for key in list(self._configs):
+                if key.endswith(f"\0{absolute_path}"):
+                    del self._configs[key]
+
+    def clear(self):
+        with self._lock:
+            self._configs.clear()
+
+
+def _content_key(content: bytes, key_extra: str) -> str:
+    hasher = hashlib.sha256()
+    hasher.update(key_extra.encode())
+    hasher.update(b"\0")
+    hasher.update(content)
+    return hasher.hexdigest()
+
+
+def _is_racy(mtime_ns: int) -> bool:
+    return abs(time.time_ns() - mtime_ns) < _RACY_MTIME_NS
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
 from flexlate.add_mode import AddMode, get_expanded_out_root
 from flexlate.config import (
@@ -9,6 +9,7 @@ from flexlate.config import (
     FlexlateConfig,
     FlexlateProjectConfig,
     ProjectConfig,
+    TemplateRegistry,
     TemplateSource,
     TemplateSourceWithTemplates,
 )
@@ -111,25 +112,13 @@ class ConfigManager:
         config: Optional[FlexlateConfig] = None,
     ) -> List[AppliedTemplateWithSource]:
         config = config or self.load_config(project_root)
-
-        # TODO: more efficient algorithm for getting applied templates with sources
-
-        def get_source_config_path(source_name: str) -> Path:
-            if config is None:
-                raise ValueError("should not hit this, for type narrowing")
-            for child_config in config.child_configs:
-                for source in child_config.template_sources:
-                    if source.name == source_name:
-                        return child_config.settings.config_location
-            raise ValueError(f"could not find source {source_name}")
-
         sources = config.template_sources_dict
         applied_template_with_sources: List[AppliedTemplateWithSource] = []
 
         for child_config in config.child_configs:
             for i, applied_template in enumerate(child_config.applied_templates):
                 source = sources[applied_template.name]
-                source_config_path = get_source_config_path(source.name)
+                source_config_path = config.get_template_source_config_path(source.name)
                 applied_template_config_path = child_config.settings.config_location
                 if (
                     relative_to is not None
@@ -158,8 +147,12 @@ class ConfigManager:
         config: Optional[FlexlateConfig] = None,
     ) -> List[Renderable]:
         config = config or self.load_config(project_root)
+        # Applied templates from the same source and version share a template
+        registry = TemplateRegistry()
         return [
-            Renderable.from_applied_template_with_source(applied_with_source)
+            Renderable.from_applied_template_with_source(
+                applied_with_source, registry=registry
+            )
             for applied_with_source in self.get_applied_templates_with_sources(
                 relative_to=relative_to, project_root=project_root, config=config
             )
@@ -186,9 +179,12 @@ class ConfigManager:
             relative_to=relative_to, project_root=project_root, config=config
         )
         templates: List[Template] = []
+        seen_identities: Set[Tuple[Any, ...]] = set()
         for renderable in renderables:
-            if renderable.template in templates:
+            identity = renderable.template.identity
+            if identity in seen_identities:
                 continue
+            seen_identities.add(identity)
             templates.append(renderable.template)
         return templates
 
@@ -378,6 +374,15 @@ class ConfigManager:
         config = self.load_config(project_root)
         return config.get_num_applied_templates_in_child_config(child_config_path)
 
+    def get_num_applied_templates_in_config_file(self, config_path: Path) -> int:
+        """
+        Gets the number of applied templates in a single config file, which
+        may not exist yet
+        """
+        if not config_path.exists():
+            return 0
+        return len(FlexlateConfig.load(config_path).applied_templates)
+
     def get_template_sources(
         self,
         names: Optional[Sequence[str]] = None,
@@ -1,17 +1,32 @@
+import hashlib
 import itertools
 import os
 import re
 import shutil
+import tempfile
+import uuid
+from collections import defaultdict
 from contextlib import contextmanager
 from pathlib import Path
-from typing import ContextManager, Generator, List, Optional, Sequence, Set, Tuple, cast
+from threading import Lock
+from typing import (
+    ContextManager,
+    Dict,
+    Final,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
-from git import Blob, Commit, Git, GitCommandError, Repo, Tree  # type: ignore
+from git import Commit, Git, GitCommandError, Head, Repo  # type: ignore
 
 from flexlate.exc import (
     CannotFindClonedTemplateException,
     GitRepoDirtyException,
     GitRepoHasNoCommitsException,
+    TriedToCommitButNoChangesException,
 )
 from flexlate.logger import log
 from flexlate.path_ops import change_directory_to, copy_flexlate_configs
@@ -19,6 +34,15 @@ from flexlate.temp_path import create_temp_path
 
 
 def checkout_template_branch(repo: Repo, branch_name: str, base_branch_name: str):
+    branch = create_template_branch_without_checkout(
+        repo, branch_name, base_branch_name
+    )
+    branch.checkout()
+
+
+def create_template_branch_without_checkout(
+    repo: Repo, branch_name: str, base_branch_name: str
+) -> Head:
     try:
         # Get branch if it exists already
         branch = repo.branches[branch_name]  # type: ignore
@@ -37,7 +61,7 @@ def checkout_template_branch(repo: Repo, branch_name: str, base_branch_name: str
             # Unknown error, raise it
             raise e
 
-    branch.checkout()
+    return branch
 
 
 def _get_initial_commit_sha(repo: Repo) -> str:
@@ -56,23 +80,20 @@ def stage_and_commit_all(repo: Repo, commit_message: str):
 def list_tracked_files(repo: Repo) -> Set[Path]:
     if repo.working_dir is None:
         raise ValueError("repo working dir should not be none")
-    return _list_tracked_files(repo.tree(), Path(repo.working_dir))
-
-
-def _list_tracked_files(tree: Tree, root_path: Path) -> Set[Path]:
-    # TODO: Fix multiple iterations over files for git traverse
-    #  For now just using a set to keep it working, but should optimize
-    files: Set[Path] = set()
-    for tree_or_blob in tree.traverse():
-        if hasattr(tree_or_blob, "traverse"):
-            # Got another tree
-            tree = cast(Tree, tree_or_blob)
-            files.update(_list_tracked_files(tree, root_path))
-        else:
-            # Got a blob
-            blob = cast(Blob, tree_or_blob)
-            files.add(root_path / Path(blob.path))
-    return files
+    return _list_tracked_files(repo, "HEAD", Path(repo.working_dir))
+
+
+def _list_tracked_files(repo: Repo, tree_ish: str, root_path: Path) -> Set[Path]:
+    return {
+        root_path / relative_path
+        for relative_path in _list_tracked_relative_paths(repo, tree_ish)
+    }
+
+
+def _list_tracked_relative_paths(repo: Repo, tree_ish: str) -> List[str]:
+    # Use NUL separators so that paths are not quoted or escaped by git
+    raw_output = repo.git.ls_tree("-r", "-z", "--name-only", tree_ish)
+    return [path for path in raw_output.split("\0") if path]
 
 
 def delete_all_tracked_files(repo: Repo):
@@ -82,23 +103,6 @@ def delete_all_tracked_files(repo: Repo):
         os.remove(path)
 
 
-def restore_initial_commit_files(repo: Repo):
-    if repo.working_dir is None:
-        raise ValueError("repo working dir must not be None")
-    inital_commit = _get_initial_commit(repo)
-    initial_commit_files = _list_tracked_files(
-        inital_commit.tree, Path(repo.working_dir)
-    )
-    for file in initial_commit_files:
-        if not file.exists():
-            _check_out_specific_file_from_commit(repo, inital_commit.hexsha, file)
-
-
-def _check_out_specific_file_from_commit(repo: Repo, commit_sha: str, file_path: Path):
-    relative_path = os.path.relpath(file_path, repo.working_dir)
-    repo.git.checkout(commit_sha, relative_path)
-
-
 def merge_branch_into_current(
     repo: Repo, branch_name: str, allow_conflicts: bool = True
 ):
@@ -111,6 +115,70 @@ def merge_branch_into_current(
         raise e
 
 
+# merge-tree only writes the merged tree from this version
+MERGE_TREE_WRITE_TREE_MIN_GIT_VERSION: Final[Tuple[int, int]] = (2, 38)
+
+
+def merge_branch_into_branch_without_checkout(
+    repo: Repo, branch_name: str, merge_branch_name: str
+) -> bool:
+    """
+    Merges one branch into another in memory with git merge-tree, so that the
+    working tree is not touched. The branch being merged into must already exist.
+
+    :return: Whether the merge was made. If there are conflicts or the installed git
+        cannot merge in memory, nothing is changed and the merge must be done in a
+        working tree instead
+    """
+    branch_sha = repo.branches[branch_name].commit.hexsha  # type: ignore
+    merge_sha = repo.branches[merge_branch_name].commit.hexsha  # type: ignore
+    if repo.is_ancestor(merge_sha, branch_sha):
+        # Already up to date
+        return True
+    if repo.is_ancestor(branch_sha, merge_sha):
+        # Fast-forward, same as git merge
+        repo.git.update_ref(
+            "-m",
+            f"merge {merge_branch_name}: Fast-forward",
+            f"refs/heads/{branch_name}",
+            merge_sha,
+            branch_sha,
+        )
+        return True
+    if repo.git.version_info < MERGE_TREE_WRITE_TREE_MIN_GIT_VERSION:
+        log.debug(
+            f"git merge-tree --write-tree is not supported by git "
+            f"{'.'.join(str(part) for part in repo.git.version_info)}, "
+            f"will merge in a working tree"
+        )
+        return False
+    try:
+        tree_sha = repo.git.merge_tree("--write-tree", branch_sha, merge_sha)
+    except GitCommandError as e:
+        if e.status != 1:
+            # Nothing has been changed yet, so the merge can still be done normally
+            log.debug(f"Could not merge with git merge-tree: {e}")
+        # Otherwise conflicts, the output also has the conflict info after the tree
+        return False
+    commit_sha = repo.git.commit_tree(
+        tree_sha,
+        "-p",
+        branch_sha,
+        "-p",
+        merge_sha,
+        "-m",
+        f"Merge branch '{merge_branch_name}' into {branch_name}",
+    )
+    repo.git.update_ref(
+        "-m",
+        f"merge {merge_branch_name}: Merge made by merge-tree",
+        f"refs/heads/{branch_name}",
+        commit_sha,
+        branch_sha,
+    )
+    return True
+
+
 def get_current_version(repo: Repo) -> str:
     return repo.head.commit.hexsha
 
@@ -189,6 +257,182 @@ def temp_repo_that_pushes_to_branch(  # type: ignore
         )
 
 
+class TempBranchWorkTree:
+    """
+    A temporary folder to make changes to a branch, without cloning the repo
+    or checking out the branch
+
+    Changes are tracked with a separate index file and committed directly to the
+    branch in the original repo with git plumbing commands.
+    """
+
+    def __init__(
+        self,
+        repo: Repo,
+        branch_name: str,
+        working_dir: Path,
+        index_path: Path,
+        staging_git_dir: Path,
+        parent_sha: str,
+    ):
+        self.repo = repo
+        self.branch_name = branch_name
+        self.working_dir = working_dir
+        self.parent_sha = parent_sha
+        # To only update the branch if it has not changed since the work tree was created
+        self._orig_branch_sha = get_branch_sha(repo, branch_name)
+        self._git = Git(str(working_dir))
+        self._env = {
+            "GIT_DIR": str(Path(repo.git_dir).resolve()),
+            "GIT_WORK_TREE": str(working_dir),
+            "GIT_INDEX_FILE": str(index_path),
+        }
+        # Staging reads ignore rules from the git dir, use one without the
+        # repo's info/exclude so that the same files are committed as from a clone
+        self._staging_env = {
+            **self._env,
+            "GIT_DIR": str(staging_git_dir),
+            "GIT_OBJECT_DIRECTORY": str(Path(repo.common_dir).resolve() / "objects"),
+        }
+
+    def check_out_parent_files(self):
+        self.git("read-tree", self.parent_sha)
+        # Also records the stat info so unchanged files are not hashed again when staging
+        self.git("checkout-index", "--all", "--force", "-u")
+
+    def restore_missing_initial_commit_files(self):
+        """
+        Adds back any files from the initial commit which are not in the working
+        directory, must be called after staging as the files are only added to the index
+        """
+        initial_commit_sha = self.git("rev-list", "--max-parents=0", self.parent_sha)
+        entries = self.git("ls-tree", "-r", "-z", "--full-tree", initial_commit_sha)
+        missing_entries = [
+            entry
+            for entry in entries.split("\0")
+            if entry and not (self.working_dir / entry.split("\t", 1)[1]).exists()
+        ]
+        if not missing_entries:
+            return
+        # Pass entries through a file to update all of them in one command
+        with tempfile.TemporaryFile() as f:
+            f.write(b"".join(f"{entry}\0".encode() for entry in missing_entries))
+            f.seek(0)
+            self.git("update-index", "-z", "--index-info", istream=f)
+
+    def stage_all(self):
+        self.git("add", "-A", env=self._staging_env)
+
+    def commit_staged(self, commit_message: str) -> str:
+        """
+        Commits the staged changes onto the branch, creating it if needed
+
+        :return: The new commit sha
+        """
+        tree_sha = self.git("write-tree")
+        if tree_sha == self.git("rev-parse", f"{self.parent_sha}^{{tree}}"):
+            raise TriedToCommitButNoChangesException(
+                f"Nothing to commit to {self.branch_name}"
+            )
+        commit_sha = self.git(
+            "commit-tree",
+            tree_sha,
+            "-p",
+            self.parent_sha,
+            "-m",
+            self._clean_up_commit_message(commit_message),
+        )
+        self.git(
+            "update-ref",
+            "-m",
+            f"flexlate: {commit_message.splitlines()[0]}",
+            f"refs/heads/{self.branch_name}",
+            commit_sha,
+            # All zeros means the branch must not exist yet
+            self._orig_branch_sha or "0" * 40,
+        )
+        # Later commits build on this one
+        self.parent_sha = commit_sha
+        self._orig_branch_sha = commit_sha
+        return commit_sha
+
+    def _clean_up_commit_message(self, commit_message: str) -> str:
+        # commit-tree uses the message as is, clean it up the same way as git commit
+        with tempfile.TemporaryFile() as f:
+            f.write(commit_message.encode())
+            f.seek(0)
+            return self.git("stripspace", istream=f)
+
+    def git(
+        self, command: str, *args: str, env: Optional[Dict[str, str]] = None, **kwargs
+    ) -> str:
+        git_command = getattr(self._git, command.replace("-", "_"))
+        return git_command(*args, env=env or self._env, **kwargs)
+
+
+@contextmanager  # type: ignore
+def temp_work_tree_for_branch(  # type: ignore
+    repo: Repo,
+    branch_name: str,
+    base_branch_name: str,
+    delete_tracked_files: bool = False,
+    copy_current_configs: bool = True,
+    remote: str = "origin",
+) -> ContextManager[TempBranchWorkTree]:
+    """
+    Creates a temporary work tree for the branch, which works the same as
+    temp_repo_that_pushes_to_branch except that only commits made through
+    the work tree are saved to the branch
+    """
+    if repo.working_dir is None:
+        raise ValueError("repo working dir must not be None")
+    parent_sha = get_branch_sha(repo, branch_name)
+    if parent_sha is None:
+        log.debug(f"{branch_name} does not exist, will create")
+        # Start from the base branch if it exists, otherwise the initial commit
+        _update_local_branch_from_remote_without_checkout(
+            repo, base_branch_name, remote=remote
+        )
+        parent_sha = get_branch_sha(repo, base_branch_name)
+        if parent_sha is None:
+            parent_sha = _get_initial_commit_sha(repo)
+    folder_name = Path(repo.working_dir).name
+    with create_temp_path() as tmp_dir:
+        working_dir = tmp_dir / folder_name
+        working_dir.mkdir()
+        log.debug(
+            f"Creating temp work tree at {working_dir} for branch {branch_name} from {parent_sha}"
+        )
+        staging_git_dir = tmp_dir / "git"
+        _create_git_dir_for_staging(repo, staging_git_dir)
+        work_tree = TempBranchWorkTree(
+            repo,
+            branch_name,
+            working_dir,
+            tmp_dir / "index",
+            staging_git_dir,
+            parent_sha,
+        )
+        if not delete_tracked_files:
+            work_tree.check_out_parent_files()
+        if copy_current_configs:
+            copy_flexlate_configs(
+                Path(repo.working_dir), working_dir, Path(repo.working_dir)
+            )
+        yield work_tree
+
+
+def _create_git_dir_for_staging(repo: Repo, git_dir: Path):
+    """
+    Creates an empty git dir which uses the same config as the repo, but
+    has no info/exclude. Objects must be read from the repo's object directory
+    """
+    (git_dir / "refs").mkdir(parents=True)
+    (git_dir / "HEAD").write_text("ref: refs/heads/flexlate-staging\n")
+    repo_config_path = (Path(repo.common_dir).resolve() / "config").as_posix()
+    (git_dir / "config").write_text(f'[include]\n\tpath = "{repo_config_path}"\n')
+
+
 def _clone_from_local_repo(
     repo: Repo,
     out_dir: Path,
@@ -231,10 +475,16 @@ def _clone_single_branch_from_local_repo(
         else:
             use_branch_name = repo.active_branch.name
 
-    # Branch exists, clone only that branch
+    # Branch exists, clone only that branch. Share the objects with the original
+    # repo rather than copying them, as the temp repo only lives for one operation
     log.debug(f"Creating branch {use_branch_name} in the temporary repo")
     repo.git.clone(
-        repo.working_dir, "--branch", use_branch_name, "--single-branch", out_dir
+        repo.working_dir,
+        "--shared",
+        "--branch",
+        use_branch_name,
+        "--single-branch",
+        out_dir,
     )
     temp_repo = Repo(out_dir)
 
@@ -258,6 +508,8 @@ def _clone_specific_branches_from_local_repo(
     remote: str = "origin",
 ) -> Repo:
     temp_repo = Repo.init(out_dir)
+    # Equivalent of clone --shared, so that the fetch does not need to copy any objects
+    _add_alternate_object_store(temp_repo, repo)
     valid_branches = [name for name in branch_names if branch_exists(repo, name)]
     branch_arguments = list(
         itertools.chain(*[["-t", branch] for branch in valid_branches])
@@ -278,6 +530,14 @@ def _clone_specific_branches_from_local_repo(
     return temp_repo
 
 
+def _add_alternate_object_store(repo: Repo, alternate_repo: Repo):
+    alternates_path = Path(repo.git_dir) / "objects" / "info" / "alternates"
+    alternates_path.parent.mkdir(parents=True, exist_ok=True)
+    alternate_objects_path = Path(alternate_repo.common_dir).resolve() / "objects"
+    with open(alternates_path, "a") as f:
+        f.write(f"{alternate_objects_path}\n")
+
+
 def _update_local_branch_from_remote_without_checkout(
     repo: Repo, branch_name: str, remote: str = "origin"
 ):
@@ -372,6 +632,10 @@ def assert_repo_is_in_clean_state(repo: Repo):
 
 def get_repo_remote_name_from_repo(repo: Repo) -> str:
     url = list(repo.remote().urls)[0]
+    return get_repo_remote_name_from_url(url)
+
+
+def get_repo_remote_name_from_url(url: str) -> str:
     parts = url.split("/")
     name_part = parts[-1]
     # Remove .git on end if it exists
@@ -381,26 +645,104 @@ def get_repo_remote_name_from_repo(repo: Repo) -> str:
     return name_part
 
 
+MIRRORS_FOLDER_NAME = ".mirrors"
+_FULL_SHA_REGEX = re.compile(r"^[0-9a-f]{40}$")
+_mirror_locks: Dict[Path, Lock] = defaultdict(Lock)
+_mirror_locks_lock = Lock()
+
+
 def clone_repo_at_version_get_repo_and_name(
     path: str, dst_folder: Path, version: Optional[str] = None
 ) -> Tuple[Repo, str]:
-    with create_temp_path() as temp_dir:
-        repo = Repo.clone_from(path, temp_dir)
-        name = get_repo_remote_name_from_repo(repo)
-        if version:
-            checkout_version(repo, version)
-        else:
-            version = get_current_version(repo)
-        template_root = dst_folder / name
+    """
+    Gets a checkout of the remote repo at the version, in dst_folder/name/version
+
+    A bare mirror of each remote is kept in dst_folder and updated with fetch, so
+    the remote is only ever cloned once. Each version is only checked out if it
+    has not been already, with a local clone of the mirror which hard links
+    the objects rather than copying them.
+
+    :param path: The remote url
+    :param dst_folder: The folder holding the mirrors and version checkouts
+    :param version: The version to check out, defaults to the latest version
+    :return: The checked out repo and the name of the remote
+    """
+    name = get_repo_remote_name_from_url(path)
+    template_root = dst_folder / name
+    if version is not None:
         full_destination = template_root / version
-        if not template_root.exists():
-            template_root.mkdir(parents=True)
-        if not full_destination.exists():
-            # Have not cloned this version previously
-            shutil.copytree(temp_dir, full_destination)
+        if full_destination.exists():
+            # Have cloned this version previously, no need to touch the remote
+            return Repo(full_destination), name
+
+    mirror_path = _get_mirror_path(path, name, dst_folder)
+    with _get_mirror_lock(mirror_path):
+        mirror = _get_updated_mirror(path, mirror_path, version)
+        commit_sha = mirror.git.rev_parse("--verify", f"{version or 'HEAD'}^{{commit}}")
+    version = version or commit_sha
+    full_destination = template_root / version
+    if not full_destination.exists():
+        _check_out_mirror_at_commit(path, mirror_path, commit_sha, full_destination)
     return Repo(full_destination), name
 
 
+def _get_mirror_path(url: str, name: str, dst_folder: Path) -> Path:
+    url_hash = hashlib.sha256(url.encode()).hexdigest()[:16]
+    return dst_folder / MIRRORS_FOLDER_NAME / f"{name}-{url_hash}.git"
+
+
+def _get_mirror_lock(mirror_path: Path) -> Lock:
+    with _mirror_locks_lock:
+        return _mirror_locks[mirror_path]
+
+
+def _get_updated_mirror(url: str, mirror_path: Path, version: Optional[str]) -> Repo:
+    if not mirror_path.exists():
+        mirror_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = mirror_path.with_name(f"{mirror_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            Repo.clone_from(url, temp_path, mirror=True)
+            os.rename(temp_path, mirror_path)
+        except OSError:
+            # Another process created the mirror first
+            if not mirror_path.exists():
+                raise
+        finally:
+            shutil.rmtree(temp_path, ignore_errors=True)
+        return Repo(mirror_path)
+
+    mirror = Repo(mirror_path)
+    if version is not None and _FULL_SHA_REGEX.match(version):
+        try:
+            mirror.git.cat_file("-e", f"{version}^{{commit}}")
+            # Already have the commit and commits never change, so no need to fetch
+            return mirror
+        except GitCommandError:
+            pass
+    mirror.git.fetch("--prune", "origin")
+    return mirror
+
+
+def _check_out_mirror_at_commit(
+    url: str, mirror_path: Path, commit_sha: str, out_path: Path
+):
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = out_path.with_name(f"{out_path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        repo = Repo.clone_from(str(mirror_path), temp_path, no_checkout=True)
+        repo.git.checkout("--detach", commit_sha)
+        # Point to the remote rather than the mirror, as if it were cloned directly
+        repo.git.remote("set-url", "origin", url)
+        repo.close()
+        os.rename(temp_path, out_path)
+    except OSError:
+        # Another process checked out this version first
+        if not out_path.exists():
+            raise
+    finally:
+        shutil.rmtree(temp_path, ignore_errors=True)
+
+
 def checkout_version(repo: Repo, version: str):
     repo.git.checkout(version)
 
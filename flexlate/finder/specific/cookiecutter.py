@@ -1,4 +1,3 @@
-import json
 import os.path
 from pathlib import Path
 from typing import Optional
@@ -11,6 +10,7 @@ from flexlate.finder.specific.git import (
     get_version_from_source_path,
 )
 from flexlate.template.cookiecutter import CookiecutterTemplate
+from flexlate.template_config.cache import load_cookiecutter_config_data
 from flexlate.template_config.cookiecutter import CookiecutterConfig
 
 
@@ -40,8 +40,7 @@ class CookiecutterFinder(TemplateFinder[CookiecutterTemplate]):
         )
 
     def get_config(self, directory: Path) -> CookiecutterConfig:
-        config_path = directory / "cookiecutter.json"
-        data = json.loads(config_path.read_text())
+        data = load_cookiecutter_config_data(directory)
         return CookiecutterConfig(data)
 
     def matches_template_type(self, path: Path) -> bool:
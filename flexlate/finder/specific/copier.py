@@ -2,7 +2,6 @@ from pathlib import Path
 from typing import Dict, Optional, TypedDict
 
 from copier.config.factory import filter_config
-from copier.config.user_data import load_config_data
 
 from flexlate.finder.specific.base import TemplateFinder
 from flexlate.finder.specific.git import (
@@ -10,6 +9,7 @@ from flexlate.finder.specific.git import (
     get_version_from_source_path,
 )
 from flexlate.template.copier import CopierTemplate
+from flexlate.template_config.cache import load_copier_config_data
 from flexlate.template_config.copier import CopierConfig
 from flexlate.template_data import TemplateData
 
@@ -37,7 +37,7 @@ class CopierFinder(TemplateFinder[CopierTemplate]):
         )
 
     def get_config(self, directory: Path) -> CopierConfig:
-        raw_data = load_config_data(directory, quiet=True)
+        raw_data = load_copier_config_data(directory)
         defaults: QuestionsWithDefaults
         _, defaults = filter_config(raw_data)
         data: TemplateData = {}
@@ -5,6 +5,7 @@ from git import Repo
 
 from flexlate.add_mode import AddMode
 from flexlate.adder import Adder
+from flexlate.batcher import Batcher
 from flexlate.bootstrapper import Bootstrapper
 from flexlate.branch_update import get_flexlate_branch_name
 from flexlate.checker import Checker, CheckResults, CheckResultsRenderable
@@ -12,6 +13,7 @@ from flexlate.config_manager import ConfigManager
 from flexlate.constants import DEFAULT_MERGED_BRANCH_NAME, DEFAULT_TEMPLATE_BRANCH_NAME
 from flexlate.finder.multi import MultiFinder
 from flexlate.logger import log
+from flexlate.manifest import BatchManifest
 from flexlate.merger import Merger
 from flexlate.pusher import Pusher
 from flexlate.remover import Remover
@@ -33,6 +35,7 @@ class Flexlate:
         self,
         quiet: bool = False,
         adder: Adder = Adder(),
+        batcher: Batcher = Batcher(),
         bootstrapper: Bootstrapper = Bootstrapper(),
         checker: Checker = Checker(),
         remover: Remover = Remover(),
@@ -51,6 +54,7 @@ class Flexlate:
         console.quiet = quiet
 
         self.adder = adder
+        self.batcher = batcher
         self.bootstrapper = bootstrapper
         self.checker = checker
         self.remover = remover
@@ -257,6 +261,39 @@ class Flexlate:
             renderer=self.renderer,
         )
 
+    def apply_manifest(
+        self,
+        manifest_path: Path,
+        no_input: bool = False,
+        project_path: Path = Path("."),
+    ):
+        manifest = BatchManifest.load(manifest_path)
+        transaction = FlexlateTransaction(
+            type=TransactionType.BATCH, target=str(manifest_path)
+        )
+        project_config = self.config_manager.load_project_config(project_path)
+        repo = Repo(project_config.path)
+        self.batcher.apply_manifest(
+            repo,
+            manifest,
+            transaction,
+            default_add_mode=project_config.default_add_mode,
+            no_input=no_input,
+            merged_branch_name=get_flexlate_branch_name(
+                repo, project_config.merged_branch_name
+            ),
+            base_merged_branch_name=project_config.merged_branch_name,
+            template_branch_name=get_flexlate_branch_name(
+                repo, project_config.template_branch_name
+            ),
+            base_template_branch_name=project_config.template_branch_name,
+            remote=project_config.remote,
+            config_manager=self.config_manager,
+            finder=self.finder,
+            updater=self.updater,
+            renderer=self.renderer,
+        )
+
     def update(
         self,
         names: Optional[List[str]] = None,
@@ -265,6 +302,7 @@ class Flexlate:
         abort_on_conflict: bool = False,
         no_cleanup: bool = False,
         project_path: Path = Path("."),
+        jobs: int = 1,
     ):
         transaction = FlexlateTransaction(
             type=TransactionType.UPDATE,
@@ -316,6 +354,7 @@ class Flexlate:
             ),
             base_template_branch_name=project_config.template_branch_name,
             remote=project_config.remote,
+            jobs=jobs,
             renderer=self.renderer,
             config_manager=self.config_manager,
         )
@@ -336,10 +375,24 @@ class Flexlate:
             base_template_branch_name=project_config.template_branch_name,
         )
 
+    def rebuild_transaction_index(self, project_path: Path = Path(".")):
+        project_config = self.config_manager.load_project_config(project_path)
+        repo = Repo(project_config.path)
+        self.undoer.rebuild_transaction_index(
+            repo,
+            merged_branch_name=get_flexlate_branch_name(
+                repo, project_config.merged_branch_name
+            ),
+            template_branch_name=get_flexlate_branch_name(
+                repo, project_config.template_branch_name
+            ),
+        )
+
     def sync(
         self,
         prompt: bool = False,
         project_path: Path = Path("."),
+        jobs: int = 1,
     ):
         project_config = self.config_manager.load_project_config(project_path)
         repo = Repo(project_config.path)
@@ -359,6 +412,7 @@ class Flexlate:
             base_template_branch_name=project_config.template_branch_name,
             no_input=not prompt,
             remote=project_config.remote,
+            jobs=jobs,
             updater=self.updater,
             renderer=self.renderer,
             config_manager=self.config_manager,
@@ -0,0 +1,57 @@
+from pathlib import Path
+from typing import List, Optional
+
+import yaml
+from pydantic import BaseModel, Extra, Field
+
+from flexlate.add_mode import AddMode
+from flexlate.template_data import TemplateData
+
+
+class ManifestModel(BaseModel):
+    class Config:
+        extra = Extra.forbid
+
+
+class ManifestSourceToAdd(ManifestModel):
+    path: str
+    name: Optional[str] = None
+    target_version: Optional[str] = None
+    template_root: Path = Path(".")
+    add_mode: Optional[AddMode] = None
+
+
+class ManifestOutputToAdd(ManifestModel):
+    name: str
+    out_root: Path = Path(".")
+    data: Optional[TemplateData] = None
+    add_mode: Optional[AddMode] = None
+
+
+class ManifestSourceToRemove(ManifestModel):
+    name: str
+    template_root: Path = Path(".")
+
+
+class ManifestOutputToRemove(ManifestModel):
+    name: str
+    out_root: Path = Path(".")
+
+
+class BatchManifest(ManifestModel):
+    """
+    Template sources and outputs to add and remove together in one operation.
+
+    Paths are relative to the current directory, the same as when passing
+    them to the individual commands.
+    """
+
+    add_sources: List[ManifestSourceToAdd] = Field(default_factory=list)
+    add_outputs: List[ManifestOutputToAdd] = Field(default_factory=list)
+    remove_outputs: List[ManifestOutputToRemove] = Field(default_factory=list)
+    remove_sources: List[ManifestSourceToRemove] = Field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: Path) -> "BatchManifest":
+        # YAML is a superset of JSON, so this handles either format
+        return cls.parse_obj(yaml.safe_load(path.read_text()) or {})
@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from typing import Tuple
 
 from git import Repo
 
@@ -119,35 +120,13 @@ class Remover:
             raise ValueError("repo working dir should not be none")
 
         project_root = Path(repo.working_dir)
-        template = config_manager.get_template_by_name(
-            template_name, project_root=project_root
-        )
-
-        # Determine location of config
-        # Need to get renderable to render path in case it is templated
-        # TODO: can use get all renderables
-        renderables = config_manager.get_renderables_for_updates(
-            config_manager.get_no_op_updates(project_root=project_root),
-            project_root=project_root,
-        )
-        if len(renderables) == 0:
-            raise CannotRemoveAppliedTemplateException(
-                f"Cannot find any applied template with name {template_name} "
-                f"because there are no applied templates"
-            )
-        renderable = renderables[0]
-        new_relative_out_root = Path(
-            renderer.render_string(
-                str(template.render_relative_root_in_output), renderable
-            )
-        )
-        full_local_config_out_root = out_root / new_relative_out_root
-        config_path = determine_config_path_from_roots_and_add_mode(
-            full_local_config_out_root, project_root, add_mode
-        )
-
-        expanded_out_root = get_expanded_out_root(
-            out_root, project_root, template.render_relative_root_in_output, add_mode
+        config_path, expanded_out_root = get_applied_template_config_path_and_out_root(
+            template_name,
+            out_root,
+            project_root,
+            add_mode,
+            config_manager=config_manager,
+            renderer=renderer,
         )
 
         with console.status(styled("Removing applied template...", INFO_STYLE)):
@@ -224,6 +203,51 @@ class Remover:
             )
 
 
+def get_applied_template_config_path_and_out_root(
+    template_name: str,
+    out_root: Path,
+    project_root: Path,
+    add_mode: AddMode,
+    config_manager: ConfigManager = ConfigManager(),
+    renderer: MultiRenderer = MultiRenderer(),
+) -> Tuple[Path, Path]:
+    """
+    Determines where the config is for an existing applied template and the
+    out root of the applied template as stored in that config
+
+    :return: The config path and the expanded out root
+    """
+    template = config_manager.get_template_by_name(
+        template_name, project_root=project_root
+    )
+
+    # Determine location of config
+    # Need to get renderable to render path in case it is templated
+    # TODO: can use get all renderables
+    renderables = config_manager.get_renderables_for_updates(
+        config_manager.get_no_op_updates(project_root=project_root),
+        project_root=project_root,
+    )
+    if len(renderables) == 0:
+        raise CannotRemoveAppliedTemplateException(
+            f"Cannot find any applied template with name {template_name} "
+            f"because there are no applied templates"
+        )
+    renderable = renderables[0]
+    new_relative_out_root = Path(
+        renderer.render_string(str(template.render_relative_root_in_output), renderable)
+    )
+    full_local_config_out_root = out_root / new_relative_out_root
+    config_path = determine_config_path_from_roots_and_add_mode(
+        full_local_config_out_root, project_root, add_mode
+    )
+
+    expanded_out_root = get_expanded_out_root(
+        out_root, project_root, template.render_relative_root_in_output, add_mode
+    )
+    return config_path, expanded_out_root
+
+
 def _remove_template_source_commit_message(
     template_name: str, out_root: Path, project_root: Path
 ) -> str:
@@ -0,0 +1,108 @@
+import os
+import uuid
+from pathlib import Path
+from typing import Final, List, Optional, Tuple
+
+import appdirs
+from jinja2.bccache import Bucket, BytecodeCache
+
+JINJA_BYTECODE_CACHE_FOLDER = (
+    Path(appdirs.user_data_dir("flexlate")) / ".jinja-bytecode-cache"
+)
+JINJA_BYTECODE_CACHE_MAX_SIZE: Final[int] = 100 * 1024 * 1024
+
+_CACHE_FILE_SUFFIX = ".cache"
+
+
+class LRUFileSystemBytecodeCache(BytecodeCache):
+    """
+    A Jinja bytecode cache which stores compiled templates on disk, removing
+    the least recently used entries once the cache grows beyond its max size
+
+    Jinja keys each entry by the template name and file path and checks the
+    checksum of the template source before using it, so entries are never
+    used for a different version of a template.
+    """
+
+    def __init__(
+        self,
+        folder: Path = JINJA_BYTECODE_CACHE_FOLDER,
+        max_size: int = JINJA_BYTECODE_CACHE_MAX_SIZE,
+    ):
+        self.folder = folder
+        self.max_size = max_size
+        # Lazily determined on first write, then tracked as entries are added
+        self._size: Optional[int] = None
+
+    def load_bytecode(self, bucket: Bucket):
+        cache_path = self._get_cache_path(bucket)
+        try:
+            with open(cache_path, "rb") as f:
+                bucket.load_bytecode(f)
+            # Mark as recently used
+            os.utime(cache_path)
+        except OSError:
+            # Not cached yet, or was just evicted
+            pass
+
+    def dump_bytecode(self, bucket: Bucket):
+        cache_path = self._get_cache_path(bucket)
+        temp_path = cache_path.with_name(f"{cache_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                bucket.write_bytecode(f)
+            size = temp_path.stat().st_size
+            os.replace(temp_path, cache_path)
+        except OSError:
+            # Cache is not writable, the render itself is not affected
+            temp_path.unlink(missing_ok=True)
+            return
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._get_entries())
+        else:
+            self._size += size
+        if self._size > self.max_size:
+            self._evict()
+
+    def clear(self):
+        for path, _, _ in self._get_entries():
+            path.unlink(missing_ok=True)
+        self._size = 0
+
+    def _get_cache_path(self, bucket: Bucket) -> Path:
+        return self.folder / f"{bucket.key}{_CACHE_FILE_SUFFIX}"
+
+    def _get_entries(self) -> List[Tuple[Path, int, int]]:
+        """
+        :return: path, last used time, and size of each cache entry
+        """
+        entries: List[Tuple[Path, int, int]] = []
+        try:
+            with os.scandir(self.folder) as it:
+                for entry in it:
+                    if not entry.name.endswith(_CACHE_FILE_SUFFIX):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((Path(entry.path), stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _evict(self):
+        # Remove down to below the max size so that eviction does not happen on every write
+        target_size = int(self.max_size * 0.8)
+        entries = sorted(self._get_entries(), key=lambda entry: entry[1])
+        size = sum(size for _, _, size in entries)
+        for path, _, entry_size in entries:
+            if size <= target_size:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+        self._size = size
+
+
+jinja_bytecode_cache = LRUFileSystemBytecodeCache()
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Final, List, Optional, Tuple
+
+import appdirs
+from pydantic import BaseSettings
+
+from flexlate.render.renderable import Renderable
+from flexlate.template.types import TemplateType
+from flexlate.template_config.cache import get_cookiecutter_user_config
+from flexlate.template_data import TemplateData
+
+RENDER_CACHE_FOLDER = Path(appdirs.user_data_dir("flexlate")) / ".render-cache"
+RENDER_CACHE_MAX_ENTRIES: Final[int] = 256
+
+_OUTPUT_FOLDER_NAME = "output"
+_DATA_FILE_NAME = "data.json"
+_TEMP_ENTRY_SUFFIX = ".tmp"
+
+# Template features that can give different output for the same data: the current
+# time (jinja2_time for cookiecutter, now for copier), secrets, random choices,
+# and copier tasks and migrations. Cookiecutter hooks are checked separately
+_NON_DETERMINISTIC_PATTERN = re.compile(
+    rb"{%-?\s*now\b|\bnow\s*\(|\bmake_secret\b|\|\s*random\b"
+    rb"|^_tasks\s*:|^_migrations\s*:",
+    re.MULTILINE,
+)
+# Larger files are not scanned, they are treated as non-deterministic
+_MAX_SCANNED_FILE_SIZE: Final[int] = 1024 * 1024
+
+
+class RenderCacheConfig(BaseSettings):
+    enabled: bool = False
+    max_entries: int = RENDER_CACHE_MAX_ENTRIES
+
+    class Config:
+        env_prefix = "FLEXLATE_RENDER_CACHE_"
+
+
+class RenderCache:
+    """
+    An on-disk cache of rendered template output, keyed by everything that
+    determines the output of a non-interactive render
+
+    Each entry is a folder containing the rendered output tree and the data
+    that was used to render it. Entries are written to a temporary folder and
+    then renamed into place, so that concurrent renders never see a partial entry.
+    Once there are more than max_entries, the least recently used are removed.
+
+    Templates which may render differently for the same data, such as those with
+    hooks or that use the current time, are never cached.
+    """
+
+    def __init__(
+        self,
+        root: Path = RENDER_CACHE_FOLDER,
+        max_entries: int = RENDER_CACHE_MAX_ENTRIES,
+    ):
+        self.root = root
+        self.max_entries = max_entries
+
+    def key(self, renderable: Renderable) -> Optional[str]:
+        """
+        Creates the cache key for a renderable
+
+        :return: The key, or None if the renderable should not be cached
+        """
+        template = renderable.template
+        if _may_render_differently(template._type, template.path, template.version):
+            return None
+        key_data: Dict[str, Any] = dict(
+            type=template._type.value,
+            name=template.name,
+            path=str(template.path.resolve()),
+            git_url=template.git_url,
+            version=template.version,
+            data=renderable.data,
+            render_relative_root_in_template=str(
+                template.render_relative_root_in_template
+            ),
+            # Copier exposes the name of the output folder to the template
+            folder_name=renderable.out_root.name,
+        )
+        if template._type == TemplateType.COOKIECUTTER:
+            # Fills in any values not in the data
+            key_data["default_context"] = get_cookiecutter_user_config().get(
+                "default_context"
+            )
+        try:
+            canonical = json.dumps(key_data, sort_keys=True)
+        except TypeError:
+            return None
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def load(self, renderable: Renderable) -> Optional[TemplateData]:
+        """
+        Copies cached output into the renderable's out root, if it exists
+
+        :return: The data used for the cached render, or None on a cache miss
+        """
+        key = self.key(renderable)
+        if key is None:
+            return None
+        entry = self.root / key
+        data_path = entry / _DATA_FILE_NAME
+        if not data_path.exists():
+            return None
+        try:
+            data = json.loads(data_path.read_text())
+            shutil.copytree(
+                entry / _OUTPUT_FOLDER_NAME, renderable.out_root, dirs_exist_ok=True
+            )
+            # Mark as recently used
+            os.utime(data_path)
+        except FileNotFoundError:
+            # Evicted while loading
+            shutil.rmtree(renderable.out_root, ignore_errors=True)
+            return None
+        return data
+
+    def save(self, renderable: Renderable, data: TemplateData):
+        """
+        Stores the rendered output in the renderable's out root along with the data
+        that was used to render it
+        """
+        key = self.key(renderable)
+        if key is None or not renderable.out_root.exists():
+            return
+        try:
+            serialized_data = json.dumps(data)
+        except TypeError:
+            return
+        if json.loads(serialized_data) != data:
+            # Would not get back the same data on load, so don't cache
+            return
+        entry = self.root / key
+        if entry.exists():
+            return
+
+        temp_entry = self.root / f"{key}.{uuid.uuid4().hex}{_TEMP_ENTRY_SUFFIX}"
+        try:
+            shutil.copytree(renderable.out_root, temp_entry / _OUTPUT_FOLDER_NAME)
+            (temp_entry / _DATA_FILE_NAME).write_text(serialized_data)
+            os.rename(temp_entry, entry)
+        except OSError:
+            # Another process already stored this entry or the cache is not writable,
+            # either way the render itself succeeded
+            return
+        finally:
+            shutil.rmtree(temp_entry, ignore_errors=True)
+        self._evict()
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _get_entries(self) -> List[Tuple[Path, int]]:
+        """
+        :return: path and last used time of each cache entry
+        """
+        entries: List[Tuple[Path, int]] = []
+        try:
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if entry.name.endswith(_TEMP_ENTRY_SUFFIX):
+                        continue
+                    try:
+                        stat = os.stat(Path(entry.path) / _DATA_FILE_NAME)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((Path(entry.path), stat.st_mtime_ns))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _evict(self):
+        entries = self._get_entries()
+        if len(entries) <= self.max_entries:
+            return
+        # Remove down to below the max so that eviction does not happen on every save
+        num_to_remove = len(entries) - int(self.max_entries * 0.8)
+        for path, _ in sorted(entries, key=lambda entry: entry[1])[:num_to_remove]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class UseDefaultRenderCache:
+    """
+    Stands in for the render cache configured by the environment, so that the
+    settings are read when rendering rather than when a renderer is created
+    """
+
+
+USE_DEFAULT_RENDER_CACHE: Final[UseDefaultRenderCache] = UseDefaultRenderCache()
+
+
+def get_default_render_cache() -> Optional[RenderCache]:
+    """
+    The render cache is opt-in, enable it by setting FLEXLATE_RENDER_CACHE_ENABLED
+    """
+    config = RenderCacheConfig()
+    if not config.enabled:
+        return None
+    return RenderCache(max_entries=config.max_entries)
+
+
+@lru_cache(maxsize=None)
+def _may_render_differently(
+    template_type: TemplateType, template_path: Path, version: Optional[str]
+) -> bool:
+    if (
+        template_type == TemplateType.COOKIECUTTER
+        and (template_path / "hooks").is_dir()
+    ):
+        return True
+    for folder, dirs, files in os.walk(template_path):
+        if ".git" in dirs:
+            dirs.remove(".git")
+        for file in files:
+            path = Path(folder) / file
+            try:
+                if path.stat().st_size > _MAX_SCANNED_FILE_SIZE:
+                    return True
+                if _NON_DETERMINISTIC_PATTERN.search(path.read_bytes()):
+                    return True
+            except OSError:
+                return True
+    return False
@@ -1,9 +1,17 @@
+import math
 import os
 import shutil
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import Final, List, Sequence
+from typing import Dict, Final, List, Optional, Sequence, Tuple, Union
 
 from flexlate.exc import InvalidTemplateClassException, RendererNotFoundException
+from flexlate.render.cache import (
+    USE_DEFAULT_RENDER_CACHE,
+    RenderCache,
+    UseDefaultRenderCache,
+    get_default_render_cache,
+)
 from flexlate.render.renderable import Renderable
 from flexlate.render.specific.base import SpecificTemplateRenderer
 from flexlate.render.specific.cookiecutter import CookiecutterRenderer
@@ -18,23 +26,57 @@ renderers: Final[List[SpecificTemplateRenderer]] = [
     CopierRenderer(),
 ]
 
+# Files that are output by multiple renderables are appended in chunks of this
+# size so that large files are never fully loaded into memory
+MERGE_APPEND_CHUNK_SIZE: Final[int] = 1024 * 1024
+
 
 class MultiRenderer:
 
     # TODO: register method to add user-defined template types
 
+    def __init__(
+        self,
+        cache: Union[
+            RenderCache, UseDefaultRenderCache, None
+        ] = USE_DEFAULT_RENDER_CACHE,
+    ):
+        """
+        :param cache: The cache to reuse output of non-interactive renders from.
+            Pass None to always render. Defaults to no cache unless enabled
+            with FLEXLATE_RENDER_CACHE_ENABLED
+        """
+        self._cache = cache
+
+    @property
+    def cache(self) -> Optional[RenderCache]:
+        if isinstance(self._cache, UseDefaultRenderCache):
+            return get_default_render_cache()
+        return self._cache
+
     def render(
         self,
         renderables: Sequence[Renderable],
         project_root: Path = Path("."),
         no_input: bool = False,
+        jobs: int = 1,
     ) -> List[TemplateData]:
-        out_data: List[TemplateData] = []
+        """
+        Renders all the renderables into project root, merging the outputs
+
+        :param renderables: The renderables to render
+        :param project_root: The root of the project to output the rendered files to
+        :param no_input: Whether to skip prompting the user for all renderables.
+            Only renderables that do not prompt are loaded from or stored in the cache
+        :param jobs: The maximum number of processes to use for rendering. Renderables
+            that need to prompt the user are always rendered in the main process
+        :return: The data used to render each renderable, in the same order as the renderables
+        """
         with create_temp_path() as temp_root:
+            temp_renderables: List[Renderable] = []
             temp_folders: List[Path] = []
             for i, renderable in enumerate(renderables):
                 template = renderable.template
-                renderer = _get_specific_renderer(template)
                 temp_folder = temp_root / f"{i + 1}-{template.name}" / project_root.name
                 temp_folders.append(temp_folder)
                 if renderable.out_root.is_absolute():
@@ -44,12 +86,12 @@ class MultiRenderer:
                 else:
                     relative_root = renderable.out_root
                 new_root = temp_folder / relative_root
-                temp_renderable = renderable.copy(update=dict(out_root=new_root))
-                renderable_no_input = no_input or temp_renderable.skip_prompts
-                template_data = renderer.render(
-                    temp_renderable, no_input=renderable_no_input
-                )
-                out_data.append(template_data)
+                temp_renderables.append(renderable.copy(update=dict(out_root=new_root)))
+            out_data = _render_each(
+                temp_renderables, no_input=no_input, jobs=jobs, cache=self.cache
+            )
+            # Merge in the original order so that the output is the same regardless of
+            # the order in which the renderables finished rendering
             _merge_file_trees(temp_folders, project_root)
         return out_data
 
@@ -62,6 +104,21 @@ class MultiRenderer:
         renderer = _get_specific_renderer(template)
         return renderer.render_string(string, renderable)
 
+    def render_strings(
+        self,
+        strings: Sequence[str],
+        renderable: Renderable,
+    ) -> List[str]:
+        """
+        Renders multiple strings with the same renderable, only preparing
+        the template's data once
+
+        :return: The rendered strings, in the same order as the strings
+        """
+        template = renderable.template
+        renderer = _get_specific_renderer(template)
+        return renderer.render_strings(strings, renderable)
+
 
 def _get_specific_renderer(template: Template) -> SpecificTemplateRenderer:
     if template._type == TemplateType.BASE:
@@ -74,24 +131,172 @@ def _get_specific_renderer(template: Template) -> SpecificTemplateRenderer:
     raise RendererNotFoundException(f"No registered renderer for template {template}")
 
 
+def _render_each(
+    renderables: Sequence[Renderable],
+    no_input: bool = False,
+    jobs: int = 1,
+    cache: Optional[RenderCache] = None,
+) -> List[TemplateData]:
+    batches = _get_render_batches(renderables, no_input=no_input, jobs=jobs)
+    out_data: Dict[int, TemplateData] = {}
+    if jobs <= 1 or len(batches) <= 1:
+        for batch in batches:
+            batch_data = _render_batch(
+                [renderables[i] for i in batch], no_input=no_input, cache=cache
+            )
+            out_data.update(zip(batch, batch_data))
+        return [out_data[i] for i in range(len(renderables))]
+
+    # Prompts cannot be answered from a worker process, so only
+    # renderables that will not prompt are sent to the pool
+    futures: Dict[Tuple[int, ...], "Future[List[TemplateData]]"] = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for batch in batches:
+            if _will_prompt(renderables[batch[0]], no_input):
+                continue
+            futures[batch] = executor.submit(
+                _render_batch, [renderables[i] for i in batch], no_input, cache
+            )
+        for batch in batches:
+            if batch not in futures:
+                batch_data = _render_batch(
+                    [renderables[i] for i in batch], no_input=no_input
+                )
+                out_data.update(zip(batch, batch_data))
+        for batch, future in futures.items():
+            out_data.update(zip(batch, future.result()))
+    return [out_data[i] for i in range(len(renderables))]
+
+
+def _get_render_batches(
+    renderables: Sequence[Renderable], no_input: bool = False, jobs: int = 1
+) -> List[Tuple[int, ...]]:
+    """
+    Groups the renderables that do not prompt by template, so that each template
+    only needs to be loaded once for all its renderables. Renderables that
+    prompt are each in their own batch, so prompts are in the same order as the renderables
+
+    :return: Batches of indices of renderables
+    """
+    batches: List[Tuple[int, ...]] = []
+    template_groups: Dict[Tuple[TemplateType, Path, Optional[str]], List[int]] = {}
+    for i, renderable in enumerate(renderables):
+        template = renderable.template
+        if _will_prompt(renderable, no_input):
+            batches.append((i,))
+            continue
+        key = (template._type, template.path, template.version)
+        template_groups.setdefault(key, []).append(i)
+    for indices in template_groups.values():
+        # Split so that each process gets a share of the renderables for the template
+        batch_size = math.ceil(len(indices) / max(jobs, 1))
+        for start in range(0, len(indices), batch_size):
+            batches.append(tuple(indices[start : start + batch_size]))
+    return batches
+
+
+def _will_prompt(renderable: Renderable, no_input: bool) -> bool:
+    return not (no_input or renderable.skip_prompts)
+
+
+def _render_batch(
+    renderables: Sequence[Renderable],
+    no_input: bool = False,
+    cache: Optional[RenderCache] = None,
+) -> List[TemplateData]:
+    if len(renderables) == 1:
+        return [_render_one(renderables[0], no_input=no_input, cache=cache)]
+
+    # Batches with more than one renderable never prompt
+    out_data: Dict[int, TemplateData] = {}
+    if cache is not None:
+        for i, renderable in enumerate(renderables):
+            cached_data = cache.load(renderable)
+            if cached_data is not None:
+                out_data[i] = cached_data
+    to_render = [i for i in range(len(renderables)) if i not in out_data]
+    if to_render:
+        renderer = _get_specific_renderer(renderables[0].template)
+        rendered_data = renderer.render_many(
+            [renderables[i] for i in to_render], no_input=True
+        )
+        for i, data in zip(to_render, rendered_data):
+            out_data[i] = data
+            if cache is not None:
+                cache.save(renderables[i], data)
+    return [out_data[i] for i in range(len(renderables))]
+
+
+def _render_one(
+    renderable: Renderable,
+    no_input: bool = False,
+    cache: Optional[RenderCache] = None,
+) -> TemplateData:
+    renderer = _get_specific_renderer(renderable.template)
+    renderable_no_input = no_input or renderable.skip_prompts
+    if cache is None or not renderable_no_input:
+        # Prompts may produce different data each time, so only cache non-interactive renders
+        return renderer.render(renderable, no_input=renderable_no_input)
+
+    cached_data = cache.load(renderable)
+    if cached_data is not None:
+        return cached_data
+    data = renderer.render(renderable, no_input=renderable_no_input)
+    cache.save(renderable, data)
+    return data
+
+
 def _merge_file_trees(dirs: Sequence[Path], out_dir: Path):
+    """
+    Merges the files in each of the dirs into out_dir, in order. Files are moved
+    rather than copied, so the dirs should be discarded afterwards
+
+    If a file already exists in out_dir, the new file's contents are appended to it
+    """
     for directory in dirs:
-        _copy_files_to_directory(directory, out_dir)
-
-
-def _copy_files_to_directory(dir: Path, out_dir: Path):
-    for root, folders, files in os.walk(dir):
-        in_folder = Path(root)
-        relative_path = in_folder.relative_to(dir)
-        out_folder = out_dir / relative_path
-        if not out_folder.exists():
-            out_folder.mkdir()
-        for file in files:
-            in_path = in_folder / file
-            out_path = out_folder / file
-            if out_path.exists():
-                content = in_path.read_text()
-                with open(out_path, mode="a") as f:
-                    f.write(content)
-            else:
-                shutil.copy(in_path, out_path)
+        _move_files_to_directory(directory, out_dir)
+
+
+def _move_files_to_directory(dir: Path, out_dir: Path):
+    try:
+        with os.scandir(dir) as it:
+            entries = list(it)
+    except FileNotFoundError:
+        # Nothing was rendered
+        return
+    if out_dir.exists():
+        existing_names = set(os.listdir(out_dir))
+    else:
+        out_dir.mkdir()
+        existing_names = set()
+    for entry in entries:
+        in_path = Path(entry.path)
+        out_path = out_dir / entry.name
+        if entry.is_dir():
+            if entry.is_symlink():
+                # Linked folders are not followed, only created
+                if entry.name not in existing_names:
+                    out_path.mkdir()
+                continue
+            _move_files_to_directory(in_path, out_path)
+        elif entry.name in existing_names:
+            _append_file(in_path, out_path)
+        elif entry.is_symlink():
+            # Output the contents rather than a link that may now be broken
+            shutil.copy(in_path, out_path)
+        else:
+            _move_file(in_path, out_path)
+
+
+def _move_file(in_path: Path, out_path: Path):
+    try:
+        os.replace(in_path, out_path)
+    except OSError:
+        # Different file systems, copy instead. This uses the
+        # fastest method available to the platform
+        shutil.copy(in_path, out_path)
+
+
+def _append_file(in_path: Path, out_path: Path):
+    with open(in_path, "rb") as in_file, open(out_path, "ab") as out_file:
+        shutil.copyfileobj(in_file, out_file, MERGE_APPEND_CHUNK_SIZE)
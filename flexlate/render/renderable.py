@@ -3,7 +3,7 @@ from typing import Generic, Optional, TypeVar
 
 from pydantic import BaseModel, Field
 
-from flexlate.config import AppliedTemplateWithSource
+from flexlate.config import AppliedTemplateWithSource, TemplateRegistry
 from flexlate.template.base import Template
 from flexlate.template_data import TemplateData
 
@@ -21,8 +21,11 @@ class Renderable(BaseModel, Generic[T]):
         cls,
         applied_template_with_source: AppliedTemplateWithSource,
         data: Optional[TemplateData] = None,
+        registry: Optional[TemplateRegistry] = None,
     ) -> "Renderable":
-        template, data_from_config = applied_template_with_source.to_template_and_data()
+        template, data_from_config = applied_template_with_source.to_template_and_data(
+            registry=registry
+        )
         all_data = {**data_from_config, **(data or {})}
         return cls(
             template=template,
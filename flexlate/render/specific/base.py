@@ -1,6 +1,6 @@
 import abc
 from pathlib import Path
-from typing import Optional, Protocol, Type, TypeVar
+from typing import List, Optional, Protocol, Sequence, Type, TypeVar
 
 from flexlate.render.renderable import Renderable
 from flexlate.template.base import Template
@@ -22,9 +22,28 @@ class SpecificTemplateRenderer(Protocol[T]):
     ) -> TemplateData:
         ...
 
+    def render_many(
+        self,
+        renderables: Sequence[Renderable[T]],
+        no_input: bool = False,
+    ) -> List[TemplateData]:
+        """
+        Renders multiple renderables that all have the same template
+
+        :return: The data used to render each renderable, in the same order as the renderables
+        """
+        ...
+
     def render_string(
         self,
         string: str,
         renderable: Renderable[T],
     ) -> str:
         ...
+
+    def render_strings(
+        self,
+        strings: Sequence[str],
+        renderable: Renderable[T],
+    ) -> List[str]:
+        ...
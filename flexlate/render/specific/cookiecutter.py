@@ -1,14 +1,36 @@
-from typing import Tuple
+import os
+import shutil
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Sequence, Tuple
 
-from cookiecutter.config import get_user_config
-from cookiecutter.generate import generate_context, generate_files
+from cookiecutter.environment import StrictEnvironment
+from cookiecutter.exceptions import FailedHookException, UndefinedVariableInTemplate
+from cookiecutter.find import find_template
+from cookiecutter.generate import (
+    apply_overwrites_to_context,
+    ensure_dir_is_templated,
+    generate_file,
+    generate_files,
+    is_copy_only_path,
+    render_and_create_dir,
+)
+from cookiecutter.hooks import run_hook
 from cookiecutter.prompt import prompt_for_config
+from cookiecutter.utils import rmtree, work_in
+from jinja2 import FileSystemLoader
+from jinja2.exceptions import UndefinedError
 
+from flexlate.render.bytecode_cache import jinja_bytecode_cache
 from flexlate.render.renderable import Renderable
 from flexlate.render.specific.base import SpecificTemplateRenderer
-from flexlate.temp_path import create_temp_path
 from flexlate.template.cookiecutter import CookiecutterTemplate
 from flexlate.template.types import TemplateType
+from flexlate.template_config.cache import (
+    get_cookiecutter_user_config,
+    load_cookiecutter_config_data,
+)
 from flexlate.template_data import TemplateData
 
 
@@ -22,13 +44,9 @@ class CookiecutterRenderer(SpecificTemplateRenderer[CookiecutterTemplate]):
         no_input: bool = False,
     ) -> TemplateData:
         template = renderable.template
-        config_dict = get_user_config()
-        context_file = template.path / "cookiecutter.json"
-
-        context = generate_context(
-            context_file=context_file,
-            default_context=config_dict["default_context"],
-            extra_context=renderable.data,
+        config_dict = get_cookiecutter_user_config()
+        context = _generate_context(
+            template, config_dict["default_context"], renderable.data
         )
         context["cookiecutter"] = prompt_for_config(context, no_input)
         context["cookiecutter"]["_template"] = template.path
@@ -46,60 +64,231 @@ class CookiecutterRenderer(SpecificTemplateRenderer[CookiecutterTemplate]):
 
         return used_data
 
+    def render_many(
+        self,
+        renderables: Sequence[Renderable[CookiecutterTemplate]],
+        no_input: bool = False,
+    ) -> List[TemplateData]:
+        if len(renderables) <= 1:
+            # Nothing to share between renders, use cookiecutter's own rendering
+            return [
+                self.render(renderable, no_input=no_input) for renderable in renderables
+            ]
+        template = renderables[0].template
+        _validate_all_renderables_have_template(renderables, template)
+        config_dict = get_cookiecutter_user_config()
+        contexts: List[OrderedDict] = []
+        for renderable in renderables:
+            context = _generate_context(
+                template, config_dict["default_context"], renderable.data
+            )
+            context["cookiecutter"] = prompt_for_config(context, no_input)
+            context["cookiecutter"]["_template"] = template.path
+            contexts.append(context)
+
+        _generate_files_for_each_context(
+            str(template.path),
+            contexts,
+            [str(renderable.out_root) for renderable in renderables],
+        )
+
+        all_used_data: List[TemplateData] = []
+        for context in contexts:
+            used_data = dict(context["cookiecutter"])
+            used_data.pop("_template")
+            all_used_data.append(used_data)
+        return all_used_data
+
     def render_string(
         self,
         string: str,
         renderable: Renderable[CookiecutterTemplate],
     ) -> str:
-        template = renderable.template
-        config_dict = get_user_config()
-        context_file = template.path / "cookiecutter.json"
+        return self.render_strings([string], renderable)[0]
 
-        context = generate_context(
-            context_file=context_file,
-            default_context=config_dict["default_context"],
-            extra_context=renderable.data,
+    def render_strings(
+        self,
+        strings: Sequence[str],
+        renderable: Renderable[CookiecutterTemplate],
+    ) -> List[str]:
+        template = renderable.template
+        config_dict = get_cookiecutter_user_config()
+        context = _generate_context(
+            template, config_dict["default_context"], renderable.data
         )
         context["cookiecutter"] = prompt_for_config(context, no_input=True)
+        context["cookiecutter"]["_template"] = template.path
+
+        env = _get_environment(template.path, template.version)
+        return [env.from_string(string).render(**context) for string in strings]
+
+
+@lru_cache(maxsize=None)
+def _get_environment(template_path: Path, version: str) -> StrictEnvironment:
+    # Extensions are loaded from the template's context, which only
+    # changes with the version
+    context = OrderedDict(cookiecutter=load_cookiecutter_config_data(template_path))
+    return StrictEnvironment(context=context, keep_trailing_newline=True)
+
+
+def _generate_context(
+    template: CookiecutterTemplate, default_context: dict, data: TemplateData
+) -> OrderedDict:
+    # Same as generate_context, but without parsing the context file each time
+    context = OrderedDict(cookiecutter=load_cookiecutter_config_data(template.path))
+    if default_context:
+        apply_overwrites_to_context(context["cookiecutter"], default_context)
+    if data:
+        apply_overwrites_to_context(context["cookiecutter"], data)
+    return context
+
 
-        with create_temp_path() as temp_template_path:
-            temp_template_dir = str(temp_template_path)
-            context["cookiecutter"]["_template"] = temp_template_dir
-            (
-                cookiecutter_pre_folder_name,
-                cookiecutter_post_folder_name,
-            ) = _cookiecutter_before_and_after_render_string_temp_folder(context)
-            temp_template_file_path = (
-                temp_template_path / cookiecutter_pre_folder_name / "temp.txt"
+def _validate_all_renderables_have_template(
+    renderables: Sequence[Renderable[CookiecutterTemplate]],
+    template: CookiecutterTemplate,
+):
+    for renderable in renderables:
+        if (
+            renderable.template.path != template.path
+            or renderable.template.version != template.version
+        ):
+            raise ValueError(
+                f"can only render many at once for a single template, got "
+                f"{renderable.template} and {template}"
             )
-            temp_template_file_path.parent.mkdir()
-            temp_template_file_path.write_text(string)
-
-            with create_temp_path() as temp_output_dir:
-                generate_files(
-                    repo_dir=temp_template_dir,
-                    context=context,
-                    overwrite_if_exists=False,
-                    skip_if_file_exists=False,
-                    output_dir=temp_output_dir,
-                )
-                temp_output_file_path = (
-                    temp_output_dir / cookiecutter_post_folder_name / "temp.txt"
-                )
-                output = temp_output_file_path.read_text()
-
-        return output
-
-
-def _get_first_question_and_answer_from_context(context: dict) -> Tuple[str, str]:
-    cookiecutter_context = context["cookiecutter"]
-    for question, answer in cookiecutter_context.items():
-        return question, answer
-    raise ValueError("no questions in cookiecutter context, this is not expected")
-
-
-def _cookiecutter_before_and_after_render_string_temp_folder(
-    cookiecutter_context: dict,
-) -> Tuple[str, str]:
-    question, answer = _get_first_question_and_answer_from_context(cookiecutter_context)
-    return "{{ cookiecutter." + question + " }}", answer
+
+
+def _generate_files_for_each_context(
+    repo_dir: str, contexts: Sequence[OrderedDict], output_dirs: Sequence[str]
+):
+    """
+    Renders the template once for each context into the matching output dir. The
+    template's files are only listed once and each file is only compiled once
+
+    Only used for many renders at once, single renders use cookiecutter's
+    generate_files directly
+
+    NOTE: Adapted from cookiecutter.generate.generate_files in cookiecutter 1.7.3
+    """
+    template_dir = os.path.abspath(find_template(repo_dir))
+    unrendered_dir = os.path.split(template_dir)[1]
+    ensure_dir_is_templated(unrendered_dir)
+    # Extensions come from the template's context and so are the same for every context.
+    # Sharing the environment shares its cache of compiled templates
+    env = StrictEnvironment(
+        context=contexts[0],
+        keep_trailing_newline=True,
+        bytecode_cache=jinja_bytecode_cache,
+    )
+    # Load with absolute paths so that the bytecode cache is keyed by template location
+    env.loader = FileSystemLoader(template_dir)
+    with work_in(template_dir):
+        tree = list(os.walk("."))
+
+    for context, output_dir in zip(contexts, output_dirs):
+        _generate_files_from_tree(
+            repo_dir, template_dir, unrendered_dir, tree, context, output_dir, env
+        )
+
+
+def _generate_files_from_tree(
+    repo_dir: str,
+    template_dir: str,
+    unrendered_dir: str,
+    tree: Sequence[Tuple[str, List[str], List[str]]],
+    context: OrderedDict,
+    output_dir: str,
+    env: StrictEnvironment,
+):
+    """
+    NOTE: Adapted from cookiecutter.generate.generate_files
+    """
+    try:
+        project_dir, output_directory_created = render_and_create_dir(
+            unrendered_dir, context, output_dir, env
+        )
+    except UndefinedError as err:
+        msg = "Unable to create project directory '{}'".format(unrendered_dir)
+        raise UndefinedVariableInTemplate(msg, err, context)
+
+    project_dir = os.path.abspath(project_dir)
+
+    # if we created the output directory, then it's ok to remove it
+    # if rendering fails
+    delete_project_on_failure = output_directory_created
+
+    _run_hook_from_repo_dir(
+        repo_dir, "pre_gen_project", project_dir, context, delete_project_on_failure
+    )
+
+    with work_in(template_dir):
+        # Folders which were copied rather than rendered, skip everything inside them
+        copied_dirs: List[str] = []
+        for root, dirs, files in tree:
+            if any(
+                os.path.normpath(root).startswith(copied_dir + os.sep)
+                or os.path.normpath(root) == copied_dir
+                for copied_dir in copied_dirs
+            ):
+                continue
+
+            render_dirs: List[str] = []
+            for d in dirs:
+                d_ = os.path.normpath(os.path.join(root, d))
+                if is_copy_only_path(d_, context):
+                    outdir = os.path.normpath(os.path.join(project_dir, d_))
+                    shutil.copytree(d_, outdir)
+                    copied_dirs.append(d_)
+                else:
+                    render_dirs.append(d)
+
+            for d in render_dirs:
+                unrendered_sub_dir = os.path.join(project_dir, root, d)
+                try:
+                    render_and_create_dir(unrendered_sub_dir, context, output_dir, env)
+                except UndefinedError as err:
+                    if delete_project_on_failure:
+                        rmtree(project_dir)
+                    _dir = os.path.relpath(unrendered_sub_dir, output_dir)
+                    msg = "Unable to create directory '{}'".format(_dir)
+                    raise UndefinedVariableInTemplate(msg, err, context)
+
+            for f in files:
+                infile = os.path.normpath(os.path.join(root, f))
+                if is_copy_only_path(infile, context):
+                    outfile_tmpl = env.from_string(infile)
+                    outfile_rendered = outfile_tmpl.render(**context)
+                    outfile = os.path.join(project_dir, outfile_rendered)
+                    shutil.copyfile(infile, outfile)
+                    shutil.copymode(infile, outfile)
+                    continue
+                try:
+                    generate_file(project_dir, infile, context, env)
+                except UndefinedError as err:
+                    if delete_project_on_failure:
+                        rmtree(project_dir)
+                    msg = "Unable to create file '{}'".format(infile)
+                    raise UndefinedVariableInTemplate(msg, err, context)
+
+    _run_hook_from_repo_dir(
+        repo_dir, "post_gen_project", project_dir, context, delete_project_on_failure
+    )
+
+
+def _run_hook_from_repo_dir(
+    repo_dir: str,
+    hook_name: str,
+    project_dir: str,
+    context: OrderedDict,
+    delete_project_on_failure: bool,
+):
+    """
+    NOTE: Adapted from cookiecutter.generate._run_hook_from_repo_dir
+    """
+    with work_in(repo_dir):
+        try:
+            run_hook(hook_name, project_dir, context)
+        except FailedHookException:
+            if delete_project_on_failure:
+                rmtree(project_dir)
+            raise
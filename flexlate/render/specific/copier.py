@@ -1,18 +1,22 @@
 from collections import ChainMap
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Final, Sequence
+from typing import Any, Dict, Final, List, Sequence
 
-import yaml
 from copier import copy_local
 from copier.config.factory import filter_config, verify_minimum_version
 from copier.config.objects import ConfigData, EnvOps
-from copier.config.user_data import load_config_data, query_user_data
+from copier.config.user_data import query_user_data
+from copier.tools import get_jinja_env
+from copier.types import JSONSerializable
+from jinja2.sandbox import SandboxedEnvironment
 
+from flexlate.render.bytecode_cache import jinja_bytecode_cache
 from flexlate.render.renderable import Renderable
 from flexlate.render.specific.base import SpecificTemplateRenderer
-from flexlate.temp_path import create_temp_path
 from flexlate.template.copier import CopierTemplate
 from flexlate.template.types import TemplateType
+from flexlate.template_config.cache import load_copier_config_data
 from flexlate.template_data import TemplateData
 
 exclude_copier_keys: Final[Sequence[str]] = ("now", "make_secret", "_folder_name")
@@ -37,59 +41,78 @@ class CopierRenderer(SpecificTemplateRenderer[CopierTemplate]):
         copy_local(conf=conf)
         return _extract_template_data_from_copier_config(conf)
 
+    def render_many(
+        self,
+        renderables: Sequence[Renderable[CopierTemplate]],
+        no_input: bool = False,
+    ) -> List[TemplateData]:
+        return [
+            self.render(renderable, no_input=no_input) for renderable in renderables
+        ]
+
     def render_string(
         self,
         string: str,
         renderable: Renderable[CopierTemplate],
     ) -> str:
-        template = renderable.template
+        return self.render_strings([string], renderable)[0]
 
-        with create_temp_path() as temp_template_path:
-            copier_config_path = _find_copier_yaml_path(template.path)
-            with open(copier_config_path, "r") as f:
-                copier_config = yaml.safe_load(f)
-            _modify_copier_config_yaml_to_remove_tasks(copier_config)
-            config_out_path = temp_template_path / copier_config_path.name
-            config_out_path.write_text(yaml.dump(copier_config))
-            temp_template_file_path = (
-                temp_template_path
-                / template.render_relative_root_in_template
-                / "temp.txt"
-            )
-            if not temp_template_file_path.parent.exists():
-                temp_template_file_path.parent.mkdir(parents=True)
-            temp_template_file_path.write_text(string)
-
-            with create_temp_path() as temp_output_path:
-                conf = _make_config_by_adding_defaults_then_prompting_user(
-                    str(temp_template_path),
-                    str(temp_output_path),
-                    data=renderable.data,
-                    no_input=True,
-                )
-                copy_local(conf=conf)
-                temp_output_file_path = temp_output_path / "temp.txt"
-                output = temp_output_file_path.read_text()
-        return output
-
-
-def _modify_copier_config_yaml_to_remove_tasks(
-    copier_config: Dict[str, Any]
-) -> Dict[str, Any]:
-    if "_tasks" in copier_config:
-        del copier_config["_tasks"]
-    return copier_config
-
-
-def _find_copier_yaml_path(template_root: Path) -> Path:
-    copier_yaml_path = template_root / "copier.yml"
-    if not copier_yaml_path.exists():
-        copier_yaml_path = template_root / "copier.yaml"
-    if not copier_yaml_path.exists():
-        raise FileNotFoundError(
-            f"Could not find copier.yml or copier.yaml in {template_root}"
+    def render_strings(
+        self,
+        strings: Sequence[str],
+        renderable: Renderable[CopierTemplate],
+    ) -> List[str]:
+        template = renderable.template
+        conf = _make_config_by_adding_defaults_then_prompting_user(
+            str(template.path),
+            str(renderable.out_root),
+            data=renderable.data,
+            no_input=True,
         )
-    return copier_yaml_path
+        env = _get_environment(template.path, template.version)
+        data = _get_render_data(conf)
+        return [env.from_string(string).render(**data) for string in strings]
+
+
+@lru_cache(maxsize=None)
+def _get_environment(template_path: Path, version: str) -> SandboxedEnvironment:
+    # envops and extra paths come from the template config, which only
+    # changes with the version
+    template_config_data, _ = filter_config(load_copier_config_data(template_path))
+    envops = EnvOps(
+        **template_config_data.get("envops", {}),
+        bytecode_cache=jinja_bytecode_cache,
+    )
+    extra_paths = template_config_data.get("extra_paths") or []
+    paths = [str(template_path), *map(str, extra_paths)]
+    return get_jinja_env(envops=envops, paths=paths)
+
+
+def _get_render_data(conf: ConfigData) -> Dict[str, Any]:
+    """
+    NOTE: Adapted from copier.tools.Renderer.__init__, without creating
+    the Jinja environment
+    """
+    answers: Dict[str, Any] = {}
+    # All internal values must appear first
+    if conf.commit:
+        answers["_commit"] = conf.commit
+    if conf.original_src_path is not None:
+        answers["_src_path"] = conf.original_src_path
+    # Other data goes next
+    answers.update(
+        (k, v)
+        for (k, v) in conf.data.items()
+        if not k.startswith("_")
+        and k not in conf.secret_questions
+        and isinstance(k, JSONSerializable)
+        and isinstance(v, JSONSerializable)
+    )
+    return dict(
+        conf.data,
+        _copier_answers=answers,
+        _copier_conf=conf.copy(deep=True, exclude={"data": {"now", "make_secret"}}),
+    )
 
 
 def _extract_template_data_from_copier_config(config: ConfigData) -> TemplateData:
@@ -100,7 +123,10 @@ def _extract_template_data_from_copier_config(config: ConfigData) -> TemplateDat
 
 
 def _make_config_by_adding_defaults_then_prompting_user(
-    src_path: str, dst_path: str, data: TemplateData, no_input: bool = False
+    src_path: str,
+    dst_path: str,
+    data: TemplateData,
+    no_input: bool = False,
 ) -> ConfigData:
     """
     NOTE: Adapted from copier.config.factory.make_config
@@ -112,7 +138,7 @@ def _make_config_by_adding_defaults_then_prompting_user(
 
     # Skipped logic around VCS as we are always working with a local repo by this point
 
-    file_data = load_config_data(src_path, quiet=True)
+    file_data = load_copier_config_data(Path(src_path))
 
     try:
         verify_minimum_version(file_data["_min_copier_version"])
@@ -123,7 +149,10 @@ def _make_config_by_adding_defaults_then_prompting_user(
     init_args["data_from_template_defaults"] = {
         k: v.get("default") for k, v in questions_data.items()
     }
-    init_args["envops"] = EnvOps(**template_config_data.get("envops", {}))
+    init_args["envops"] = EnvOps(
+        **template_config_data.get("envops", {}),
+        bytecode_cache=jinja_bytecode_cache,
+    )
 
     init_args["data_from_init"] = ChainMap(
         query_user_data(
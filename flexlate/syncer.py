@@ -20,6 +20,7 @@ class Syncer:
         base_template_branch_name: str = DEFAULT_TEMPLATE_BRANCH_NAME,
         no_input: bool = False,
         remote: str = "origin",
+        jobs: int = 1,
         updater: Updater = Updater(),
         renderer: MultiRenderer = MultiRenderer(),
         config_manager: ConfigManager = ConfigManager(),
@@ -37,6 +38,7 @@ class Syncer:
                 no_input=no_input,
                 full_rerender=True,
                 remote=remote,
+                jobs=jobs,
                 renderer=renderer,
                 config_manager=config_manager,
             )
@@ -19,5 +19,7 @@ def create_temp_path() -> Iterator[Path]:
     """
     temp_dir = tempfile.TemporaryDirectory()
     temp_path = Path(temp_dir.name).resolve()
-    yield temp_path
-    shutil.rmtree(temp_path, ignore_errors=True)
+    try:
+        yield temp_path
+    finally:
+        shutil.rmtree(temp_path, ignore_errors=True)
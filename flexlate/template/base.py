@@ -1,8 +1,8 @@
 import abc
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, Tuple
 
-from flexlate.template.hashing import md5_dir
+from flexlate.template.hashing import cached_md5_dir
 from flexlate.template.types import TemplateType
 from flexlate.template_config.base import TemplateConfig
 
@@ -39,7 +39,25 @@ class Template(abc.ABC):
 
     @property
     def folder_hash(self) -> str:
-        return md5_dir(self.path)
+        return cached_md5_dir(self.path)
+
+    @property
+    def identity(self) -> Tuple[Any, ...]:
+        """
+        A hashable key for the template which is the same for templates that are equal,
+        without needing to compare configs
+        """
+        return (
+            self._type,
+            self.path,
+            self.git_url,
+            self.target_version,
+            self.name,
+            self.version,
+            self.template_source_path,
+            self.render_relative_root_in_output,
+            self.render_relative_root_in_template,
+        )
 
     def __eq__(self, other):
         try:
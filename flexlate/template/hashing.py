@@ -1,9 +1,16 @@
 # Adapted from https://stackoverflow.com/a/54477583/6276321
 import hashlib
+import json
+import os
+import tempfile
+import time
 from pathlib import Path
-from typing import Union
+from threading import Lock
+from typing import Dict, List, Optional, Tuple, Union
 
+import appdirs
 from _hashlib import HASH as Hash
+from git import GitCommandError, InvalidGitRepositoryError, NoSuchPathError, Repo
 
 
 def md5_update_from_file(filename: Union[str, Path], hash: Hash) -> Hash:
@@ -31,3 +38,160 @@ def md5_update_from_dir(directory: Union[str, Path], hash: Hash) -> Hash:
 
 def md5_dir(directory: Union[str, Path]) -> str:
     return str(md5_update_from_dir(directory, hashlib.md5()).hexdigest())  # type: ignore
+
+
+HASH_INDEX_PATH = Path(appdirs.user_data_dir("flexlate")) / ".hash-index.json"
+
+# Files modified this recently may be modified again without changing their
+# mtime, so a directory containing them is not stored in the index
+_RACY_MTIME_NS = 2_000_000_000
+
+# Symlinks and submodules, the index does not determine the content of these
+_GIT_MODES_NOT_IN_INDEX = ("120000", "160000")
+
+
+class DirectoryHashIndex:
+    """
+    A persistent index of directory hashes which avoids re-reading the contents
+    of a directory when none of its files have changed.
+
+    Each directory is stored with a signature of the (size, mtime_ns, inode) of every
+    file in it. When the signature still matches, the stored hash is returned
+    after only stat calls. Otherwise the directory is fully re-hashed with md5_dir,
+    so the hash is always identical to md5_dir.
+
+    Directories which are committed and unchanged in a git repo instead use the
+    staged blob IDs as the signature, which git determines without any per-file
+    work here.
+
+    Entries for directories which no longer exist are removed when the index is saved.
+    """
+
+    def __init__(self, path: Path = HASH_INDEX_PATH):
+        self.path = path
+        self._entries: Optional[Dict[str, Dict[str, str]]] = None
+        self._pruned = False
+        self._lock = Lock()
+
+    def md5_dir(self, directory: Union[str, Path]) -> str:
+        key = str(Path(directory).resolve())
+        git_signature = _git_signature(Path(directory))
+        if git_signature is not None:
+            # Git already handles racily modified files when checking for changes
+            signature, is_racy = git_signature, False
+        else:
+            signature, is_racy = _stat_signature(Path(directory))
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is not None and entry["signature"] == signature:
+            return entry["digest"]
+
+        digest = md5_dir(directory)
+        if not is_racy:
+            with self._lock:
+                self._load()[key] = dict(signature=signature, digest=digest)
+                self._save()
+        return digest
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        if self._entries is None:
+            try:
+                loaded = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                loaded = {}
+            # Skip anything stored in a different format
+            self._entries = {
+                key: entry
+                for key, entry in loaded.items()
+                if isinstance(entry, dict) and {"signature", "digest"} <= set(entry)
+            }
+        return self._entries
+
+    def _save(self):
+        if self._entries is None:
+            return
+        if not self._pruned:
+            # Directories such as temporary template clones may have been
+            # deleted since they were stored
+            for key in [key for key in self._entries if not os.path.isdir(key)]:
+                del self._entries[key]
+            self._pruned = True
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(
+                prefix=f"{self.path.name}.", suffix=".tmp", dir=self.path.parent
+            )
+        except OSError:
+            # Index is only an optimization, hashing already succeeded
+            return
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            Path(temp_path).unlink(missing_ok=True)
+
+
+def _stat_signature(directory: Path) -> Tuple[str, bool]:
+    hash = hashlib.md5()
+    racy_after_ns = time.time_ns() - _RACY_MTIME_NS
+    is_racy = False
+    to_visit: List[Tuple[str, Path]] = [("", directory)]
+    while to_visit:
+        relative_dir, folder = to_visit.pop()
+        with os.scandir(folder) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        for entry in entries:
+            relative_path = f"{relative_dir}/{entry.name}"
+            stat = entry.stat()
+            hash.update(
+                f"{relative_path}\0{stat.st_mode}\0{stat.st_size}\0"
+                f"{stat.st_mtime_ns}\0{stat.st_ino}\n".encode()
+            )
+            if stat.st_mtime_ns > racy_after_ns:
+                is_racy = True
+            if entry.is_dir():
+                to_visit.append((relative_path, Path(entry.path)))
+    return hash.hexdigest(), is_racy
+
+
+def _git_signature(directory: Path) -> Optional[str]:
+    """
+    :return: A signature of the files in the directory from the git index, or None
+        if the directory is not in a git repo or its contents may not match the index
+    """
+    try:
+        repo = Repo(directory, search_parent_directories=True)
+        if repo.bare or repo.working_tree_dir is None:
+            return None
+        relative_path = os.path.relpath(
+            directory.resolve(), Path(repo.working_tree_dir).resolve()
+        )
+        # The repo root also contains the .git folder, which is not in the index
+        if relative_path == os.curdir or relative_path.startswith(os.pardir):
+            return None
+        pathspec = f":(literal){Path(relative_path).as_posix()}"
+        env = dict(GIT_OPTIONAL_LOCKS="0")
+        if repo.git.status(
+            "--porcelain", "--untracked-files=no", "--", pathspec, env=env
+        ):
+            return None
+        # Also lists untracked and ignored files and empty folders, which are
+        # part of the md5 hash but not the index
+        entries = repo.git.ls_files(
+            "--stage", "--others", "--directory", "--", pathspec, env=env
+        )
+    except (InvalidGitRepositoryError, NoSuchPathError, GitCommandError):
+        return None
+    for entry in entries.splitlines():
+        # Untracked entries have only the path, which is quoted if it has a tab
+        if "\t" not in entry or entry.startswith(_GIT_MODES_NOT_IN_INDEX):
+            return None
+    return f"git:{hashlib.md5(entries.encode()).hexdigest()}"
+
+
+_default_index = DirectoryHashIndex()
+
+
+def cached_md5_dir(directory: Union[str, Path]) -> str:
+    return _default_index.md5_dir(directory)
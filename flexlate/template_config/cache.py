@@ -0,0 +1,97 @@
+import hashlib
+import os
+import re
+from copy import deepcopy
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from cookiecutter.config import USER_CONFIG_PATH, get_user_config
+from cookiecutter.generate import generate_context
+from copier.config.user_data import load_config_data
+
+T = TypeVar("T")
+
+
+class TemplateConfigCache:
+    """
+    Caches parsed template config files by their content, so that each
+    template config is only parsed once no matter how many times it is used
+
+    Each load returns a new copy of the parsed config, as callers
+    may modify what they load.
+    """
+
+    def __init__(self):
+        self._parsed: Dict[Tuple[str, str], Any] = {}
+        self._lock = Lock()
+
+    def load(self, kind: str, path: Path, parse: Callable[[], T]) -> T:
+        """
+        :param kind: The type of config, so that the same content parsed in
+            different ways is cached separately
+        :param path: The config file
+        :param parse: Parses the config file
+        :return: The parsed config
+        """
+        content_hash = hashlib.sha256(path.read_bytes()).hexdigest()
+        key = (kind, content_hash)
+        with self._lock:
+            found = key in self._parsed
+            if found:
+                parsed: T = self._parsed[key]
+        if not found:
+            parsed = parse()
+            with self._lock:
+                self._parsed[key] = parsed
+        return deepcopy(parsed)
+
+    def clear(self):
+        with self._lock:
+            self._parsed.clear()
+
+
+template_config_cache = TemplateConfigCache()
+
+
+def load_copier_config_data(template_root: Path) -> Dict[str, Any]:
+    config_path = _find_copier_config_path(template_root)
+    if config_path is None:
+        # Missing or multiple config files, let copier handle it
+        return load_config_data(template_root, quiet=True)
+    return template_config_cache.load(
+        "copier", config_path, lambda: load_config_data(template_root, quiet=True)
+    )
+
+
+def load_cookiecutter_config_data(template_root: Path) -> Dict[str, Any]:
+    context_file = template_root / "cookiecutter.json"
+    return template_config_cache.load(
+        "cookiecutter",
+        context_file,
+        lambda: generate_context(context_file=context_file)["cookiecutter"],
+    )
+
+
+def get_cookiecutter_user_config() -> Dict[str, Any]:
+    config_file = os.environ.get("COOKIECUTTER_CONFIG")
+    if config_file is None and os.path.exists(USER_CONFIG_PATH):
+        config_file = USER_CONFIG_PATH
+    if config_file is None:
+        # Only defaults, nothing to parse
+        return get_user_config()
+    return template_config_cache.load(
+        "cookiecutter-user-config", Path(config_file), get_user_config
+    )
+
+
+def _find_copier_config_path(template_root: Path) -> Optional[Path]:
+    # Same as the search in copier's load_config_data
+    conf_paths = [
+        p
+        for p in template_root.glob("copier.*")
+        if p.is_file() and re.match(r"\.ya?ml", p.suffix, re.I)
+    ]
+    if len(conf_paths) != 1:
+        return None
+    return conf_paths[0]
@@ -0,0 +1,169 @@
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+from uuid import UUID
+
+from git import Repo
+
+from flexlate.ext_git import branch_exists
+from flexlate.transactions.transaction import (
+    FlexlateTransaction,
+    get_commit_transaction_id,
+    get_transaction_underlying_flexlate_merge_commit,
+)
+
+TRANSACTION_INDEX_REF_PREFIX = "refs/flexlate/transactions"
+_TEMPLATE_REF_NAME = "template"
+_MERGED_REF_NAME = "merged"
+
+
+@dataclass
+class IndexedTransactionCommits:
+    """
+    The commits where a transaction was first committed on the flexlate branches
+
+    The user branch is always fast-forwarded to the merged branch after each
+    operation, so the merged branch commit is also the one on the user branch.
+    """
+
+    template_sha: Optional[str] = None
+    merged_sha: Optional[str] = None
+
+
+def get_transaction_index(repo: Repo) -> Dict[UUID, IndexedTransactionCommits]:
+    """
+    Loads the indexed commits of all the transactions at once, see
+    get_indexed_transaction_commits
+    """
+    index: Dict[UUID, IndexedTransactionCommits] = {}
+    for ref, sha in _get_refs(repo, TRANSACTION_INDEX_REF_PREFIX).items():
+        transaction_id, name = ref[len(TRANSACTION_INDEX_REF_PREFIX) + 1 :].split("/")
+        indexed = index.setdefault(UUID(transaction_id), IndexedTransactionCommits())
+        if name == _TEMPLATE_REF_NAME:
+            indexed.template_sha = sha
+        elif name == _MERGED_REF_NAME:
+            indexed.merged_sha = sha
+    return index
+
+
+def get_indexed_transaction_commits(
+    repo: Repo, transaction_id: UUID
+) -> IndexedTransactionCommits:
+    """
+    Looks up the commits of the transaction in the index, which may be out
+    of date if history has been rewritten outside of flexlate, so the commits
+    must be validated before they are used
+    """
+    refs = _get_refs(repo, _transaction_ref_prefix(transaction_id))
+    return IndexedTransactionCommits(
+        template_sha=refs.get(_transaction_ref(transaction_id, _TEMPLATE_REF_NAME)),
+        merged_sha=refs.get(_transaction_ref(transaction_id, _MERGED_REF_NAME)),
+    )
+
+
+def index_transaction_commits(
+    repo: Repo,
+    transaction: FlexlateTransaction,
+    merged_branch_name: str,
+    template_branch_name: str,
+):
+    """
+    Records the current commits of the flexlate branches for the transaction,
+    should be called after the transaction has been merged into the user branch
+
+    Commits are only recorded the first time, so that transactions which are
+    committed and merged multiple times keep the commits from the start
+    """
+    indexed = get_indexed_transaction_commits(repo, transaction.id)
+    updates: Dict[str, str] = {}
+    if indexed.template_sha is None and branch_exists(repo, template_branch_name):
+        commit = repo.branches[template_branch_name].commit  # type: ignore
+        if get_commit_transaction_id(commit) == transaction.id:
+            ref = _transaction_ref(transaction.id, _TEMPLATE_REF_NAME)
+            updates[ref] = commit.hexsha
+    if indexed.merged_sha is None and branch_exists(repo, merged_branch_name):
+        commit = repo.branches[merged_branch_name].commit  # type: ignore
+        # The merge may have been a fast-forward, in which case there is
+        # no merge commit to index
+        merge_transaction = get_transaction_underlying_flexlate_merge_commit(
+            commit, merged_branch_name, template_branch_name
+        )
+        if merge_transaction is not None and merge_transaction.id == transaction.id:
+            ref = _transaction_ref(transaction.id, _MERGED_REF_NAME)
+            updates[ref] = commit.hexsha
+    _update_refs(repo, [f"update {ref} {sha}\n" for ref, sha in updates.items()])
+
+
+def remove_transactions_from_index(repo: Repo, transaction_ids: Sequence[UUID]):
+    commands: List[str] = []
+    for transaction_id in transaction_ids:
+        refs = _get_refs(repo, _transaction_ref_prefix(transaction_id))
+        commands.extend(f"delete {ref}\n" for ref in refs)
+    _update_refs(repo, commands)
+
+
+def rebuild_transaction_index(
+    repo: Repo, merged_branch_name: str, template_branch_name: str
+):
+    """
+    Recreates the index from the history of the flexlate branches, dropping
+    any existing entries
+    """
+    earliest_template_shas: Dict[UUID, str] = {}
+    if branch_exists(repo, template_branch_name):
+        for commit in repo.iter_commits(template_branch_name, reverse=True):
+            transaction_id = get_commit_transaction_id(commit)
+            if transaction_id is None:
+                continue
+            earliest_template_shas.setdefault(transaction_id, commit.hexsha)
+
+    earliest_merged_shas: Dict[UUID, str] = {}
+    if branch_exists(repo, merged_branch_name):
+        for commit in repo.iter_commits(merged_branch_name, reverse=True):
+            transaction = get_transaction_underlying_flexlate_merge_commit(
+                commit, merged_branch_name, template_branch_name
+            )
+            if transaction is None:
+                continue
+            earliest_merged_shas.setdefault(transaction.id, commit.hexsha)
+
+    refs: Dict[str, str] = {}
+    for transaction_id, sha in earliest_template_shas.items():
+        refs[_transaction_ref(transaction_id, _TEMPLATE_REF_NAME)] = sha
+    for transaction_id, sha in earliest_merged_shas.items():
+        refs[_transaction_ref(transaction_id, _MERGED_REF_NAME)] = sha
+    # A ref cannot be both deleted and updated in the same call
+    commands = [
+        f"delete {ref}\n"
+        for ref in _get_refs(repo, TRANSACTION_INDEX_REF_PREFIX)
+        if ref not in refs
+    ]
+    commands.extend(f"update {ref} {sha}\n" for ref, sha in refs.items())
+    _update_refs(repo, commands)
+
+
+def _transaction_ref_prefix(transaction_id: UUID) -> str:
+    return f"{TRANSACTION_INDEX_REF_PREFIX}/{transaction_id}"
+
+
+def _transaction_ref(transaction_id: UUID, name: str) -> str:
+    return f"{_transaction_ref_prefix(transaction_id)}/{name}"
+
+
+def _get_refs(repo: Repo, prefix: str) -> Dict[str, str]:
+    output = repo.git.for_each_ref("--format=%(refname) %(objectname)", prefix)
+    refs: Dict[str, str] = {}
+    for line in output.splitlines():
+        ref, sha = line.split(" ")
+        refs[ref] = sha
+    return refs
+
+
+def _update_refs(repo: Repo, commands: List[str]):
+    if len(commands) == 0:
+        return
+    # Update all the refs in a single git call, which also makes it atomic
+    with tempfile.TemporaryFile() as f:
+        f.write("".join(commands).encode())
+        f.seek(0)
+        repo.git.update_ref("--stdin", istream=f)
@@ -1,7 +1,19 @@
 import uuid
+from collections import deque
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Sequence
+from typing import (
+    TYPE_CHECKING,
+    Deque,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 from git import Commit, Repo  # type: ignore
 from pydantic import UUID4, BaseModel, Field, validator
@@ -24,6 +36,9 @@ from flexlate.ext_git import (
 )
 from flexlate.template_data import TemplateData
 
+if TYPE_CHECKING:
+    from flexlate.transactions.index import IndexedTransactionCommits
+
 FLEXLATE_TRANSACTION_COMMIT_DIVIDER = (
     "\n\n-------------------BEGIN FLEXLATE TRANSACTION-------------------\n"
 )
@@ -39,6 +54,7 @@ class TransactionType(str, Enum):
     SYNC = "sync"
     BOOTSTRAP = "bootstrap"
     UPDATE_TARGET_VERSION = "update template source target version"
+    BATCH = "batch"
 
 
 class FlexlateTransaction(BaseModel):
@@ -70,6 +86,13 @@ class FlexlateTransaction(BaseModel):
         return self.json(indent=2)
 
 
+@lru_cache(maxsize=4096)
+def _parse_commit_message(message: str) -> FlexlateTransaction:
+    # Commit messages never change, so each is only parsed once no matter how
+    # many times the history is walked. Callers must not modify the result
+    return FlexlateTransaction.parse_commit_message(message)
+
+
 def create_transaction_commit_message(
     commit_message: str, transaction: FlexlateTransaction
 ) -> str:
@@ -80,58 +103,167 @@ def create_transaction_commit_message(
     )
 
 
-def reset_last_transaction(
+def reset_last_transactions(
     repo: Repo,
-    transaction: FlexlateTransaction,
+    transactions: Sequence[FlexlateTransaction],
     merged_branch_name: str,
     template_branch_name: str,
+    transaction_index: Optional[Mapping[uuid.UUID, "IndexedTransactionCommits"]] = None,
 ):
-    last_transaction = find_last_transaction_from_commit(
-        repo.commit(), merged_branch_name, template_branch_name
+    """
+    Resets the current branch to before the transactions, with a single reset
+    no matter how many transactions are undone
+
+    :param transactions: The last transactions on the branch, most recent first
+    :param transaction_index: Commits of each transaction from the transaction index,
+        used instead of searching history when they are still valid
+    """
+    before_transactions_commit = find_commit_before_last_transactions(
+        repo,
+        transactions,
+        merged_branch_name,
+        template_branch_name,
+        transaction_index=transaction_index,
     )
-    if last_transaction.id != transaction.id:
-        raise TransactionMismatchBetweenBranchesException(
-            f"Found mismatching transaction ids: {last_transaction.id} and {transaction.id}"
+    reset_current_branch_to_commit(repo, before_transactions_commit)
+
+
+def find_commit_before_last_transactions(
+    repo: Repo,
+    transactions: Sequence[FlexlateTransaction],
+    merged_branch_name: str,
+    template_branch_name: str,
+    branch_name: Optional[str] = None,
+    transaction_index: Optional[Mapping[uuid.UUID, "IndexedTransactionCommits"]] = None,
+) -> Commit:
+    """
+    :param transactions: The last transactions on the branch, most recent first
+    :param branch_name: The branch to search, defaults to the current branch
+    :param transaction_index: Commits of each transaction from the transaction index,
+        used instead of searching history when they are still valid
+    :return: The commit the branch was at before the transactions
+    """
+    transaction_index = transaction_index or {}
+    branch_name = branch_name or repo.active_branch.name
+    last_commit = repo.branches[branch_name].commit  # type: ignore
+    before_transactions_commit = last_commit
+    for transaction in transactions:
+        last_transaction = find_last_transaction_from_commit(
+            before_transactions_commit, merged_branch_name, template_branch_name
+        )
+        if last_transaction.id != transaction.id:
+            raise TransactionMismatchBetweenBranchesException(
+                f"Found mismatching transaction ids: {last_transaction.id} and {transaction.id}"
+            )
+        before_transactions_commit = find_commit_before_transaction(
+            repo,
+            last_transaction,
+            merged_branch_name,
+            template_branch_name,
+            before_transactions_commit,
+            indexed_commits=transaction_index.get(transaction.id),
+            branch_name=branch_name,
         )
-    earliest_commit = find_earliest_commit_that_was_part_of_transaction(
-        repo, last_transaction, merged_branch_name, template_branch_name
+
+    assert_that_all_commits_between_two_are_flexlate_transactions_or_merges(
+        repo,
+        before_transactions_commit,
+        last_commit,
+        merged_branch_name,
+        template_branch_name,
     )
+    return before_transactions_commit
+
 
-    is_template_branch = repo.active_branch.name == template_branch_name
+def find_last_transactions(
+    repo: Repo,
+    num_transactions: int,
+    merged_branch_name: str,
+    template_branch_name: str,
+    transaction_index: Optional[Mapping[uuid.UUID, "IndexedTransactionCommits"]] = None,
+) -> List[FlexlateTransaction]:
+    """
+    :return: The last transactions on the current branch, most recent first
+    """
+    transaction_index = transaction_index or {}
+    transactions: List[FlexlateTransaction] = []
+    commit = repo.commit()
+    while True:
+        transaction = find_last_transaction_from_commit(
+            commit, merged_branch_name, template_branch_name
+        )
+        transactions.append(transaction)
+        if len(transactions) >= num_transactions:
+            return transactions
+        commit = find_commit_before_transaction(
+            repo,
+            transaction,
+            merged_branch_name,
+            template_branch_name,
+            commit,
+            indexed_commits=transaction_index.get(transaction.id),
+        )
+
+
+def find_commit_before_transaction(
+    repo: Repo,
+    transaction: FlexlateTransaction,
+    merged_branch_name: str,
+    template_branch_name: str,
+    commit: Commit,
+    indexed_commits: Optional["IndexedTransactionCommits"] = None,
+    branch_name: Optional[str] = None,
+) -> Commit:
+    """
+    :param commit: A commit on the branch where the transaction is the last one
+    :param branch_name: The branch the commit is on, defaults to the current branch
+    :return: The commit the branch was at before the transaction
+    """
+    branch_name = branch_name or repo.active_branch.name
+    is_template_branch = branch_name == template_branch_name
     if is_template_branch:
         # On template branch, the only commits are flexlate transactions.
         # Therefore can just get the parent to find the commit before the
         # transaction started
-        before_transaction_commit = _get_parent_commit(earliest_commit)
-    else:
-        # On output/user branch, typically the only commits are merging flexlate transactions
-        # and user changes. So find the commit that merged this transaction,
-        # then use its parent.
-        try:
-            merge_commit = find_earliest_merge_commit_for_transaction(
-                repo, transaction, merged_branch_name, template_branch_name
-            )
-        except CannotFindMergeForTransactionException:
-            # This is likely because the user has not made any changes in the repo yet,
-            # and so the merges from the template branch are always fast-forwards.
-            # In this case, it is a mirror of the template branch and so we should use
-            # that logic
-            before_transaction_commit = _get_parent_commit(earliest_commit)
-        else:
-            before_transaction_commit = (
-                _get_non_flexlate_transaction_parent_from_flexlate_merge_commit(
-                    merge_commit, merged_branch_name, template_branch_name
-                )
-            )
+        earliest_commit = find_earliest_commit_that_was_part_of_transaction(
+            repo,
+            transaction,
+            merged_branch_name,
+            template_branch_name,
+            indexed_commits=indexed_commits,
+            start=commit,
+        )
+        return _get_parent_commit(earliest_commit)
 
-    assert_that_all_commits_between_two_are_flexlate_transactions_or_merges(
-        repo,
-        before_transaction_commit,
-        repo.commit(),
-        merged_branch_name,
-        template_branch_name,
+    # On output/user branch, typically the only commits are merging flexlate transactions
+    # and user changes. So find the commit that merged this transaction,
+    # then use its parent.
+    try:
+        merge_commit = find_earliest_merge_commit_for_transaction(
+            repo,
+            transaction,
+            merged_branch_name,
+            template_branch_name,
+            indexed_commits=indexed_commits,
+            start=commit,
+        )
+    except CannotFindMergeForTransactionException:
+        # This is likely because the user has not made any changes in the repo yet,
+        # and so the merges from the template branch are always fast-forwards.
+        # In this case, it is a mirror of the template branch and so we should use
+        # that logic
+        earliest_commit = find_earliest_commit_that_was_part_of_transaction(
+            repo,
+            transaction,
+            merged_branch_name,
+            template_branch_name,
+            indexed_commits=indexed_commits,
+            start=commit,
+        )
+        return _get_parent_commit(earliest_commit)
+    return _get_non_flexlate_transaction_parent_from_flexlate_merge_commit(
+        merge_commit, merged_branch_name, template_branch_name
     )
-    reset_current_branch_to_commit(repo, before_transaction_commit)
 
 
 def find_last_transaction_from_commit(
@@ -144,7 +276,7 @@ def find_last_transaction_from_commit(
         return find_last_transaction_from_commit(
             parent, merged_branch_name, template_branch_name
         )
-    return FlexlateTransaction.parse_commit_message(commit.message)
+    return _parse_commit_message(commit.message).copy()
 
 
 def find_earliest_merge_commit_for_transaction(
@@ -152,55 +284,157 @@ def find_earliest_merge_commit_for_transaction(
     transaction: FlexlateTransaction,
     merged_branch_name: str,
     template_branch_name: str,
+    indexed_commits: Optional["IndexedTransactionCommits"] = None,
+    start: Optional[Commit] = None,
 ) -> Commit:
+    """
+    :param start: The commit to search back from, defaults to the current commit
+    """
+    start = start or repo.commit()
+    if indexed_commits is not None and indexed_commits.merged_sha is not None:
+        indexed_commit = _get_indexed_commit(repo, indexed_commits.merged_sha, start)
+        if indexed_commit is not None:
+            indexed_transaction = get_transaction_underlying_flexlate_merge_commit(
+                indexed_commit, merged_branch_name, template_branch_name
+            )
+            if (
+                indexed_transaction is not None
+                and indexed_transaction.id == transaction.id
+            ):
+                return indexed_commit
+
     # Walk back through commit tree, searching for the appropriate commit
-    return _search_commit_tree_for_earliest_merge_commit_for_transaction(
-        repo.commit(), transaction, merged_branch_name, template_branch_name
-    )
+    history = _CommitHistory(repo, start.hexsha)
+    try:
+        sha = _search_history_for_earliest_merge_commit_for_transaction(
+            history,
+            start.hexsha,
+            transaction,
+            merged_branch_name,
+            template_branch_name,
+        )
+    finally:
+        history.close()
+    return repo.commit(sha)
 
 
-def _search_commit_tree_for_earliest_merge_commit_for_transaction(
-    commit: Commit,
+class _CommitHistory:
+    """
+    Parents and messages of the commits reachable from a starting commit,
+    read from a single git log process only as far as they are needed
+    """
+
+    def __init__(self, repo: Repo, start: str):
+        self._process = repo.git.log(
+            "--format=%H%x00%P%x00%B", "-z", start, as_process=True
+        )
+        self._commits: Dict[str, Tuple[List[str], str]] = {}
+        # Each commit is output as hash, parents, and message, all separated by null
+        self._fields: List[bytes] = []
+        self._remainder = b""
+        self._finished = False
+
+    def get(self, sha: str) -> Tuple[List[str], str]:
+        """
+        :return: The parent hashes and message of the commit
+        """
+        while sha not in self._commits:
+            if self._finished:
+                raise ValueError(f"Commit {sha} is not in the history")
+            self._read_more()
+        return self._commits[sha]
+
+    def close(self):
+        if not self._finished:
+            self._finished = True
+            self._process.proc.kill()
+        self._process.proc.wait()
+
+    def _read_more(self):
+        chunk = self._process.proc.stdout.read1(64 * 1024)
+        if not chunk:
+            self._finished = True
+            # Output may not end with a separator after the last message
+            chunk = b"\0" if self._remainder else b""
+        *fields, self._remainder = (self._remainder + chunk).split(b"\0")
+        self._fields.extend(fields)
+        num_complete = len(self._fields) - len(self._fields) % 3
+        for i in range(0, num_complete, 3):
+            sha, parents, message = self._fields[i : i + 3]
+            self._commits[sha.decode()] = (
+                parents.decode().split(),
+                message.decode("utf-8", errors="replace"),
+            )
+        del self._fields[:num_complete]
+
+
+def _search_history_for_earliest_merge_commit_for_transaction(
+    history: _CommitHistory,
+    start: str,
     transaction: FlexlateTransaction,
     merged_branch_name: str,
     template_branch_name: str,
-):
-    # TODO: Better strategy for finding earliest merge commit for transaction
-    #  The current strategy requires searching until the beginning of history.
-    #  Add early stopping when hitting a user commit or different flexlate transaction
-    search_commits = [commit]
-    found_commits: List[Commit] = []
+) -> str:
+    merge_message = _flexlate_merge_commit_message(
+        merged_branch_name, template_branch_name
+    )
+    search_shas: Deque[str] = deque([start])
+    visited: Set[str] = {start}
+    found_sha: Optional[str] = None
     # Breadth-first search
-    while len(search_commits) > 0:
-        this_commit = search_commits.pop(0)
-        if _is_flexlate_merge_commit(
-            this_commit, merged_branch_name, template_branch_name
-        ):
-            merge_transaction = _get_transaction_underlying_merge_commit(this_commit)
-            if transaction.id == merge_transaction.id:
-                found_commits.append(this_commit)
-        search_commits.extend(list(this_commit.parents))
+    while len(search_shas) > 0:
+        sha = search_shas.popleft()
+        parents, message = history.get(sha)
+        if message == merge_message:
+            merge_transaction = _get_transaction_underlying_merge_commit_in_history(
+                history, sha
+            )
+            if merge_transaction.id != transaction.id:
+                # Merges of earlier transactions, everything before them is
+                # also before this transaction
+                continue
+            found_sha = sha
+        elif len(parents) < 2 or _is_transaction_commit_message(message):
+            # Hit a user commit, or a transaction commit which only has other
+            # transaction commits before it on the template branch
+            continue
+        for parent in parents:
+            if parent not in visited:
+                visited.add(parent)
+                search_shas.append(parent)
 
-    if len(found_commits) == 0:
+    if found_sha is None:
         raise CannotFindMergeForTransactionException(
             f"Could not find the merge commit for transaction {transaction}"
         )
 
     # Since BFS was used, last found commit should be the earliest
-    return found_commits[-1]
+    return found_sha
 
 
-def _get_transaction_underlying_merge_commit(commit: Commit) -> FlexlateTransaction:
-    for parent in commit.parents:
+def _get_transaction_underlying_merge_commit_in_history(
+    history: _CommitHistory, sha: str
+) -> FlexlateTransaction:
+    parents, message = history.get(sha)
+    for parent in parents:
+        _, parent_message = history.get(parent)
         try:
-            return FlexlateTransaction.parse_commit_message(parent.message)
+            return _parse_commit_message(parent_message)
         except CannotParseCommitMessageFlexlateTransaction:
             continue
     raise MergeCommitIsNotMergingAFlexlateTransactionException(
-        f"Commit {commit.hexsha}: {commit.message}"
+        f"Commit {sha}: {message}"
     )
 
 
+def _is_transaction_commit_message(message: str) -> bool:
+    try:
+        _parse_commit_message(message)
+    except CannotParseCommitMessageFlexlateTransaction:
+        return False
+    return True
+
+
 def assert_last_commit_was_in_a_flexlate_transaction(
     repo: Repo, merged_branch_name: str, template_branch_name: str
 ):
@@ -213,7 +447,7 @@ def assert_last_commit_was_in_a_flexlate_transaction(
         )
     try:
 
-        FlexlateTransaction.parse_commit_message(last_commit.message)
+        _parse_commit_message(last_commit.message)
     except CannotParseCommitMessageFlexlateTransaction as e:
         raise LastCommitWasNotByFlexlateException(
             f"Last commit was not made by flexlate: {last_commit.message}"
@@ -252,7 +486,7 @@ def assert_has_at_least_n_transactions(
             # Flexlate never commits with binary messages
             return too_few_transactions()
         try:
-            transaction = FlexlateTransaction.parse_commit_message(last_commit.message)
+            transaction = _parse_commit_message(last_commit.message)
         except CannotParseCommitMessageFlexlateTransaction:
             return too_few_transactions()
         earliest_commit = _return_commit_if_begin_of_transaction_else_get_parent(
@@ -279,7 +513,7 @@ def assert_that_all_commits_between_two_are_flexlate_transactions_or_merges(
         if _is_flexlate_merge_commit(commit, merged_branch_name, template_branch_name):
             continue
         try:
-            FlexlateTransaction.parse_commit_message(commit.message)
+            _parse_commit_message(commit.message)
         except CannotParseCommitMessageFlexlateTransaction:
             raise UserChangesWouldHaveBeenDeletedException(
                 f"Commit {commit.hexsha}: {commit.message} would have been deleted "
@@ -293,9 +527,22 @@ def find_earliest_commit_that_was_part_of_transaction(
     transaction: FlexlateTransaction,
     merged_branch_name: str,
     template_branch_name: str,
+    indexed_commits: Optional["IndexedTransactionCommits"] = None,
+    start: Optional[Commit] = None,
 ) -> Commit:
+    """
+    :param start: The commit to search back from, defaults to the current commit
+    """
+    start = start or repo.commit()
+    if indexed_commits is not None and indexed_commits.template_sha is not None:
+        indexed_commit = _get_indexed_commit(repo, indexed_commits.template_sha, start)
+        if indexed_commit is not None and _is_earliest_commit_of_transaction(
+            indexed_commit, transaction
+        ):
+            return indexed_commit
+
     return _return_commit_if_begin_of_transaction_else_get_parent(
-        repo.commit(), transaction, merged_branch_name, template_branch_name
+        start, transaction, merged_branch_name, template_branch_name
     )
 
 
@@ -314,9 +561,7 @@ def _return_commit_if_begin_of_transaction_else_get_parent(
             commit, merged_branch_name, template_branch_name
         )
     try:
-        commit_transaction = FlexlateTransaction.parse_commit_message(
-            parent_commit.message
-        )
+        commit_transaction = _parse_commit_message(parent_commit.message)
     except CannotParseCommitMessageFlexlateTransaction:
         # Not a flexlate commit, so this must be the last in the transaction
         return commit
@@ -331,6 +576,42 @@ def _return_commit_if_begin_of_transaction_else_get_parent(
     return commit
 
 
+def _is_earliest_commit_of_transaction(
+    commit: Commit, transaction: FlexlateTransaction
+) -> bool:
+    if get_commit_transaction_id(commit) != transaction.id:
+        return False
+    return all(
+        get_commit_transaction_id(parent) != transaction.id for parent in commit.parents
+    )
+
+
+def get_commit_transaction_id(commit: Commit) -> Optional[uuid.UUID]:
+    """
+    :return: The id of the transaction the commit was made in, or None if it
+        is not a flexlate transaction commit
+    """
+    if isinstance(commit.message, bytes):
+        # Flexlate never commits with binary messages
+        return None
+    try:
+        return _parse_commit_message(commit.message).id
+    except CannotParseCommitMessageFlexlateTransaction:
+        return None
+
+
+def _get_indexed_commit(repo: Repo, sha: str, start: Commit) -> Optional[Commit]:
+    # Indexed commits are no longer valid once they are removed from
+    # the history being searched
+    try:
+        commit = repo.commit(sha)
+    except ValueError:
+        return None
+    if not repo.is_ancestor(commit, start):
+        return None
+    return commit
+
+
 class HitInitialCommit(Exception):
     pass
 
@@ -358,7 +639,7 @@ def _get_flexlate_transaction_parent_from_flexlate_merge_commit(
     flexlate_transaction_parents: List[Commit] = []
     for parent in commit.parents:
         try:
-            FlexlateTransaction.parse_commit_message(parent.message)
+            _parse_commit_message(parent.message)
             flexlate_transaction_parents.append(parent)
         except CannotParseCommitMessageFlexlateTransaction:
             pass
@@ -369,6 +650,23 @@ def _get_flexlate_transaction_parent_from_flexlate_merge_commit(
     return flexlate_transaction_parents[0]
 
 
+def get_transaction_underlying_flexlate_merge_commit(
+    commit: Commit, merged_branch_name: str, template_branch_name: str
+) -> Optional[FlexlateTransaction]:
+    """
+    :return: The transaction merged by the commit, or None if it is not a
+        flexlate merge commit of a transaction
+    """
+    if not _is_flexlate_merge_commit(commit, merged_branch_name, template_branch_name):
+        return None
+    for parent in commit.parents:
+        try:
+            return _parse_commit_message(parent.message)
+        except CannotParseCommitMessageFlexlateTransaction:
+            continue
+    return None
+
+
 def _get_non_flexlate_transaction_parent_from_flexlate_merge_commit(
     commit: Commit, merged_branch_name: str, template_branch_name: str
 ) -> Commit:
@@ -379,7 +677,7 @@ def _get_non_flexlate_transaction_parent_from_flexlate_merge_commit(
     non_flexlate_transaction_parents: List[Commit] = []
     for parent in commit.parents:
         try:
-            FlexlateTransaction.parse_commit_message(parent.message)
+            _parse_commit_message(parent.message)
         except CannotParseCommitMessageFlexlateTransaction:
             non_flexlate_transaction_parents.append(parent)
     if len(non_flexlate_transaction_parents) != 1:
@@ -392,7 +690,12 @@ def _get_non_flexlate_transaction_parent_from_flexlate_merge_commit(
 def _is_flexlate_merge_commit(
     commit: Commit, merged_branch_name: str, template_branch_name: str
 ) -> bool:
-    return (
-        commit.message
-        == f"Merge branch '{template_branch_name}' into {merged_branch_name}\n"
+    return commit.message == _flexlate_merge_commit_message(
+        merged_branch_name, template_branch_name
     )
+
+
+def _flexlate_merge_commit_message(
+    merged_branch_name: str, template_branch_name: str
+) -> str:
+    return f"Merge branch '{template_branch_name}' into {merged_branch_name}\n"
@@ -1,46 +1,23 @@
 from git import Repo
 
-from flexlate.branch_update import undo_transaction_in_flexlate_branches
+from flexlate.branch_update import undo_transactions_in_flexlate_branches
 from flexlate.constants import DEFAULT_MERGED_BRANCH_NAME, DEFAULT_TEMPLATE_BRANCH_NAME
 from flexlate.ext_git import assert_repo_is_in_clean_state
 from flexlate.styles import INFO_STYLE, SUCCESS_STYLE, console, print_styled, styled
+from flexlate.transactions.index import (
+    get_transaction_index,
+    rebuild_transaction_index,
+    remove_transactions_from_index,
+)
 from flexlate.transactions.transaction import (
-    FlexlateTransaction,
     assert_has_at_least_n_transactions,
     assert_last_commit_was_in_a_flexlate_transaction,
-    find_last_transaction_from_commit,
-    reset_last_transaction,
+    find_last_transactions,
+    reset_last_transactions,
 )
 
 
 class Undoer:
-    def undo_transaction(
-        self,
-        repo: Repo,
-        merged_branch_name: str = DEFAULT_MERGED_BRANCH_NAME,
-        base_merged_branch_name: str = DEFAULT_MERGED_BRANCH_NAME,
-        template_branch_name: str = DEFAULT_TEMPLATE_BRANCH_NAME,
-        base_template_branch_name: str = DEFAULT_TEMPLATE_BRANCH_NAME,
-    ):
-        last_transaction = find_last_transaction_from_commit(
-            repo.commit(), merged_branch_name, template_branch_name
-        )
-
-        # Reset the flexlate branches
-        undo_transaction_in_flexlate_branches(
-            repo,
-            last_transaction,
-            merged_branch_name=merged_branch_name,
-            base_merged_branch_name=base_merged_branch_name,
-            template_branch_name=template_branch_name,
-            base_template_branch_name=base_template_branch_name,
-        )
-
-        # Reset the user's branch
-        reset_last_transaction(
-            repo, last_transaction, merged_branch_name, template_branch_name
-        )
-
     def undo_transactions(
         self,
         repo: Repo,
@@ -64,15 +41,49 @@ class Undoer:
         with console.status(
             styled(f"Undoing {num_transactions} flexlate transactions", INFO_STYLE)
         ):
-            for i in range(num_transactions):
-                print_styled(f"Undoing transaction {i + 1}", INFO_STYLE)
-                self.undo_transaction(
-                    repo,
-                    merged_branch_name=merged_branch_name,
-                    base_merged_branch_name=base_merged_branch_name,
-                    template_branch_name=template_branch_name,
-                    base_template_branch_name=base_template_branch_name,
-                )
-                print_styled(
-                    f"Successfully reversed transaction {i + 1}", SUCCESS_STYLE
-                )
+            transaction_index = get_transaction_index(repo)
+            transactions = find_last_transactions(
+                repo,
+                num_transactions,
+                merged_branch_name,
+                template_branch_name,
+                transaction_index=transaction_index,
+            )
+
+            # Reset the flexlate branches
+            undo_transactions_in_flexlate_branches(
+                repo,
+                transactions,
+                merged_branch_name=merged_branch_name,
+                base_merged_branch_name=base_merged_branch_name,
+                template_branch_name=template_branch_name,
+                base_template_branch_name=base_template_branch_name,
+                transaction_index=transaction_index,
+            )
+
+            # Reset the user's branch
+            reset_last_transactions(
+                repo,
+                transactions,
+                merged_branch_name,
+                template_branch_name,
+                transaction_index=transaction_index,
+            )
+            remove_transactions_from_index(
+                repo, [transaction.id for transaction in transactions]
+            )
+        print_styled(
+            f"Successfully reversed {num_transactions} transactions", SUCCESS_STYLE
+        )
+
+    def rebuild_transaction_index(
+        self,
+        repo: Repo,
+        merged_branch_name: str = DEFAULT_MERGED_BRANCH_NAME,
+        template_branch_name: str = DEFAULT_TEMPLATE_BRANCH_NAME,
+    ):
+        with console.status(
+            styled("Rebuilding flexlate transaction index from history", INFO_STYLE)
+        ):
+            rebuild_transaction_index(repo, merged_branch_name, template_branch_name)
+        print_styled("Successfully rebuilt transaction index", SUCCESS_STYLE)
@@ -1,9 +1,9 @@
 import os
 from copy import deepcopy
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
-from git import GitCommandError, Repo
+from git import Repo
 from rich.prompt import Confirm
 
 from flexlate.branch_update import (
@@ -22,15 +22,15 @@ from flexlate.ext_git import (
     assert_repo_is_in_clean_state,
     branch_exists,
     checkout_template_branch,
+    create_template_branch_without_checkout,
     fast_forward_branch_without_checkout,
     get_branch_sha,
     get_merge_conflict_diffs,
+    merge_branch_into_branch_without_checkout,
     merge_branch_into_current,
     repo_has_merge_conflicts,
     reset_branch_to_commit_without_checkout,
-    restore_initial_commit_files,
-    stage_and_commit_all,
-    temp_repo_that_pushes_to_branch,
+    temp_work_tree_for_branch,
     update_local_branches_from_remote_without_checkout,
 )
 from flexlate.finder.multi import MultiFinder
@@ -53,6 +53,7 @@ from flexlate.styles import (
 )
 from flexlate.template.base import Template
 from flexlate.template_data import TemplateData, merge_data
+from flexlate.transactions.index import index_transaction_commits
 from flexlate.transactions.transaction import (
     FlexlateTransaction,
     create_transaction_commit_message,
@@ -75,9 +76,16 @@ class Updater:
         cleanup: bool = True,
         full_rerender: bool = True,
         remote: str = "origin",
+        jobs: int = 1,
         renderer: MultiRenderer = MultiRenderer(),
         config_manager: ConfigManager = ConfigManager(),
+        temp_project_operation: Optional[Callable[[Path], None]] = None,
     ):
+        """
+        :param temp_project_operation: Run with the root of the temp project before
+            rendering, so that its changes are committed along with the update. This
+            is how the applied templates being updated can be added in the same commit
+        """
         assert_repo_is_in_clean_state(repo)
         if repo.working_dir is None:
             raise ValueError("repo working dir should not be none")
@@ -108,20 +116,28 @@ class Updater:
         # Prepare the template branch, this is the branch that stores only the template files
         # Create it from the initial commit if it does not exist
         cwd = Path(os.getcwd())
-        with temp_repo_that_pushes_to_branch(  # type: ignore
+        with temp_work_tree_for_branch(  # type: ignore
             repo,
             branch_name=template_branch_name,
             base_branch_name=base_template_branch_name,
             delete_tracked_files=full_rerender,
             remote=remote,
-        ) as temp_repo:
-            temp_project_root = Path(temp_repo.working_dir)  # type: ignore
+        ) as work_tree:
+            temp_project_root: Path = work_tree.working_dir
             log.debug(
-                f"Working in a temporary repo at {temp_project_root} to update template branch {template_branch_name}"
+                f"Working in a temporary work tree at {temp_project_root} to update template branch {template_branch_name}"
             )
+            if temp_project_operation is not None:
+                temp_project_operation(temp_project_root)
             temp_updates = _move_update_config_locations_to_new_parent(
                 updates, project_root, temp_project_root
             )
+            # Applied templates added by the operation only exist in the temp project,
+            # so the updates must be matched to their configs there
+            if temp_project_operation is None:
+                config_updates, config_project_root = updates, project_root
+            else:
+                config_updates, config_project_root = temp_updates, temp_project_root
             # On first update, don't use template source path. This means that
             # the template paths will be absolute, so they can be loaded even though we are
             # working in a temp directory
@@ -136,7 +152,7 @@ class Updater:
                 )
                 if full_rerender
                 else config_manager.get_renderables_for_updates(
-                    updates, project_root=project_root
+                    config_updates, project_root=config_project_root
                 )
             )
             if full_rerender:
@@ -150,7 +166,7 @@ class Updater:
 
             prompt_set_renderables = (
                 _copy_renderables_skipping_prompts_if_not_in_updates(
-                    orig_renderables, updates, project_root=project_root
+                    orig_renderables, config_updates, project_root=config_project_root
                 )
             )
             renderables = _move_renderable_out_roots_to_new_parent(
@@ -163,13 +179,16 @@ class Updater:
                 cwd, [renderable.out_root for renderable in renderables]
             )
             updated_data = renderer.render(
-                renderables, project_root=temp_project_root, no_input=no_input
+                renderables,
+                project_root=temp_project_root,
+                no_input=no_input,
+                jobs=jobs,
             )
             new_updates = updates_with_updated_data(
-                updates,
+                config_updates,
                 updated_data,
                 renderables,
-                project_root=project_root,
+                project_root=config_project_root,
                 render_root=temp_project_root,
             )
             new_temp_updates = _move_update_config_locations_to_new_parent(
@@ -192,23 +211,21 @@ class Updater:
                 rendered_temp_updates, project_root=temp_project_root
             )
 
+            work_tree.stage_all()
             # Add back initial commit files if they have not been rendered from a template
             if full_rerender:
-                restore_initial_commit_files(temp_repo)
+                work_tree.restore_missing_initial_commit_files()
 
             commit_message = create_transaction_commit_message(
                 _commit_message(renderables), transaction
             )
             try:
-                stage_and_commit_all(temp_repo, commit_message)
-            except GitCommandError as e:
-                if "nothing to commit, working tree clean" in str(e):
-                    # This is expected if user tries to run update or sync when not needed
-                    raise TriedToCommitButNoChangesException(
-                        "update did not make any new changes"
-                    ) from e
-                # Unexpected exception, raise it
-                raise e
+                work_tree.commit_staged(commit_message)
+            except TriedToCommitButNoChangesException as e:
+                # This is expected if user tries to run update or sync when not needed
+                raise TriedToCommitButNoChangesException(
+                    "update did not make any new changes"
+                ) from e
             log.debug("Leaving temp directory")
 
         log.debug(f"Updating merged branch {merged_branch_name}")
@@ -225,52 +242,62 @@ class Updater:
                 repo, merged_branch_name, base_merged_branch_name
             )
 
-        # Now get the output branch updated by merging the current branch into it
-        log.debug(f"Merging {current_branch.name} into {merged_branch_name}")
-        # If the feature output branch exists, check it out
         # If the feature output branch doesn't exist:
         #  If the main output branch exists, start it from the main output branch
         #  If the main output branch doesn't exist, start it from the current branch
-        checkout_template_branch(repo, merged_branch_name, base_merged_branch_name)
-        merge_branch_into_current(repo, current_branch.name)
-
-        # Update with template changes
-        log.debug(f"Merging {template_branch_name} into {merged_branch_name}")
-        merge_branch_into_current(repo, template_branch_name)
-
-        if repo_has_merge_conflicts(repo):
-            log.debug(f"Merge conflicts:\n{get_merge_conflict_diffs(repo)}")
-            if abort_on_conflict:
-                print_styled(
-                    "Repo has merge conflicts after update, aborting due to abort_on_conflict=True",
-                    ALERT_STYLE,
-                )
-                if cleanup:
-                    abort_merge_and_reset_flexlate_branches(
-                        repo,
-                        current_branch,
-                        merged_branch_sha=merged_branch_sha,
-                        template_branch_sha=template_branch_sha,
-                        merged_branch_name=merged_branch_name,
-                        template_branch_name=template_branch_name,
+        create_template_branch_without_checkout(
+            repo, merged_branch_name, base_merged_branch_name
+        )
+        # Merge in memory so the user's working tree is only touched if there are
+        # conflicts for them to resolve
+        log.debug(
+            f"Merging {current_branch.name} and {template_branch_name} into {merged_branch_name}"
+        )
+        merged_without_conflicts = all(
+            merge_branch_into_branch_without_checkout(repo, merged_branch_name, name)
+            for name in [current_branch.name, template_branch_name]
+        )
+        if not merged_without_conflicts:
+            log.debug(f"Checking out {merged_branch_name} to resolve merge conflicts")
+            checkout_template_branch(repo, merged_branch_name, base_merged_branch_name)
+            merge_branch_into_current(repo, current_branch.name)
+            merge_branch_into_current(repo, template_branch_name)
+            if repo_has_merge_conflicts(repo):
+                log.debug(f"Merge conflicts:\n{get_merge_conflict_diffs(repo)}")
+                if abort_on_conflict:
+                    print_styled(
+                        "Repo has merge conflicts after update, aborting due to abort_on_conflict=True",
+                        ALERT_STYLE,
                     )
-                raise MergeConflictsAndAbortException
-
-            # Need to wait for user to resolve merge conflicts
-            aborted = prompt_to_fix_conflicts_and_reset_on_abort_return_aborted(
-                repo,
-                current_branch,
-                merged_branch_sha,
-                template_branch_sha,
-                merged_branch_name,
-                template_branch_name,
-            )
-            if aborted:
-                raise MergeConflictsAndAbortException
+                    if cleanup:
+                        abort_merge_and_reset_flexlate_branches(
+                            repo,
+                            current_branch,
+                            merged_branch_sha=merged_branch_sha,
+                            template_branch_sha=template_branch_sha,
+                            merged_branch_name=merged_branch_name,
+                            template_branch_name=template_branch_name,
+                        )
+                    raise MergeConflictsAndAbortException
+
+                # Need to wait for user to resolve merge conflicts
+                aborted = prompt_to_fix_conflicts_and_reset_on_abort_return_aborted(
+                    repo,
+                    current_branch,
+                    merged_branch_sha,
+                    template_branch_sha,
+                    merged_branch_name,
+                    template_branch_name,
+                )
+                if aborted:
+                    raise MergeConflictsAndAbortException
+            current_branch.checkout()
 
-        # No conflicts, merge back into current branch
-        current_branch.checkout()
+        # Merge back into current branch
         merge_branch_into_current(repo, merged_branch_name)
+        index_transaction_commits(
+            repo, transaction, merged_branch_name, template_branch_name
+        )
 
         # Current working directory or out root may have been deleted if it was a remove operation
         # and there was nothing else in the folder (git does not save folders without files)
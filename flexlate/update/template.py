@@ -1,7 +1,7 @@
 import os.path
 from copy import deepcopy
 from pathlib import Path
-from typing import List, Optional, Sequence
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from pydantic import BaseModel
 
@@ -15,6 +15,9 @@ from flexlate.render.renderable import Renderable
 from flexlate.template.base import Template
 from flexlate.template_data import TemplateData
 
+# Template name, template version, and absolute out root
+RenderableMatchKey = Tuple[str, str, Path]
+
 
 class TemplateUpdate(BaseModel):
     template: Template
@@ -26,10 +29,19 @@ class TemplateUpdate(BaseModel):
         arbitrary_types_allowed = True
 
     def to_applied_template(
-        self, project_root: Path = Path("."), adjust_root: bool = True
+        self,
+        project_root: Path = Path("."),
+        adjust_root: bool = True,
+        config: Optional[FlexlateConfig] = None,
     ) -> AppliedTemplateConfig:
-        config = FlexlateConfig.load(self.config_location)
-        applied_template = config.applied_templates[self.index]
+        """
+        :param config: The already loaded config at the config location, to avoid
+            loading it again. It will not be modified
+        """
+        loaded_config = config or FlexlateConfig.load(self.config_location)
+        applied_template = loaded_config.applied_templates[self.index]
+        if config is not None:
+            applied_template = applied_template.copy()
         if applied_template.name != self.template.name:
             raise CannotFindAppliedTemplateException(
                 f"could not find applied template for name {self.template.name} "
@@ -74,24 +86,30 @@ class TemplateUpdate(BaseModel):
         """
         Note: Does not check template data
         """
-        self_renderable = self.to_renderable(
-            project_root=project_root, adjust_root=adjust_root
-        )
-        self_renderable_out_root: Path = self_renderable.out_root
-        if not self_renderable_out_root.is_absolute():
-            self_renderable_out_root = (
-                render_root / self_renderable_out_root
-            ).resolve()
-        renderable_out_root: Path = renderable.out_root.resolve()
-        if not renderable_out_root.is_absolute():
-            renderable_out_root = (render_root / renderable_out_root).resolve()
-        return all(
-            [
-                self_renderable.template.name == renderable.template.name,
-                self_renderable.template.version == renderable.template.version,
-                self_renderable_out_root == renderable_out_root,
-            ]
+        return self.match_key(
+            project_root=project_root, render_root=render_root, adjust_root=adjust_root
+        ) == _renderable_match_key(renderable)
+
+    def match_key(
+        self,
+        project_root: Path = Path("."),
+        render_root: Path = Path("."),
+        adjust_root: bool = True,
+        config: Optional[FlexlateConfig] = None,
+    ) -> RenderableMatchKey:
+        """
+        Creates a key which is equal to the key of the renderable this update is for
+
+        :param config: The already loaded config at the config location, to avoid
+            loading it again
+        """
+        applied_template = self.to_applied_template(
+            project_root=project_root, adjust_root=adjust_root, config=config
         )
+        out_root = applied_template.root
+        if not out_root.is_absolute():
+            out_root = (render_root / out_root).resolve()
+        return self.template.name, self.template.version, out_root
 
 
 def data_from_template_updates(updates: Sequence[TemplateUpdate]) -> List[TemplateData]:
@@ -110,20 +128,27 @@ def updates_with_updated_data(
         raise InvalidTemplateDataException(
             f"should have equal length data {data} and renderables {renderables}"
         )
+    data_by_key: Dict[RenderableMatchKey, TemplateData] = {}
+    for renderable, renderable_data in zip(renderables, data):
+        # Keep the first match, as when searching in order
+        data_by_key.setdefault(_renderable_match_key(renderable), renderable_data)
+
+    # Load each config once rather than once per update
+    configs: Dict[Path, FlexlateConfig] = {}
     out_updates: List[TemplateUpdate] = []
     for update in updates:
         new_update = deepcopy(update)
-        # TODO: more efficient algorithm for matching rendered data with updates
-        this_update_data: Optional[TemplateData] = None
-        for i, renderable in enumerate(renderables):
-            if update.matches_renderable(
-                renderable,
-                project_root=project_root,
-                render_root=render_root,
-                adjust_root=adjust_root,
-            ):
-                this_update_data = data[i]
-                break
+        if update.config_location not in configs:
+            configs[update.config_location] = FlexlateConfig.load(
+                update.config_location
+            )
+        key = update.match_key(
+            project_root=project_root,
+            render_root=render_root,
+            adjust_root=adjust_root,
+            config=configs[update.config_location],
+        )
+        this_update_data = data_by_key.get(key)
         if this_update_data is None:
             raise InvalidTemplateDataException(
                 f"Could not find matching renderable for update {update} with "
@@ -132,3 +157,11 @@ def updates_with_updated_data(
         new_update.data = this_update_data
         out_updates.append(new_update)
     return out_updates
+
+
+def _renderable_match_key(renderable: Renderable) -> RenderableMatchKey:
+    return (
+        renderable.template.name,
+        renderable.template.version,
+        renderable.out_root.resolve(),
+    )
@@ -2,7 +2,13 @@ import os
 
 import pytest
 
+from flexlate import config as flexlate_config
 from flexlate import template_path
+from flexlate.render.bytecode_cache import jinja_bytecode_cache
+from flexlate.render.specific import cookiecutter as specific_cookiecutter
+from flexlate.render.specific import copier as specific_copier
+from flexlate.template import hashing
+from flexlate.template_config.cache import template_config_cache
 from tests import config
 from tests.dirutils import create_temp_path_without_cleanup, wipe_generated_folder
 
@@ -32,6 +38,23 @@ def before_each(monkeypatch):
     monkeypatch.setattr(template_path, "CLONED_REPO_FOLDER", config.GENERATED_FILES_DIR)
 
 
+@pytest.fixture(scope="function", autouse=True)
+def isolated_caches(monkeypatch, tmp_path):
+    # Start every test with empty caches outside the user dir, so that cached
+    # results from other tests or runs cannot hide regressions
+    monkeypatch.setattr(
+        hashing,
+        "_default_index",
+        hashing.DirectoryHashIndex(tmp_path / "hash-index.json"),
+    )
+    monkeypatch.setattr(jinja_bytecode_cache, "folder", tmp_path / "bytecode-cache")
+    monkeypatch.setattr(jinja_bytecode_cache, "_size", None)
+    flexlate_config.parsed_config_cache.clear()
+    template_config_cache.clear()
+    specific_cookiecutter._get_environment.cache_clear()
+    specific_copier._get_environment.cache_clear()
+
+
 @pytest.fixture(scope="function", autouse=True)
 def after_each():
     yield
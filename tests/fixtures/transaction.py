@@ -13,6 +13,7 @@ UPDATE_TRANSACTION_ID = UUID("347711b7-3bf9-484e-be52-df488f3cf598")
 SYNC_TRANSACTION_ID = UUID("4825ce35-1a03-43de-ad8a-1ecc0ed68b62")
 BOOTSTRAP_TRANSACTION_ID = UUID("37c61224-2b8d-4ee5-8846-49d5474a40bd")
 UPDATE_TARGET_VERSION_ID = UUID("a5632854-48b4-4f82-904b-bff81dc40b02")
+BATCH_TRANSACTION_ID = UUID("5f0f3d3e-8a4b-4c3e-9d6a-2b7c1e4f9a10")
 
 
 @pytest.fixture
@@ -64,3 +65,8 @@ def update_target_version_transaction() -> FlexlateTransaction:
     yield FlexlateTransaction(
         type=TransactionType.UPDATE_TARGET_VERSION, id=UPDATE_TARGET_VERSION_ID
     )
+
+
+@pytest.fixture
+def batch_transaction() -> FlexlateTransaction:
+    yield FlexlateTransaction(type=TransactionType.BATCH, id=BATCH_TRANSACTION_ID)
@@ -80,6 +80,13 @@ def accept_theirs_in_merge_conflict(repo: Repo):
     repo.git.checkout("--theirs", ".")
 
 
+def get_number_of_checkouts(repo: Repo) -> int:
+    reflog_subjects = repo.git.reflog("show", "--format=%gs", "HEAD").splitlines()
+    return len(
+        [subject for subject in reflog_subjects if subject.startswith("checkout:")]
+    )
+
+
 def reset_n_commits_without_checkout(
     repo: Repo, branch_name: str, n_commits: int = 1, ignore_merges: bool = True
 ):
@@ -242,6 +242,7 @@ class CLIStubFlexlate(Flexlate):
         no_cleanup: bool = False,
         quiet: bool = False,
         project_path: Path = Path("."),
+        jobs: int = 1,
     ):
         self.fxt(
             [
@@ -249,6 +250,8 @@ class CLIStubFlexlate(Flexlate):
                 *_value_if_not_none(names),
                 "--path",
                 str(project_path),
+                "--jobs",
+                str(jobs),
                 *_bool_flag(no_input, "no-input"),
                 *_bool_flag(quiet, "quiet"),
                 *_bool_flag(abort_on_conflict, "abort"),
@@ -265,11 +268,14 @@ class CLIStubFlexlate(Flexlate):
         prompt: bool = False,
         quiet: bool = False,
         project_path: Path = Path("."),
+        jobs: int = 1,
     ):
         return self.fxt(
             [
                 "sync",
                 str(project_path),
+                "--jobs",
+                str(jobs),
                 *_bool_flag(prompt, "prompt"),
                 *_bool_flag(quiet, "quiet"),
             ]
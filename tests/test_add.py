@@ -33,6 +33,7 @@ from tests.fs_checks import (
 from tests.gitutils import (
     accept_theirs_in_merge_conflict,
     assert_main_commit_message_matches,
+    get_number_of_checkouts,
 )
 
 
@@ -55,6 +56,26 @@ def test_add_template_source_to_repo(
     )
 
 
+def test_add_template_source_does_not_check_out_flexlate_branches(
+    repo_with_placeholder_committed: Repo,
+    cookiecutter_one_template: CookiecutterTemplate,
+    add_source_transaction: FlexlateTransaction,
+):
+    repo = repo_with_placeholder_committed
+    orig_num_checkouts = get_number_of_checkouts(repo)
+    adder = Adder()
+    adder.add_template_source(
+        repo,
+        cookiecutter_one_template,
+        add_source_transaction,
+        out_root=test_config.GENERATED_REPO_DIR,
+    )
+    assert_template_source_cookiecutter_one_added_correctly(cookiecutter_one_template)
+    assert get_number_of_checkouts(repo) == orig_num_checkouts
+    merged_branch: Head = repo.branches[DEFAULT_MERGED_BRANCH_NAME]  # type: ignore
+    assert repo.commit() == merged_branch.commit
+
+
 def test_add_template_source_with_existing_name_fails(
     repo_with_cookiecutter_one_template_source: Repo,
     copier_one_template: CopierTemplate,
@@ -111,6 +132,41 @@ def test_add_local_cookiecutter_applied_template_to_repo(
             template, config_dir, template_root, add_mode
         )
 
+    # Config and output are added in a single commit
+    transaction_commits = [
+        commit
+        for commit in repo.iter_commits(DEFAULT_TEMPLATE_BRANCH_NAME)
+        if str(add_output_transaction.id) in commit.message
+    ]
+    assert len(transaction_commits) == 1
+
+
+def test_add_applied_template_ignores_repo_info_exclude(
+    repo_with_cookiecutter_one_template_source: Repo,
+    cookiecutter_one_template: CookiecutterTemplate,
+    add_output_transaction: FlexlateTransaction,
+):
+    repo = repo_with_cookiecutter_one_template_source
+    # Local excludes are not part of the project, so they must not affect output
+    exclude_path = Path(repo.git_dir) / "info" / "exclude"
+    exclude_path.parent.mkdir(exist_ok=True)
+    exclude_path.write_text("text.txt\n")
+
+    adder = Adder()
+    adder.apply_template_and_add(
+        repo,
+        cookiecutter_one_template,
+        add_output_transaction,
+        out_root=test_config.GENERATED_REPO_DIR,
+        no_input=True,
+    )
+
+    assert repo.git.show(f"{DEFAULT_TEMPLATE_BRANCH_NAME}:b/text.txt") == "b"
+    assert (
+        cookiecutter_one_generated_text_content(gen_dir=test_config.GENERATED_REPO_DIR)
+        == "b"
+    )
+
 
 def test_add_local_copier_output_subdir_applied_template_to_repo(
     add_mode: AddMode,
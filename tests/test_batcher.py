@@ -0,0 +1,106 @@
+from flexlate.batcher import Batcher
+from flexlate.config import FlexlateConfig
+from flexlate.constants import DEFAULT_TEMPLATE_BRANCH_NAME
+from flexlate.manifest import (
+    BatchManifest,
+    ManifestOutputToAdd,
+    ManifestOutputToRemove,
+    ManifestSourceToAdd,
+)
+from flexlate.transactions.transaction import FlexlateTransaction
+from flexlate.transactions.undoer import Undoer
+from tests import config as test_config
+from tests.config import COOKIECUTTER_ONE_DIR, COOKIECUTTER_ONE_NAME
+from tests.fixtures.templated_repo import *
+from tests.fixtures.transaction import batch_transaction
+
+
+def test_apply_manifest_adds_source_and_outputs_in_one_transaction(
+    repo_with_placeholder_committed: Repo,
+    batch_transaction: FlexlateTransaction,
+):
+    repo = repo_with_placeholder_committed
+    orig_commit = repo.commit()
+    manifest = BatchManifest(
+        add_sources=[ManifestSourceToAdd(path=str(COOKIECUTTER_ONE_DIR))],
+        add_outputs=[
+            ManifestOutputToAdd(name=COOKIECUTTER_ONE_NAME, data={"a": "b"}),
+            ManifestOutputToAdd(
+                name=COOKIECUTTER_ONE_NAME, out_root=Path("subdir"), data={"a": "d"}
+            ),
+        ],
+    )
+    batcher = Batcher()
+    with change_directory_to(test_config.GENERATED_REPO_DIR):
+        batcher.apply_manifest(repo, manifest, batch_transaction, no_input=True)
+
+    source_config = FlexlateConfig.load(
+        test_config.GENERATED_REPO_DIR / "flexlate.json"
+    )
+    assert [source.name for source in source_config.template_sources] == [
+        COOKIECUTTER_ONE_NAME
+    ]
+    for value, output_dir in [
+        ("b", test_config.GENERATED_REPO_DIR / "b"),
+        ("d", test_config.GENERATED_REPO_DIR / "subdir" / "d"),
+    ]:
+        assert (output_dir / "text.txt").read_text() == value
+        config = FlexlateConfig.load(output_dir / "flexlate.json")
+        assert len(config.applied_templates) == 1
+        assert config.applied_templates[0].data == {"a": value, "c": ""}
+
+    transaction_commits = [
+        commit
+        for commit in repo.iter_commits(DEFAULT_TEMPLATE_BRANCH_NAME)
+        if str(batch_transaction.id) in commit.message
+    ]
+    assert len(transaction_commits) == 1
+
+    # The whole batch is undone together
+    with change_directory_to(test_config.GENERATED_REPO_DIR):
+        Undoer().undo_transactions(repo)
+    assert repo.commit() == orig_commit
+    assert not (test_config.GENERATED_REPO_DIR / "flexlate.json").exists()
+    assert not (test_config.GENERATED_REPO_DIR / "b").exists()
+    assert not (test_config.GENERATED_REPO_DIR / "subdir").exists()
+
+
+def test_apply_manifest_removes_and_adds_outputs(
+    repo_with_template_branch_from_cookiecutter_one: Repo,
+    batch_transaction: FlexlateTransaction,
+):
+    repo = repo_with_template_branch_from_cookiecutter_one
+    manifest = BatchManifest(
+        remove_outputs=[ManifestOutputToRemove(name=COOKIECUTTER_ONE_NAME)],
+        add_outputs=[ManifestOutputToAdd(name=COOKIECUTTER_ONE_NAME, data={"a": "d"})],
+    )
+    batcher = Batcher()
+    with change_directory_to(test_config.GENERATED_REPO_DIR):
+        batcher.apply_manifest(repo, manifest, batch_transaction, no_input=True)
+
+    assert not (test_config.GENERATED_REPO_DIR / "b" / "text.txt").exists()
+    output_dir = test_config.GENERATED_REPO_DIR / "d"
+    assert (output_dir / "text.txt").read_text() == "d"
+    config = FlexlateConfig.load(output_dir / "flexlate.json")
+    assert len(config.applied_templates) == 1
+    assert config.applied_templates[0].data == {"a": "d", "c": ""}
+
+
+def test_load_manifest_from_yaml():
+    manifest_path = test_config.GENERATED_FILES_DIR / "manifest.yaml"
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(
+        "add_outputs:\n"
+        "  - name: one\n"
+        "    out_root: subdir\n"
+        "    data:\n"
+        "      a: b\n"
+        "remove_sources:\n"
+        "  - name: two\n"
+    )
+    manifest = BatchManifest.load(manifest_path)
+    assert manifest.add_sources == []
+    assert manifest.add_outputs == [
+        ManifestOutputToAdd(name="one", out_root=Path("subdir"), data={"a": "b"})
+    ]
+    assert [source.name for source in manifest.remove_sources] == ["two"]
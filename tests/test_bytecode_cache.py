@@ -0,0 +1,55 @@
+import os
+from pathlib import Path
+from typing import List
+
+from jinja2 import Environment, FileSystemLoader
+
+from flexlate.render.bytecode_cache import LRUFileSystemBytecodeCache
+from flexlate.temp_path import create_temp_path
+
+
+def _render_templates(
+    template_folder: Path, cache: LRUFileSystemBytecodeCache, names: List[str]
+) -> List[str]:
+    env = Environment(
+        loader=FileSystemLoader(str(template_folder)), bytecode_cache=cache
+    )
+    return [env.get_template(name).render(value="b") for name in names]
+
+
+def test_bytecode_cache_reuses_compiled_templates():
+    with create_temp_path() as temp_path:
+        template_folder = temp_path / "templates"
+        template_folder.mkdir()
+        (template_folder / "a.txt").write_text("a {{ value }}")
+        cache = LRUFileSystemBytecodeCache(temp_path / "cache")
+
+        assert _render_templates(template_folder, cache, ["a.txt"]) == ["a b"]
+        assert len(list((temp_path / "cache").iterdir())) == 1
+        assert _render_templates(template_folder, cache, ["a.txt"]) == ["a b"]
+
+        # A changed template must not use the old bytecode
+        (template_folder / "a.txt").write_text("changed {{ value }}")
+        assert _render_templates(template_folder, cache, ["a.txt"]) == ["changed b"]
+
+
+def test_bytecode_cache_evicts_least_recently_used():
+    with create_temp_path() as temp_path:
+        template_folder = temp_path / "templates"
+        template_folder.mkdir()
+        names = [f"{i}.txt" for i in range(5)]
+        for name in names:
+            (template_folder / name).write_text(name + " {{ value }}")
+        cache_folder = temp_path / "cache"
+        _render_templates(
+            template_folder, LRUFileSystemBytecodeCache(cache_folder), names[:1]
+        )
+        entry_size = next(cache_folder.iterdir()).stat().st_size
+        cache = LRUFileSystemBytecodeCache(cache_folder, max_size=entry_size * 3)
+        first_entry = next(cache_folder.iterdir())
+        os.utime(first_entry, ns=(0, 0))
+
+        _render_templates(template_folder, cache, names[1:])
+        entries = list(cache_folder.iterdir())
+        assert sum(entry.stat().st_size for entry in entries) <= entry_size * 3
+        assert first_entry not in entries
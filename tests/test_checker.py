@@ -1,14 +1,29 @@
-from typing import Optional
+import os
+import shutil
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
 
 import pytest
+from _pytest.monkeypatch import MonkeyPatch
 from git import Repo
 
 from flexlate.checker import Checker
 from flexlate.config import FlexlateConfig
 from flexlate.exc import TemplateNotRegisteredException
+from flexlate.finder.multi import MultiFinder
+from flexlate.template import hashing
+from flexlate.template.base import Template
 from flexlate.template.copier import CopierTemplate
+from flexlate.template.hashing import DirectoryHashIndex, md5_dir
 from tests import config
-from tests.config import COOKIECUTTER_REMOTE_NAME, COPIER_ONE_NAME
+from tests.config import (
+    COOKIECUTTER_ONE_NAME,
+    COOKIECUTTER_ONE_VERSION,
+    COOKIECUTTER_REMOTE_NAME,
+    COPIER_ONE_NAME,
+)
 from tests.fixtures.template import *
 from tests.fixtures.templated_repo import *
 from tests.fixtures.transaction import *
@@ -60,3 +75,109 @@ def test_check_for_update_template_that_does_not_exist(
         checker.find_new_versions_for_template_sources(
             names=["some-fake-template"], project_root=config.GENERATED_REPO_DIR
         )
+
+
+def test_check_for_local_template_updates_looks_up_each_location_once(
+    repo_with_cookiecutter_one_template_source: Repo,
+):
+    # Add another source pointing to the same template
+    config_path = config.GENERATED_REPO_DIR / "flexlate.json"
+    flexlate_config = FlexlateConfig.load(config_path)
+    duplicate_source = flexlate_config.template_sources[0].copy()
+    duplicate_source.name = "duplicate"
+    flexlate_config.template_sources.append(duplicate_source)
+    flexlate_config.save()
+
+    found_paths: List[str] = []
+
+    class RecordingFinder(MultiFinder):
+        def find(self, path: str, *args, **kwargs) -> Template:
+            found_paths.append(path)
+            return super().find(path, *args, **kwargs)
+
+    results = Checker().find_new_versions_for_template_sources(
+        project_root=config.GENERATED_REPO_DIR, finder=RecordingFinder()
+    )
+    assert [result.source_name for result in results.results] == [
+        COOKIECUTTER_ONE_NAME,
+        "duplicate",
+    ]
+    assert [result.latest_version for result in results.results] == [
+        COOKIECUTTER_ONE_VERSION,
+        COOKIECUTTER_ONE_VERSION,
+    ]
+    assert not results.has_updates
+    assert len(found_paths) == 1
+
+
+def test_check_many_local_templates_concurrently(
+    repo_with_cookiecutter_one_template_source: Repo, monkeypatch: MonkeyPatch
+):
+    config_path = config.GENERATED_REPO_DIR / "flexlate.json"
+    flexlate_config = FlexlateConfig.load(config_path)
+    orig_source = flexlate_config.template_sources[0]
+    template_dirs: List[Path] = []
+    for i in range(16):
+        template_dir = config.GENERATED_FILES_DIR / "templates" / str(i)
+        shutil.copytree(config.COOKIECUTTER_ONE_DIR, template_dir)
+        # Enough files that hashing in the threads overlaps
+        assets_dir = template_dir / "assets"
+        assets_dir.mkdir()
+        for j in range(100):
+            (assets_dir / f"{j}.txt").write_text(str(j))
+        source = orig_source.copy()
+        source.name = f"template-{i}"
+        source.path = str(template_dir)
+        source.version = md5_dir(template_dir)
+        if i % 2:
+            # Half the templates have changed since they were added
+            (template_dir / "extra.txt").write_text(str(i))
+        # Old enough that the hashes are stored in the index
+        for root, folders, files in os.walk(template_dir):
+            for name in [*folders, *files]:
+                os.utime(os.path.join(root, name), ns=(0, 0))
+        flexlate_config.template_sources.append(source)
+        template_dirs.append(template_dir)
+    flexlate_config.save()
+
+    def check_all_concurrently():
+        results = Checker().find_new_versions_for_template_sources(
+            project_root=config.GENERATED_REPO_DIR, max_workers=8
+        )
+        assert [result.source_name for result in results.results] == [
+            COOKIECUTTER_ONE_NAME,
+            *[f"template-{i}" for i in range(16)],
+        ]
+        assert [result.latest_version for result in results.results] == [
+            COOKIECUTTER_ONE_VERSION,
+            *[md5_dir(template_dir) for template_dir in template_dirs],
+        ]
+        assert results.update_version_dict == {
+            f"template-{i}": md5_dir(template_dir)
+            for i, template_dir in enumerate(template_dirs)
+            if i % 2
+        }
+
+    with _switching_threads_often():
+        check_all_concurrently()
+
+    # Check again as a new run would, loading the stored hashes while
+    # the changed templates are hashed again
+    monkeypatch.setattr(
+        hashing, "_default_index", DirectoryHashIndex(hashing._default_index.path)
+    )
+    for template_dir in template_dirs[::2]:
+        os.utime(template_dir / "cookiecutter.json", ns=(1, 1))
+    with _switching_threads_often():
+        check_all_concurrently()
+
+
+@contextmanager
+def _switching_threads_often():
+    # Makes unsafe sharing of state between threads much more likely to fail
+    orig_switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        yield
+    finally:
+        sys.setswitchinterval(orig_switch_interval)
@@ -2,11 +2,13 @@ import os.path
 import shutil
 from pathlib import Path
 from typing import Optional
+from unittest.mock import patch
 
 from flexlate.add_mode import AddMode
 from flexlate.config import AppliedTemplateConfig, FlexlateConfig, FlexlateProjectConfig
 from flexlate.config_manager import ConfigManager
 from flexlate.exc import FlexlateProjectConfigFileNotExistsException
+from flexlate.finder.multi import MultiFinder
 from flexlate.update.main import Updater
 from flexlate.update.template import TemplateUpdate
 from tests import config as test_config
@@ -166,3 +168,110 @@ def test_update_template_source_version(
         project_root=test_config.GENERATED_FILES_DIR,
     )
     assert_target_version_is(target_version)
+
+
+def test_config_lookups_stay_in_sync_after_changes(
+    generated_dir_with_configs: None,
+):
+    root = test_config.GENERATED_FILES_DIR
+    config_path = root / "flexlate.json"
+    subdir_config_path = root / "subdir2" / "flexlate.json"
+    new_config_path = root / "subdir1" / "flexlate.json"
+    manager = ConfigManager()
+    config = manager.load_config(root, adjust_applied_paths=False)
+    assert config.get_template_source_config_path("one") == config_path
+    assert config.get_num_applied_templates_in_child_config(config_path) == 2
+
+    config.remove_applied_template(
+        "one",
+        config_path,
+        project_root=root,
+        out_root=Path("subdir1"),
+        orig_project_root=root,
+    )
+    assert config.get_num_applied_templates_in_child_config(config_path) == 1
+    assert [at.root for at in config.applied_templates if at.name == "one"] == [
+        Path("."),
+        Path("subdir2_2"),
+    ]
+
+    # Root config copy is found by its position in the child config after removing
+    def _set_version(applied_template: AppliedTemplateConfig):
+        applied_template.version = "new version"
+
+    config.update_applied_template(_set_version, config_path, 0)
+    assert [
+        at.version
+        for at in config.applied_templates
+        if at.name == "one" and at.root == Path(".")
+    ] == ["new version"]
+
+    config.move_template_source("two", subdir_config_path, new_config_path)
+    assert config.get_template_source_config_path("two") == new_config_path
+    assert config.get_num_applied_templates_in_child_config(new_config_path) == 0
+
+
+def test_load_multi_config_skips_ignored_folders(
+    generated_dir_with_configs: None,
+):
+    root = test_config.GENERATED_FILES_DIR
+    manager = ConfigManager()
+    orig_config = manager.load_config(root)
+    for folder in ["node_modules", ".git", "venv"]:
+        ignored_folder = root / "subdir2" / folder
+        ignored_folder.mkdir()
+        shutil.copy(root / "flexlate.json", ignored_folder / "flexlate.json")
+    (root / "subdir2" / "venv" / "pyvenv.cfg").touch()
+
+    config = manager.load_config(root)
+    assert len(config.child_configs) == len(orig_config.child_configs)
+    assert config.applied_templates == orig_config.applied_templates
+
+
+def test_load_config_uses_parsed_config_cache(
+    generated_dir_with_configs: None,
+):
+    config_path = test_config.GENERATED_FILES_DIR / "flexlate.json"
+    config = FlexlateConfig.load(config_path)
+    orig_applied_templates = list(config.applied_templates)
+
+    # Each load gets its own copy, so changes don't affect other loads
+    config.applied_templates.clear()
+    assert FlexlateConfig.load(config_path).applied_templates == orig_applied_templates
+
+    # Saving must invalidate the cached config
+    config.save()
+    assert FlexlateConfig.load(config_path).applied_templates == []
+
+    # Writing the file outside of flexlate must also be picked up
+    shutil.copy(CONFIGS_DIR / "flexlate.json", config_path)
+    reloaded = FlexlateConfig.load(config_path)
+    assert reloaded.applied_templates == orig_applied_templates
+    assert reloaded.settings.config_location == config_path
+    for applied_template in reloaded.applied_templates:
+        assert applied_template._config_file_location == config_path
+
+
+def test_get_all_renderables_shares_templates_of_the_same_source(
+    generated_dir_with_configs: None,
+):
+    manager = ConfigManager()
+    with patch.object(
+        MultiFinder, "find", autospec=True, side_effect=MultiFinder.find
+    ) as mock_find:
+        renderables = manager.get_all_renderables(
+            project_root=test_config.GENERATED_FILES_DIR
+        )
+    assert len(renderables) == 4
+    # Three applied templates of one at the same version and one applied template of two
+    assert mock_find.call_count == 2
+    one_templates = [
+        renderable.template
+        for renderable in renderables
+        if renderable.template.name == "one"
+    ]
+    assert len(one_templates) == 3
+    assert all(template is one_templates[0] for template in one_templates)
+
+    templates = manager.get_all_templates(project_root=test_config.GENERATED_FILES_DIR)
+    assert [template.name for template in templates] == ["one", "two"]
@@ -0,0 +1,76 @@
+from pathlib import Path
+from typing import Tuple
+
+import pytest
+
+from flexlate.ext_git import (
+    delete_all_tracked_files,
+    list_tracked_files,
+    stage_and_commit_all,
+    temp_repo_that_pushes_to_branch,
+)
+from tests import config
+from tests.gitutils import create_empty_repo
+
+UNUSUAL_FILE_NAMES = [
+    "with space.txt",
+    'double"quote.txt',
+    "single'quote.txt",
+    "new\nline.txt",
+    "tab\tname.txt",
+    "back\\slash.txt",
+    "ünïcödé.txt",
+    "日本語.txt",
+]
+
+
+def test_list_tracked_files_with_unusual_names():
+    repo = create_empty_repo()
+    folder = config.GENERATED_REPO_DIR / 'sub dir "ü"'
+    folder.mkdir()
+    expect_paths = {config.GENERATED_REPO_DIR / name for name in UNUSUAL_FILE_NAMES}
+    expect_paths.update(folder / name for name in UNUSUAL_FILE_NAMES)
+    for path in expect_paths:
+        path.write_text(path.name)
+    stage_and_commit_all(repo, "Add files with unusual names")
+    untracked_path = config.GENERATED_REPO_DIR / "untracked file.txt"
+    untracked_path.write_text("untracked")
+
+    assert list_tracked_files(repo) == expect_paths
+
+    delete_all_tracked_files(repo)
+    assert not any(path.exists() for path in expect_paths)
+    assert untracked_path.exists()
+
+
+@pytest.mark.parametrize("additional_branches", [(), ("other-branch",)])
+def test_temp_repo_shares_objects_and_pushes_them_back(
+    additional_branches: Tuple[str, ...],
+):
+    repo = create_empty_repo()
+    (config.GENERATED_REPO_DIR / "existing.txt").write_text("existing")
+    stage_and_commit_all(repo, "Initial commit")
+    branch_name = "flexlate-branch"
+    for name in [branch_name, *additional_branches]:
+        repo.create_head(name)
+
+    with temp_repo_that_pushes_to_branch(  # type: ignore
+        repo,
+        branch_name=branch_name,
+        base_branch_name=repo.active_branch.name,
+        additional_branches=additional_branches,
+    ) as temp_repo:
+        temp_repo_path = Path(temp_repo.working_dir)
+        # Objects of the original repo are used in place rather than copied
+        alternates_path = Path(temp_repo.git_dir) / "objects" / "info" / "alternates"
+        assert alternates_path.exists()
+        (temp_repo_path / "new.txt").write_text("new")
+        stage_and_commit_all(temp_repo, "Commit in temp repo")
+        temp_commit_sha = temp_repo.commit().hexsha
+    assert not temp_repo_path.exists()
+
+    # Everything committed in the temp repo is now in the original repo's objects
+    repo.git.fsck("--full", "--strict")
+    assert repo.branches[branch_name].commit.hexsha == temp_commit_sha  # type: ignore
+    assert repo.git.show(f"{branch_name}:new.txt") == "new"
+    assert repo.git.show(f"{branch_name}:existing.txt") == "existing"
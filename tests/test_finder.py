@@ -1,4 +1,6 @@
+import shutil
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
@@ -9,6 +11,7 @@ from flexlate.path_ops import change_directory_to
 from flexlate.temp_path import create_temp_path
 from flexlate.template.base import Template
 from flexlate.template.cookiecutter import CookiecutterTemplate
+from flexlate.template_config import cache as template_config_cache_module
 from flexlate.template_path import get_local_repo_path_and_name_cloning_if_repo_url
 from tests import config
 from tests.config import (
@@ -214,3 +217,29 @@ def test_multi_finder_get_copier_remote_template(version: str, expect_contents:
     assert template.render_relative_root_in_template == Path("output")
     template_file = template.path / "output" / "{{ question1 }}.txt.jinja"
     assert template_file.read_text() == expect_contents
+
+
+def test_finders_parse_each_template_config_once():
+    finder = CopierFinder()
+    with patch.object(
+        template_config_cache_module,
+        "load_config_data",
+        wraps=template_config_cache_module.load_config_data,
+    ) as mock_load:
+        with create_temp_path() as temp_path:
+            template_path = temp_path / "template"
+            shutil.copytree(COPIER_ONE_DIR, template_path)
+            config_one = finder.get_config(template_path)
+            # Configs are independent copies
+            config_one.defaults["q1"] = "changed"
+            config_two = finder.get_config(template_path)
+            assert config_two.defaults["q1"] == "a1"
+            num_parses = mock_load.call_count
+
+            # Changing the config must parse it again
+            copier_yaml_path = template_path / "copier.yml"
+            copier_yaml_path.write_text(
+                copier_yaml_path.read_text().replace("q1: a1", "q1: a2")
+            )
+            assert finder.get_config(template_path).defaults["q1"] == "a2"
+            assert mock_load.call_count == num_parses + 1
@@ -0,0 +1,129 @@
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from git import Repo
+
+from flexlate.ext_git import stage_and_commit_all
+from flexlate.temp_path import create_temp_path
+from flexlate.template import hashing
+from flexlate.template.hashing import DirectoryHashIndex, md5_dir
+from tests.config import COOKIECUTTER_ONE_DIR, COOKIECUTTER_ONE_VERSION
+
+
+def test_hash_index_matches_md5_dir():
+    with create_temp_path() as temp_path:
+        index = DirectoryHashIndex(temp_path / "index.json")
+        assert index.md5_dir(COOKIECUTTER_ONE_DIR) == COOKIECUTTER_ONE_VERSION
+        # Loaded from a fresh index so that it must come from the file
+        new_index = DirectoryHashIndex(temp_path / "index.json")
+        assert new_index.md5_dir(COOKIECUTTER_ONE_DIR) == COOKIECUTTER_ONE_VERSION
+
+
+def test_hash_index_rehashes_changed_files():
+    with create_temp_path() as temp_path:
+        template_dir = temp_path / "template"
+        shutil.copytree(COOKIECUTTER_ONE_DIR, template_dir)
+        # Set old mtimes so that the files are not considered recently modified
+        for root, folders, files in os.walk(template_dir):
+            for name in [*folders, *files]:
+                os.utime(os.path.join(root, name), ns=(0, 0))
+        index = DirectoryHashIndex(temp_path / "index.json")
+        assert index.md5_dir(template_dir) == COOKIECUTTER_ONE_VERSION
+
+        (template_dir / "cookiecutter.json").write_text("{}")
+        assert index.md5_dir(template_dir) == md5_dir(template_dir)
+        assert index.md5_dir(template_dir) != COOKIECUTTER_ONE_VERSION
+
+
+def _copy_template_with_old_mtimes(template_dir: Path):
+    shutil.copytree(COOKIECUTTER_ONE_DIR, template_dir)
+    # Set old mtimes so that the files are not considered recently modified
+    for root, folders, files in os.walk(template_dir):
+        for name in [*folders, *files]:
+            os.utime(os.path.join(root, name), ns=(0, 0))
+
+
+def test_hash_index_does_not_read_unchanged_directory():
+    with create_temp_path() as temp_path:
+        template_dir = temp_path / "template"
+        _copy_template_with_old_mtimes(template_dir)
+        index = DirectoryHashIndex(temp_path / "index.json")
+        assert index.md5_dir(template_dir) == COOKIECUTTER_ONE_VERSION
+
+        new_index = DirectoryHashIndex(temp_path / "index.json")
+        with patch.object(hashing, "md5_dir") as mock_md5_dir:
+            assert new_index.md5_dir(template_dir) == COOKIECUTTER_ONE_VERSION
+            mock_md5_dir.assert_not_called()
+
+
+def test_hash_index_prunes_deleted_directories():
+    with create_temp_path() as temp_path:
+        index_path = temp_path / "index.json"
+        template_dir = temp_path / "template"
+        other_template_dir = temp_path / "other-template"
+        _copy_template_with_old_mtimes(template_dir)
+        _copy_template_with_old_mtimes(other_template_dir)
+        index = DirectoryHashIndex(index_path)
+        index.md5_dir(template_dir)
+        index.md5_dir(other_template_dir)
+        assert str(other_template_dir.resolve()) in json.loads(index_path.read_text())
+
+        shutil.rmtree(other_template_dir)
+        (template_dir / "cookiecutter.json").write_text("{}")
+        os.utime(template_dir / "cookiecutter.json", ns=(1, 1))
+        DirectoryHashIndex(index_path).md5_dir(template_dir)
+        assert list(json.loads(index_path.read_text())) == [str(template_dir.resolve())]
+
+
+def test_hash_index_hashes_many_directories_concurrently():
+    with create_temp_path() as temp_path:
+        template_dirs = [temp_path / f"template-{i}" for i in range(16)]
+        for template_dir in template_dirs:
+            _copy_template_with_old_mtimes(template_dir)
+            (template_dir / "cookiecutter.json").write_text(str(template_dir))
+            os.utime(template_dir / "cookiecutter.json", ns=(1, 1))
+        index_path = temp_path / "index.json"
+        index = DirectoryHashIndex(index_path)
+        with ThreadPoolExecutor(8) as executor:
+            digests = list(executor.map(index.md5_dir, template_dirs))
+
+        assert digests == [md5_dir(template_dir) for template_dir in template_dirs]
+        assert len(json.loads(index_path.read_text())) == len(template_dirs)
+        assert list(temp_path.glob("index.json.*")) == []
+
+
+def test_hash_index_uses_git_index_for_committed_directory():
+    with create_temp_path() as temp_path:
+        repo_dir = temp_path / "repo"
+        template_dir = repo_dir / "template"
+        shutil.copytree(COOKIECUTTER_ONE_DIR, template_dir)
+        repo = Repo.init(repo_dir)
+        stage_and_commit_all(repo, "Add template")
+        index = DirectoryHashIndex(temp_path / "index.json")
+        # Recently modified, but git can tell it is unchanged
+        assert index.md5_dir(template_dir) == COOKIECUTTER_ONE_VERSION
+        new_index = DirectoryHashIndex(temp_path / "index.json")
+        with patch.object(hashing, "md5_dir") as mock_md5_dir, patch.object(
+            hashing, "_stat_signature"
+        ) as mock_stat_signature:
+            assert new_index.md5_dir(template_dir) == COOKIECUTTER_ONE_VERSION
+            mock_md5_dir.assert_not_called()
+            mock_stat_signature.assert_not_called()
+
+        # Uncommitted changes must be picked up
+        config_path = template_dir / "cookiecutter.json"
+        orig_config = config_path.read_text()
+        config_path.write_text("{}")
+        assert index.md5_dir(template_dir) == md5_dir(template_dir)
+        assert index.md5_dir(template_dir) != COOKIECUTTER_ONE_VERSION
+        config_path.write_text(orig_config)
+        assert index.md5_dir(template_dir) == COOKIECUTTER_ONE_VERSION
+
+        # Git does not track empty folders, but they are part of the hash
+        (template_dir / "empty").mkdir()
+        assert index.md5_dir(template_dir) == md5_dir(template_dir)
+        assert index.md5_dir(template_dir) != COOKIECUTTER_ONE_VERSION
@@ -1,7 +1,24 @@
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, Dict, List
+from unittest.mock import patch
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from cookiecutter.generate import generate_files
+
+from flexlate.finder.multi import MultiFinder
+from flexlate.render import multi as render_multi
+from flexlate.render.cache import RenderCache
 from flexlate.render.multi import MultiRenderer
 from flexlate.render.renderable import Renderable
+from flexlate.render.specific import cookiecutter as specific_cookiecutter
+from flexlate.render.specific import copier as specific_copier
 from flexlate.render.specific.cookiecutter import CookiecutterRenderer
 from flexlate.render.specific.copier import CopierRenderer
+from flexlate.temp_path import create_temp_path
 from tests import config
 from tests.dirutils import wipe_generated_folder
 from tests.fileutils import (
@@ -131,6 +148,199 @@ def test_render_multi_with_overlap(
     assert cookiecutter_one_generated_text_content() == "bsomethingbsomething else"
 
 
+def test_render_multi_in_parallel(
+    cookiecutter_local_renderables: List[Renderable], copier_one_renderable: Renderable
+):
+    renderer = MultiRenderer()
+    cookiecutter_local_renderables[0].data = {"a": "z", "c": "something"}
+    cookiecutter_local_renderables[1].data = {"a": "z", "d": "f"}
+    copier_one_renderable.data = {"q2": 2, "q3": "a3"}
+    data = renderer.render(
+        [
+            *cookiecutter_local_renderables,
+            copier_one_renderable,
+            cookiecutter_local_renderables[0].copy(
+                update=dict(data={"a": "z", "c": " else"})
+            ),
+        ],
+        project_root=config.GENERATED_FILES_DIR,
+        no_input=True,
+        jobs=2,
+    )
+    assert data == [
+        {"a": "z", "c": "something"},
+        {"a": "z", "d": "f"},
+        {"q1": "a1", "q2": 2, "q3": "a3"},
+        {"a": "z", "c": " else"},
+    ]
+    # Overlapping output is still merged in the order of the renderables
+    assert cookiecutter_one_generated_text_content(folder="z") == "zsomethingz else"
+    assert cookiecutter_two_generated_text_content(folder="z") == "f"
+    copier_rendered_path = config.GENERATED_FILES_DIR / "a1.txt"
+    assert copier_rendered_path.read_text() == "2"
+
+
+def test_render_multi_from_cache(
+    cookiecutter_local_renderables: List[Renderable], copier_one_renderable: Renderable
+):
+    cookiecutter_local_renderables[0].data = {"a": "z", "c": "something"}
+    renderables = [*cookiecutter_local_renderables, copier_one_renderable]
+    with create_temp_path() as cache_root:
+        renderer = MultiRenderer(cache=RenderCache(cache_root))
+        data = renderer.render(
+            renderables, project_root=config.GENERATED_FILES_DIR, no_input=True
+        )
+        wipe_generated_folder()
+
+        def _fail_render(*args, **kwargs):
+            raise ValueError("should have loaded from cache")
+
+        with patch.object(CookiecutterRenderer, "render", _fail_render):
+            with patch.object(CopierRenderer, "render", _fail_render):
+                cached_data = renderer.render(
+                    renderables, project_root=config.GENERATED_FILES_DIR, no_input=True
+                )
+
+    assert cached_data == data
+    assert cookiecutter_one_generated_text_content(folder="z") == "zsomething"
+    assert cookiecutter_two_generated_text_content() == "e"
+    copier_rendered_path = config.GENERATED_FILES_DIR / "a1.txt"
+    assert copier_rendered_path.read_text() == "1"
+
+
+def test_render_multi_does_not_use_cache_when_prompting(
+    cookiecutter_one_renderable: Renderable,
+):
+    with create_temp_path() as cache_root:
+        renderer = MultiRenderer(cache=RenderCache(cache_root))
+        with patch.object(CookiecutterRenderer, "render", return_value={}):
+            renderer.render(
+                [cookiecutter_one_renderable],
+                project_root=config.GENERATED_FILES_DIR,
+                no_input=False,
+            )
+        assert list(cache_root.iterdir()) == []
+
+
+def test_render_multi_cache_evicts_least_recently_used(
+    cookiecutter_one_renderable: Renderable,
+):
+    with create_temp_path() as cache_root:
+        renderer = MultiRenderer(cache=RenderCache(cache_root, max_entries=2))
+        for value in ["x", "y", "z"]:
+            cookiecutter_one_renderable.data = {"a": value, "c": ""}
+            renderer.render(
+                [cookiecutter_one_renderable],
+                project_root=config.GENERATED_FILES_DIR,
+                no_input=True,
+            )
+        assert 0 < len(list(cache_root.iterdir())) <= 2
+
+        def _fail_render(*args, **kwargs):
+            raise ValueError("should have loaded from cache")
+
+        # Most recent render is kept
+        with patch.object(CookiecutterRenderer, "render", _fail_render):
+            renderer.render(
+                [cookiecutter_one_renderable],
+                project_root=config.GENERATED_FILES_DIR,
+                no_input=True,
+            )
+
+
+def test_render_multi_reads_cache_settings_when_rendering(monkeypatch: MonkeyPatch):
+    renderer = MultiRenderer()
+    assert renderer.cache is None
+
+    monkeypatch.setenv("FLEXLATE_RENDER_CACHE_ENABLED", "true")
+    monkeypatch.setenv("FLEXLATE_RENDER_CACHE_MAX_ENTRIES", "3")
+    cache = renderer.cache
+    assert isinstance(cache, RenderCache)
+    assert cache.max_entries == 3
+    assert MultiRenderer(cache=None).cache is None
+
+
+def _add_hooks_folder(template_path: Path):
+    (template_path / "hooks").mkdir()
+    (template_path / "hooks" / "post_gen_project.py").write_text("print('hi')")
+
+
+def _add_file_with_current_time(template_path: Path):
+    (template_path / "{{ cookiecutter.a }}" / "time.txt").write_text("{% now 'utc' %}")
+
+
+@pytest.mark.parametrize(
+    "make_non_deterministic", [_add_hooks_folder, _add_file_with_current_time]
+)
+def test_render_cache_does_not_cache_templates_that_may_render_differently(
+    make_non_deterministic: Callable[[Path], None],
+    cookiecutter_one_template: CookiecutterTemplate,
+):
+    with create_temp_path() as temp_path:
+        template_path = temp_path / "one"
+        shutil.copytree(cookiecutter_one_template.path, template_path)
+        cache = RenderCache(temp_path / "cache")
+        template = MultiFinder().find(str(template_path))
+        renderable = Renderable(template=template, out_root=config.GENERATED_FILES_DIR)
+        assert cache.key(renderable) is not None
+
+        make_non_deterministic(template_path)
+        template = MultiFinder().find(str(template_path))
+        renderable = Renderable(template=template, out_root=config.GENERATED_FILES_DIR)
+        assert cache.key(renderable) is None
+
+
+def test_merge_file_trees_appends_colliding_files_as_bytes():
+    binary_one = bytes(range(256)) * 10
+    binary_two = b"\x00\xff\xfe" + bytes(reversed(range(256)))
+    latin_one = "café one\n".encode("latin-1")
+    latin_two = "naïve two\n".encode("latin-1")
+    with create_temp_path() as temp_path:
+        dirs = [temp_path / "one", temp_path / "two"]
+        for directory, binary, latin in zip(
+            dirs, [binary_one, binary_two], [latin_one, latin_two]
+        ):
+            (directory / "sub").mkdir(parents=True)
+            (directory / "image.bin").write_bytes(binary)
+            (directory / "sub" / "latin.txt").write_bytes(latin)
+        out_dir = temp_path / "out"
+
+        render_multi._merge_file_trees(dirs, out_dir)
+
+        assert (out_dir / "image.bin").read_bytes() == binary_one + binary_two
+        assert (out_dir / "sub" / "latin.txt").read_bytes() == latin_one + latin_two
+
+
+def test_merge_file_trees_outputs_symlinked_file_contents():
+    with create_temp_path() as temp_path:
+        targets = temp_path / "targets"
+        (targets / "linked-folder").mkdir(parents=True)
+        (targets / "linked-folder" / "in-linked-folder.txt").write_text("not followed")
+        dirs = [temp_path / "one", temp_path / "two"]
+        for i, directory in enumerate(dirs):
+            directory.mkdir()
+            target_file = targets / f"linked{i}.txt"
+            target_file.write_text(f"linked {i}\n")
+            (directory / "linked.txt").symlink_to(target_file)
+            (directory / "linked-folder").symlink_to(
+                targets / "linked-folder", target_is_directory=True
+            )
+        out_dir = temp_path / "out"
+
+        render_multi._merge_file_trees(dirs, out_dir)
+
+        linked_path = out_dir / "linked.txt"
+        assert not linked_path.is_symlink()
+        assert linked_path.read_text() == "linked 0\nlinked 1\n"
+        linked_folder = out_dir / "linked-folder"
+        assert linked_folder.is_dir()
+        assert not linked_folder.is_symlink()
+        assert list(linked_folder.iterdir()) == []
+        # Targets are never modified
+        assert (targets / "linked0.txt").read_text() == "linked 0\n"
+        assert (targets / "linked1.txt").read_text() == "linked 1\n"
+
+
 def test_render_string_local_cookiecutter(
     cookiecutter_one_renderable: Renderable,
 ):
@@ -139,3 +349,121 @@ def test_render_string_local_cookiecutter(
         "{{ cookiecutter.a }} works", cookiecutter_one_renderable
     )
     assert output == "b works"
+
+
+def test_render_string_local_copier(
+    copier_one_renderable: Renderable,
+):
+    renderer = CopierRenderer()
+    output = renderer.render_string("{{ q1 }} works", copier_one_renderable)
+    assert output == "a1 works"
+
+
+def test_render_multiple_strings(
+    cookiecutter_one_renderable: Renderable,
+):
+    renderer = MultiRenderer()
+    outputs = renderer.render_strings(
+        ["{{ cookiecutter.a }} works", "{{ cookiecutter.c }}", "no template"],
+        cookiecutter_one_renderable,
+    )
+    assert outputs == ["b works", "", "no template"]
+
+
+@pytest.mark.parametrize(
+    "renderable_fixture, renderer_module, strings",
+    [
+        (
+            "cookiecutter_one_renderable",
+            specific_cookiecutter,
+            ["{{ cookiecutter.a }} works", "{{ cookiecutter.c }}"],
+        ),
+        ("copier_one_renderable", specific_copier, ["{{ q1 }} works", "{{ q2 }}"]),
+    ],
+)
+def test_render_strings_reuses_environment_for_template_version(
+    renderable_fixture: str,
+    renderer_module: ModuleType,
+    strings: List[str],
+    request: pytest.FixtureRequest,
+):
+    renderable: Renderable = request.getfixturevalue(renderable_fixture)
+    renderer = MultiRenderer()
+    first_outputs = renderer.render_strings(strings, renderable)
+    second_outputs = renderer.render_strings(list(reversed(strings)), renderable)
+    assert second_outputs == list(reversed(first_outputs))
+
+    cache_info = renderer_module._get_environment.cache_info()
+    assert cache_info.misses == 1
+    assert cache_info.hits == 1
+
+
+def test_render_cookiecutter_uses_generate_files_only_for_single_renders(
+    cookiecutter_one_renderable: Renderable,
+):
+    renderer = CookiecutterRenderer()
+
+    def renderables_in(folder: str, count: int) -> List[Renderable]:
+        return [
+            cookiecutter_one_renderable.copy(
+                update=dict(out_root=config.GENERATED_FILES_DIR / folder / str(i))
+            )
+            for i in range(count)
+        ]
+
+    with patch.object(
+        specific_cookiecutter, "generate_files", wraps=generate_files
+    ) as mock_generate_files:
+        renderer.render(renderables_in("single", 1)[0], no_input=True)
+        renderer.render_many(renderables_in("many-single", 1), no_input=True)
+        assert mock_generate_files.call_count == 2
+        renderer.render_many(renderables_in("many", 2), no_input=True)
+        assert mock_generate_files.call_count == 2
+
+
+def test_render_many_cookiecutter_matches_cookiecutter_generate_files(
+    cookiecutter_one_renderable: Renderable,
+):
+    renderer = CookiecutterRenderer()
+    all_data = [{"a": "z", "c": "something"}, {"c": "else"}, {}]
+
+    def renderables_in(folder: str) -> List[Renderable]:
+        return [
+            cookiecutter_one_renderable.copy(
+                update=dict(
+                    data=data, out_root=config.GENERATED_FILES_DIR / folder / str(i)
+                )
+            )
+            for i, data in enumerate(all_data)
+        ]
+
+    many_data = renderer.render_many(renderables_in("many"), no_input=True)
+    assert many_data == [
+        {"a": "z", "c": "something"},
+        {"a": "b", "c": "else"},
+        {"a": "b", "c": ""},
+    ]
+
+    # Render the same data with cookiecutter itself to compare the output
+    template_path = cookiecutter_one_renderable.template.path
+    for i, data in enumerate(many_data):
+        context = OrderedDict(cookiecutter={**data, "_template": template_path})
+        generate_files(
+            str(template_path),
+            context=context,
+            output_dir=str(config.GENERATED_FILES_DIR / "cookiecutter" / str(i)),
+        )
+
+    def read_files(folder: Path) -> Dict[str, str]:
+        return {
+            str(path.relative_to(folder)): path.read_text()
+            for path in folder.rglob("*")
+            if path.is_file()
+        }
+
+    for i in range(len(all_data)):
+        many_files = read_files(config.GENERATED_FILES_DIR / "many" / str(i))
+        assert many_files
+        assert many_files == read_files(
+            config.GENERATED_FILES_DIR / "cookiecutter" / str(i)
+        )
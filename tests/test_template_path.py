@@ -1,8 +1,10 @@
 from pathlib import Path
 
 import pytest
+from git import Repo
 
 from flexlate.exc import InvalidTemplatePathException
+from flexlate.ext_git import MIRRORS_FOLDER_NAME
 from flexlate.template_path import (
     get_local_repo_path_and_name_cloning_if_repo_url,
     is_local_template,
@@ -15,6 +17,7 @@ from tests.fixtures.repo_path import (
     repo_path_fixture,
     repo_path_non_ssh_fixture,
 )
+from tests.gitutils import create_empty_repo
 
 
 def test_is_repo_url(repo_path_fixture: RepoPathFixture):
@@ -54,3 +57,43 @@ def test_get_local_repo_path_cloning_if_repo_url(
             )
             repo_path_fixture.assert_was_cloned_correctly(local_path, version)
         wipe_generated_folder()
+
+
+def test_get_local_repo_path_reuses_mirror_of_repo_url():
+    wipe_generated_folder()
+    remote_repo = create_empty_repo()
+    remote_path = Path(remote_repo.working_dir)
+    (remote_path / "a.txt").write_text("first")
+    remote_repo.git.add("-A")
+    remote_repo.git.commit("-m", "first")
+    first_version = remote_repo.head.commit.hexsha
+    url = remote_path.resolve().as_uri()
+    dst_folder = config.GENERATED_FILES_DIR / "cloned"
+
+    local_path, name = get_local_repo_path_and_name_cloning_if_repo_url(
+        url, dst_folder=dst_folder
+    )
+    assert name == remote_path.name
+    assert local_path == dst_folder / name / first_version
+    assert (local_path / "a.txt").read_text() == "first"
+
+    (remote_path / "a.txt").write_text("second")
+    remote_repo.git.commit("-am", "second")
+    second_version = remote_repo.head.commit.hexsha
+
+    # New commits are fetched into the existing mirror
+    local_path, _ = get_local_repo_path_and_name_cloning_if_repo_url(
+        url, dst_folder=dst_folder
+    )
+    assert local_path == dst_folder / name / second_version
+    assert (local_path / "a.txt").read_text() == "second"
+    assert Repo(local_path).head.commit.hexsha == second_version
+    assert list(Repo(local_path).remote().urls) == [url]
+    assert len(list((dst_folder / MIRRORS_FOLDER_NAME).iterdir())) == 1
+
+    # Existing versions are used as-is
+    local_path, _ = get_local_repo_path_and_name_cloning_if_repo_url(
+        url, first_version, dst_folder=dst_folder
+    )
+    assert (local_path / "a.txt").read_text() == "first"
+    wipe_generated_folder()
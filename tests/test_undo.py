@@ -1,13 +1,27 @@
+from unittest.mock import patch
+
 import pytest
 
+from flexlate import branch_update, ext_git
 from flexlate.config import FlexlateConfig
 from flexlate.exc import (
     LastCommitWasNotByFlexlateException,
     TooFewTransactionsException,
 )
+from flexlate.ext_git import stage_and_commit_all
+from flexlate.transactions import transaction
+from flexlate.transactions.index import (
+    TRANSACTION_INDEX_REF_PREFIX,
+    get_indexed_transaction_commits,
+)
+from flexlate.transactions.transaction import (
+    create_transaction_commit_message,
+    find_earliest_merge_commit_for_transaction,
+)
 from flexlate.transactions.undoer import Undoer
 from tests import config as test_config
 from tests.fixtures.templated_repo import *
+from tests.fixtures.transaction import ADD_OUTPUT_ID, ADD_SOURCE_ID
 
 INITIAL_COMMIT_MESSAGE = "Initial commit\n"
 REPO_WITH_COOKIECUTTER_ONE_SOURCE_COMMIT_MESSAGE = 'Added template source one to .\n\n-------------------BEGIN FLEXLATE TRANSACTION-------------------\n{\n  "type": "add source",\n  "target": null,\n  "out_root": null,\n  "data": null,\n  "id": "93f984ca-6e8f-45e9-b9b0-aebebfe798c1"\n}\n'
@@ -75,6 +89,41 @@ def test_undo_multiple_transactions(
     assert not config_path.exists()
 
 
+def test_undo_multiple_transactions_resets_each_branch_once(
+    repo_after_updating_cookiecutter_one: Repo,
+):
+    repo = repo_after_updating_cookiecutter_one
+    undoer = Undoer()
+    output_path = test_config.GENERATED_REPO_DIR / "b" / "text.txt"
+    with change_directory_to(test_config.GENERATED_REPO_DIR):
+        assert output_path.read_text() == "b and extra"
+        with patch.object(
+            ext_git, "_clone_from_local_repo", wraps=ext_git._clone_from_local_repo
+        ) as mock_clone:
+            with patch.object(
+                branch_update,
+                "reset_branch_to_commit_without_checkout",
+                wraps=branch_update.reset_branch_to_commit_without_checkout,
+            ) as mock_reset_branch:
+                undoer.undo_transactions(repo, num_transactions=2)
+        # Branches are moved in place, once each
+        mock_clone.assert_not_called()
+        assert sorted(call.args[1] for call in mock_reset_branch.call_args_list) == [
+            DEFAULT_MERGED_BRANCH_NAME,
+            DEFAULT_TEMPLATE_BRANCH_NAME,
+        ]
+        assert not output_path.exists()
+        assert repo.commit().message == MERGED_MESSAGE
+        assert (
+            repo.branches[DEFAULT_MERGED_BRANCH_NAME].commit  # type: ignore
+            == repo.commit()
+        )
+        assert (
+            repo.branches[DEFAULT_TEMPLATE_BRANCH_NAME].commit.message  # type: ignore
+            == REPO_WITH_COOKIECUTTER_ONE_SOURCE_COMMIT_MESSAGE
+        )
+
+
 def test_undo_remove_template_source(repo_with_template_source_removed: Repo):
     repo = repo_with_template_source_removed
     undoer = Undoer()
@@ -131,6 +180,27 @@ def test_undo_update(
         )
 
 
+def test_undo_update_uses_transaction_index(
+    repo_after_updating_cookiecutter_one: Repo,
+):
+    repo = repo_after_updating_cookiecutter_one
+    undoer = Undoer()
+    output_path = test_config.GENERATED_REPO_DIR / "b" / "text.txt"
+
+    def _fail_search(*args, **kwargs):
+        raise AssertionError("should have used the index rather than history")
+
+    with change_directory_to(test_config.GENERATED_REPO_DIR):
+        with patch.object(
+            transaction,
+            "_search_history_for_earliest_merge_commit_for_transaction",
+            _fail_search,
+        ):
+            undoer.undo_transactions(repo)
+        assert output_path.read_text() == "b"
+        assert repo.commit().message == MERGED_MESSAGE
+
+
 def test_undo_too_many_transactions(repo_with_cookiecutter_one_template_source: Repo):
     repo = repo_with_cookiecutter_one_template_source
     undoer = Undoer()
@@ -152,3 +222,77 @@ def test_undo_when_last_commit_is_not_from_flexlate(
     with change_directory_to(test_config.GENERATED_REPO_DIR):
         with pytest.raises(LastCommitWasNotByFlexlateException):
             undoer.undo_transactions(repo)
+
+
+def test_find_merge_for_transaction_in_merge_heavy_history(
+    repo_with_placeholder_committed: Repo,
+    add_output_transaction: FlexlateTransaction,
+):
+    repo = repo_with_placeholder_committed
+    text_path = test_config.GENERATED_REPO_DIR / "text.txt"
+    with change_directory_to(test_config.GENERATED_REPO_DIR):
+        main_branch_name = repo.active_branch.name
+        repo.git.branch(DEFAULT_TEMPLATE_BRANCH_NAME)
+        # Every merge doubles the paths back to the initial commit
+        for i in range(40):
+            repo.git.checkout("-b", "feature")
+            text_path.write_text(f"feature {i}")
+            stage_and_commit_all(repo, f"Feature {i}")
+            repo.git.checkout(main_branch_name)
+            (test_config.GENERATED_REPO_DIR / f"{i}.txt").write_text("master")
+            stage_and_commit_all(repo, f"Master {i}")
+            repo.git.merge("feature", "--no-edit")
+            repo.git.branch("-d", "feature")
+
+        repo.git.checkout(DEFAULT_TEMPLATE_BRANCH_NAME)
+        text_path.write_text("template")
+        stage_and_commit_all(
+            repo,
+            create_transaction_commit_message(
+                "Update flexlate templates", add_output_transaction
+            ),
+        )
+        repo.git.checkout(main_branch_name)
+        merge_message = (
+            f"Merge branch '{DEFAULT_TEMPLATE_BRANCH_NAME}' into {main_branch_name}"
+        )
+        repo.git.merge(
+            DEFAULT_TEMPLATE_BRANCH_NAME, "--no-ff", "-X", "theirs", "-m", merge_message
+        )
+
+        merge_commit = find_earliest_merge_commit_for_transaction(
+            repo,
+            add_output_transaction,
+            main_branch_name,
+            DEFAULT_TEMPLATE_BRANCH_NAME,
+        )
+        assert merge_commit == repo.commit()
+
+
+def test_transaction_index_is_maintained_and_rebuilt(
+    repo_with_template_branch_from_cookiecutter_one: Repo,
+):
+    repo = repo_with_template_branch_from_cookiecutter_one
+    undoer = Undoer()
+    with change_directory_to(test_config.GENERATED_REPO_DIR):
+        indexed = get_indexed_transaction_commits(repo, ADD_OUTPUT_ID)
+        assert indexed.template_sha == repo.commit().hexsha
+        assert (
+            get_indexed_transaction_commits(repo, ADD_SOURCE_ID).template_sha
+            == repo.commit().parents[0].hexsha
+        )
+        orig_refs = repo.git.for_each_ref(TRANSACTION_INDEX_REF_PREFIX)
+
+        repo.git.update_ref(
+            "-d", f"{TRANSACTION_INDEX_REF_PREFIX}/{ADD_SOURCE_ID}/template"
+        )
+        undoer.rebuild_transaction_index(repo)
+        assert repo.git.for_each_ref(TRANSACTION_INDEX_REF_PREFIX) == orig_refs
+
+        undoer.undo_transactions(repo)
+        assert repo.commit().message == REPO_WITH_COOKIECUTTER_ONE_SOURCE_COMMIT_MESSAGE
+        assert get_indexed_transaction_commits(repo, ADD_OUTPUT_ID).template_sha is None
+        assert (
+            get_indexed_transaction_commits(repo, ADD_SOURCE_ID).template_sha
+            is not None
+        )
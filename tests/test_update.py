@@ -1,17 +1,19 @@
 from typing import Optional, Sequence
-from unittest.mock import patch
+from unittest.mock import PropertyMock, patch
 
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
-from git import Head, Repo
+from git import Git, GitCommandError, Head, Repo
 
-from flexlate import branch_update
+from flexlate import branch_update, ext_git
 from flexlate.branch_update import get_flexlate_branch_name_for_feature_branch
 from flexlate.config import FlexlateConfig, TemplateSource, TemplateSourceWithTemplates
+from flexlate.config_manager import ConfigManager
 from flexlate.constants import DEFAULT_MERGED_BRANCH_NAME, DEFAULT_TEMPLATE_BRANCH_NAME
 from flexlate.exc import GitRepoDirtyException, MergeConflictsAndAbortException
 from flexlate.ext_git import delete_local_branch, repo_has_merge_conflicts
 from flexlate.finder.multi import MultiFinder
+from flexlate.path_ops import change_directory_to
 from flexlate.pusher import Pusher
 from flexlate.render.specific import cookiecutter
 from flexlate.syncer import Syncer
@@ -21,7 +23,7 @@ from flexlate.template.copier import CopierTemplate
 from flexlate.template.types import TemplateType
 from flexlate.transactions.transaction import FlexlateTransaction
 from flexlate.update.main import Updater
-from flexlate.update.template import TemplateUpdate
+from flexlate.update.template import TemplateUpdate, updates_with_updated_data
 from tests import config as test_config
 from tests.config import (
     COOKIECUTTER_ONE_NAME,
@@ -34,6 +36,7 @@ from tests.fileutils import (
     cookiecutter_one_generated_text_content,
     cookiecutter_two_generated_text_content,
 )
+from tests.fixtures.config import generated_dir_with_configs
 from tests.fixtures.git import *
 from tests.fixtures.local_branch_situation import *
 from tests.fixtures.template import *
@@ -46,6 +49,7 @@ from tests.gitutils import (
     add_local_remote,
     assert_main_commit_message_matches,
     checkout_new_branch,
+    get_number_of_checkouts,
 )
 
 
@@ -111,6 +115,93 @@ def test_update_modify_template(
     )
 
 
+def test_update_modify_template_commits_to_template_branch_without_cloning(
+    cookiecutter_one_modified_template: CookiecutterTemplate,
+    repo_with_gitignore_and_template_branch_from_cookiecutter_one: Repo,
+    update_transaction: FlexlateTransaction,
+):
+    repo = repo_with_gitignore_and_template_branch_from_cookiecutter_one
+    orig_template_sha = repo.branches[DEFAULT_TEMPLATE_BRANCH_NAME].commit.hexsha  # type: ignore
+    updater = Updater()
+    template_updates = updater.get_updates_for_templates(
+        [cookiecutter_one_modified_template],
+        project_root=test_config.GENERATED_REPO_DIR,
+    )
+
+    def _fail_on_clone(*args, **kwargs):
+        raise AssertionError("should not clone the repo to update the template branch")
+
+    # All temp repos are cloned through this, including by other modules
+    with patch.object(ext_git, "_clone_from_local_repo", _fail_on_clone):
+        updater.update(repo, template_updates, update_transaction, no_input=True)
+    _assert_update_of_cookiecutter_one_modified_template_was_successful(
+        repo, "master", DEFAULT_TEMPLATE_BRANCH_NAME, DEFAULT_MERGED_BRANCH_NAME
+    )
+    template_commit = repo.branches[DEFAULT_TEMPLATE_BRANCH_NAME].commit  # type: ignore
+    assert [parent.hexsha for parent in template_commit.parents] == [orig_template_sha]
+
+
+def test_update_modify_template_without_conflicts_does_not_check_out_flexlate_branches(
+    cookiecutter_one_modified_template: CookiecutterTemplate,
+    repo_with_gitignore_and_template_branch_from_cookiecutter_one: Repo,
+    update_transaction: FlexlateTransaction,
+):
+    repo = repo_with_gitignore_and_template_branch_from_cookiecutter_one
+    orig_num_checkouts = get_number_of_checkouts(repo)
+    updater = Updater()
+    template_updates = updater.get_updates_for_templates(
+        [cookiecutter_one_modified_template],
+        project_root=test_config.GENERATED_REPO_DIR,
+    )
+    updater.update(repo, template_updates, update_transaction, no_input=True)
+    assert get_number_of_checkouts(repo) == orig_num_checkouts
+    _assert_update_of_cookiecutter_one_modified_template_was_successful(
+        repo, "master", DEFAULT_TEMPLATE_BRANCH_NAME, DEFAULT_MERGED_BRANCH_NAME
+    )
+
+
+def test_update_modify_template_falls_back_to_checkout_on_older_git(
+    cookiecutter_one_modified_template: CookiecutterTemplate,
+    repo_with_gitignore_and_template_branch_from_cookiecutter_one: Repo,
+    update_transaction: FlexlateTransaction,
+):
+    repo = repo_with_gitignore_and_template_branch_from_cookiecutter_one
+    orig_num_checkouts = get_number_of_checkouts(repo)
+    updater = Updater()
+    template_updates = updater.get_updates_for_templates(
+        [cookiecutter_one_modified_template],
+        project_root=test_config.GENERATED_REPO_DIR,
+    )
+    # Before merge-tree --write-tree was added
+    with patch.object(Git, "version_info", new_callable=PropertyMock) as version_info:
+        version_info.return_value = (2, 37, 0)
+        updater.update(repo, template_updates, update_transaction, no_input=True)
+    assert get_number_of_checkouts(repo) > orig_num_checkouts
+    _assert_update_of_cookiecutter_one_modified_template_was_successful(
+        repo, "master", DEFAULT_TEMPLATE_BRANCH_NAME, DEFAULT_MERGED_BRANCH_NAME
+    )
+
+
+def test_update_modify_template_falls_back_to_checkout_when_merge_tree_fails(
+    cookiecutter_one_modified_template: CookiecutterTemplate,
+    repo_with_gitignore_and_template_branch_from_cookiecutter_one: Repo,
+    update_transaction: FlexlateTransaction,
+):
+    repo = repo_with_gitignore_and_template_branch_from_cookiecutter_one
+    updater = Updater()
+    template_updates = updater.get_updates_for_templates(
+        [cookiecutter_one_modified_template],
+        project_root=test_config.GENERATED_REPO_DIR,
+    )
+    # Same as git exits with when it does not know an option
+    unknown_option_error = GitCommandError(["git", "merge-tree"], 129)
+    with patch.object(Git, "merge_tree", create=True, side_effect=unknown_option_error):
+        updater.update(repo, template_updates, update_transaction, no_input=True)
+    _assert_update_of_cookiecutter_one_modified_template_was_successful(
+        repo, "master", DEFAULT_TEMPLATE_BRANCH_NAME, DEFAULT_MERGED_BRANCH_NAME
+    )
+
+
 @pytest.mark.parametrize("target_specific_template", [False, True])
 def test_update_modify_specific_template(
     target_specific_template: bool,
@@ -660,6 +751,29 @@ def test_update_passed_templates_to_newest_versions_but_already_at_targets(
     assert local_template.version == COOKIECUTTER_ONE_VERSION
 
 
+def test_updates_with_updated_data_matches_renderables_loading_each_config_once(
+    generated_dir_with_configs: None,
+):
+    project_root = test_config.GENERATED_FILES_DIR
+    config_manager = ConfigManager()
+    updates = config_manager.get_no_op_updates(project_root=project_root)
+    renderables = config_manager.get_all_renderables(project_root=project_root)
+    assert len(updates) == len(renderables) == 4
+    # Match in a different order than the updates
+    renderables = list(reversed(renderables))
+    data = [{"a": str(i)} for i in range(len(renderables))]
+    with change_directory_to(project_root):
+        with patch.object(
+            FlexlateConfig, "load", side_effect=FlexlateConfig.load
+        ) as mock_load:
+            new_updates = updates_with_updated_data(
+                updates, data, renderables, project_root=project_root
+            )
+    # One for each of the two configs
+    assert mock_load.call_count == 2
+    assert [update.data for update in new_updates] == list(reversed(data))
+
+
 def _modify_cookiecutter_one_template_in_generated_folder(template: Template):
     template_folder = test_config.GENERATED_FILES_DIR / COOKIECUTTER_ONE_NAME
     shutil.copytree(template.path, template_folder, dirs_exist_ok=True)